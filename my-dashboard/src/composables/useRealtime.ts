@@ -1,8 +1,18 @@
 import { onUnmounted } from 'vue'
 
+// Server-side batcher (my_frappe_app/realtime.py) ka payload
+export interface CustomerChanges {
+  customer: string
+  orders: string[]
+  removed_orders: string[]
+  subscriptions: string[]
+  actions: Record<string, string>
+  messages: string[]
+}
+
 interface RealtimeOptions {
-  onOrderUpdate?: () => void
-  onSubscriptionUpdate?: () => void
+  onOrderUpdate?: (changes: CustomerChanges) => void
+  onSubscriptionUpdate?: (changes: CustomerChanges) => void
   onNotification?: (msg: string) => void
 }
 
@@ -17,42 +27,29 @@ export function useCustomerRealtime(
     return { disconnect: () => {} }
   }
 
-  // Order update event
-  const handleOrderUpdate = (data: any) => {
-    if (!data?.customer || data.customer === customerEmail) {
-      options.onOrderUpdate?.()
-    }
-  }
+  // Ek transaction ke saare changes ek hi event mein aate hain
+  const handleCustomerChanges = (data: CustomerChanges) => {
+    if (data?.customer && data.customer !== customerEmail) return
 
-  // Subscription update event
-  const handleSubscriptionUpdate = (data: any) => {
-    if (!data?.customer || data.customer === customerEmail) {
-      options.onSubscriptionUpdate?.()
+    if ((data.orders?.length || 0) + (data.removed_orders?.length || 0) > 0) {
+      options.onOrderUpdate?.(data)
     }
-  }
-
-  // Frappe's built-in msgprint (already used in _notify_customer_subscription)
-  const handleMsgprint = (data: any) => {
-    if (typeof data === 'string') {
-      options.onNotification?.(data)
+    if (data.subscriptions?.length) {
+      options.onSubscriptionUpdate?.(data)
+    }
+    for (const msg of data.messages || []) {
+      options.onNotification?.(msg)
     }
-    // Yeh event aane par orders aur subs refresh karo
-    options.onOrderUpdate?.()
-    options.onSubscriptionUpdate?.()
   }
 
   // Subscribe
-  frappe.realtime.on('order_update', handleOrderUpdate)
-  frappe.realtime.on('subscription_update', handleSubscriptionUpdate)
-  frappe.realtime.on('msgprint', handleMsgprint)
+  frappe.realtime.on('customer_changes', handleCustomerChanges)
 
   console.log('[Realtime] Connected for:', customerEmail)
 
   // Disconnect function
   const disconnect = () => {
-    frappe.realtime.off('order_update', handleOrderUpdate)
-    frappe.realtime.off('subscription_update', handleSubscriptionUpdate)
-    frappe.realtime.off('msgprint', handleMsgprint)
+    frappe.realtime.off('customer_changes', handleCustomerChanges)
     console.log('[Realtime] Disconnected')
   }
 
@@ -1,7 +1,24 @@
+import hashlib
+
 import frappe
 from frappe import _
 from frappe.model.mapper import get_mapped_doc
-from frappe.utils import nowdate, getdate, fmt_money, format_date, add_months, get_datetime
+from frappe.utils import nowdate, getdate, flt, fmt_money, format_date, add_months, get_datetime
+
+from my_frappe_app.forecast import clear_print_run_forecast
+from my_frappe_app.instrumentation import instrument, record_cache_access
+from my_frappe_app.item_meta import get_item_meta_many, get_item_names
+from my_frappe_app.job_ledger import JobAlreadyRunning, job_run
+from my_frappe_app.order_retry import queue_order_retry
+from my_frappe_app.payment_utils import _get_customer_emails
+from my_frappe_app.realtime import queue_customer_change
+from my_frappe_app.subscription_schedule import get_day_schedule
+from my_frappe_app.trusted_orders import (
+    build_delivery_note,
+    build_sales_order,
+    reset_trusted_order_cache,
+    trusted_mode_enabled,
+)
 
 DAY_QTY_FIELD = {
     "Monday":    "monday_qty",
@@ -15,8 +32,26 @@ DAY_QTY_FIELD = {
 
 ALL_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
+# In statuses mein subscription ki active_key set rehti hai (unique index)
+ACTIVE_SUBSCRIPTION_STATUSES = ("Accept Pending", "Active")
+
+SO_TO_DN_MAPPING = {
+    "Sales Order": {
+        "doctype": "Delivery Note",
+        "validation": {"docstatus": ["=", 1]}
+    },
+    "Sales Order Item": {
+        "doctype": "Delivery Note Item",
+        "field_map": {
+            "name":   "so_detail",
+            "parent": "against_sales_order"
+        }
+    }
+}
+
 
 @frappe.whitelist(allow_guest=True)
+@instrument
 def get_current_user_role():
     frappe.local.no_cookie_check = True
     user = frappe.session.user
@@ -30,6 +65,7 @@ def get_current_user_role():
     return {"role": "Guest"}
 
 @frappe.whitelist()
+@instrument
 def get_customer_sidebar_data():
     try:
         user_email = frappe.session.user
@@ -134,50 +170,104 @@ def _is_subscription_category(item_group_value):
     return False
 
 
-def find_price_recursive(item_code, current_territory, day, target_date):
-    temp_territory = current_territory
-    while temp_territory:
-        rules = frappe.db.get_all(
-            "Daily Item Price",
-            filters={"item_code": item_code, "territory": temp_territory},
-            fields=["name", "start_date", "end_date"],
-            order_by="start_date desc"
-        )
-        for r in rules:
-            if not r.start_date:
-                continue
-            if getdate(r.start_date) > getdate(target_date):
-                continue
-            if r.end_date and getdate(r.end_date) < getdate(target_date):
+def _territory_chain(territory):
+    """Territory se root tak ka path — price lookup isi order mein hota hai."""
+    chain = []
+    while territory and territory not in chain:
+        chain.append(territory)
+        territory = frappe.db.get_value("Territory", territory, "parent_territory")
+    return chain
+
+
+def _ordered_price_rules(item_codes, chain):
+    """
+    Daily Item Price rules ek query mein, precedence order mein:
+    nearest territory pehle, phir start_date desc.
+    """
+    item_codes = [c for c in item_codes if c]
+    if not chain or not item_codes:
+        return []
+    rules = frappe.db.get_all(
+        "Daily Item Price",
+        filters={"item_code": ["in", item_codes], "territory": ["in", chain]},
+        fields=["name", "item_code", "territory", "start_date", "end_date"],
+        order_by="start_date desc"
+    )
+    rank = {t: i for i, t in enumerate(chain)}
+    return sorted(rules, key=lambda r: rank[r.territory])
+
+
+def find_prices_bulk(item_codes, current_territory, days, target_date):
+    """
+    find_price_recursive ka batched version: saare items x saare days ke liye
+    do queries (rules + day prices). Returns {item_code: {day: result}}.
+    Har item ke liye nearest territory ka pehla valid rule (start_date desc) jeetta hai.
+    """
+    item_codes = list(dict.fromkeys(item_codes))
+    days = list(days)
+    target = getdate(target_date)
+
+    # item → pehla valid rule
+    rule_by_item = {}
+    for r in _ordered_price_rules(item_codes, _territory_chain(current_territory)):
+        if r.item_code in rule_by_item:
+            continue
+        if not r.start_date or getdate(r.start_date) > target:
+            continue
+        if r.end_date and getdate(r.end_date) < target:
+            continue
+        rule_by_item[r.item_code] = r.name
+
+    prices = {}
+    if rule_by_item:
+        for row in frappe.db.get_all(
+            "Daily Price Detail",
+            filters={"parent": ["in", list(set(rule_by_item.values()))], "day": ["in", days]},
+            fields=["parent", "day", "price"]
+        ):
+            prices.setdefault((row.parent, row.day), row.price)
+
+    result = {}
+    for ic in item_codes:
+        rule = rule_by_item.get(ic)
+        result[ic] = {}
+        for day in days:
+            if not rule:
+                result[ic][day] = {
+                    "price": 0.0,
+                    "price_available": False,
+                    "price_reason": f"No price rule found for {day}"
+                }
                 continue
-            price = frappe.db.get_value(
-                "Daily Price Detail",
-                {"parent": r.name, "day": day},
-                "price"
-            )
+            price = prices.get((rule, day))
             if price and float(price) > 0:
-                return {"price": float(price), "price_available": True, "price_reason": ""}
+                result[ic][day] = {"price": float(price), "price_available": True, "price_reason": ""}
             else:
-                return {
+                result[ic][day] = {
                     "price": 0.0,
                     "price_available": False,
                     "price_reason": f"Price not set by seller for {day}"
                 }
-        parent = frappe.db.get_value("Territory", temp_territory, "parent_territory")
-        temp_territory = parent
-    return {
-        "price": 0.0,
-        "price_available": False,
-        "price_reason": f"No price rule found for {day}"
-    }
+    return result
 
-@frappe.whitelist()
-def get_customer_subscription_status(customer, seller):
-    if not customer or not seller:
-        return {"active": {}, "pending": {}, "schedule": {}}
 
-    today = nowdate()
+def find_price_recursive(item_code, current_territory, day, target_date):
+    return find_prices_bulk([item_code], current_territory, [day], target_date)[item_code][day]
+
+# ─── SUBSCRIPTION STATUS CACHE ───────────────────────────────────────────────
+# Shop tab har seller / category switch pe status maangta hai — result
+# (customer, seller) ki subscriptions badalne pe hi badalta hai.
+# Entry ke saath date store hoti hai: din badle to start / end window
+# dobara evaluate (miss).
+SUBSCRIPTION_STATUS_CACHE_KEY = "my_frappe_app:subscription_status"
+SUBSCRIPTION_STATUS_BULK_CLEAR = 200
+
+
+def _subscription_status_field(customer, seller):
+    return f"{customer}::{seller}"
 
+
+def _compute_customer_subscription_status(customer, seller, today):
     subs = frappe.db.sql("""
         SELECT name, status FROM `tabNewspaper Subscription`
         WHERE customer = %s AND seller = %s
@@ -188,37 +278,41 @@ def get_customer_subscription_status(customer, seller):
     active_map   = {}
     pending_map  = {}
     schedule_map = {}
+    if not subs:
+        return {"active": active_map, "pending": pending_map, "schedule": schedule_map}
+
+    # Saari subscriptions ke schedule items ek query mein
+    status_of = {sub.name: sub.status for sub in subs}
+    schedule_items = frappe.db.get_all(
+        "Newspaper Subscription Item",
+        filters={"parent": ["in", list(status_of)]},
+        fields=[
+            "parent", "item_code", "is_primary_item",
+            "monday_qty", "tuesday_qty", "wednesday_qty",
+            "thursday_qty", "friday_qty", "saturday_qty", "sunday_qty"
+        ],
+        order_by="parent asc, idx asc"
+    )
+    for si in schedule_items:
+        ic = si.item_code
+        if not ic:
+            continue
 
-    for sub in subs:
-        schedule_items = frappe.db.get_all(
-            "Newspaper Subscription Item",
-            filters={"parent": sub.name},
-            fields=[
-                "item_code", "is_primary_item",
-                "monday_qty", "tuesday_qty", "wednesday_qty",
-                "thursday_qty", "friday_qty", "saturday_qty", "sunday_qty"
-            ]
-        )
-        for si in schedule_items:
-            ic = si.item_code
-            if not ic:
-                continue
-
-            schedule_map[ic] = {
-                "Monday":    int(si.monday_qty or 0),
-                "Tuesday":   int(si.tuesday_qty or 0),
-                "Wednesday": int(si.wednesday_qty or 0),
-                "Thursday":  int(si.thursday_qty or 0),
-                "Friday":    int(si.friday_qty or 0),
-                "Saturday":  int(si.saturday_qty or 0),
-                "Sunday":    int(si.sunday_qty or 0),
-                "sub_name":  sub.name
-            }
+        schedule_map[ic] = {
+            "Monday":    int(si.monday_qty or 0),
+            "Tuesday":   int(si.tuesday_qty or 0),
+            "Wednesday": int(si.wednesday_qty or 0),
+            "Thursday":  int(si.thursday_qty or 0),
+            "Friday":    int(si.friday_qty or 0),
+            "Saturday":  int(si.saturday_qty or 0),
+            "Sunday":    int(si.sunday_qty or 0),
+            "sub_name":  si.parent
+        }
 
-            if sub.status == "Active":
-                active_map[ic] = sub.name
-            elif sub.status == "Accept Pending":
-                pending_map[ic] = sub.name
+        if status_of[si.parent] == "Active":
+            active_map[ic] = si.parent
+        elif status_of[si.parent] == "Accept Pending":
+            pending_map[ic] = si.parent
 
     return {
         "active":   active_map,
@@ -226,7 +320,57 @@ def get_customer_subscription_status(customer, seller):
         "schedule": schedule_map
     }
 
+
 @frappe.whitelist()
+@instrument
+def get_customer_subscription_status(customer, seller):
+    if not customer or not seller:
+        return {"active": {}, "pending": {}, "schedule": {}}
+
+    today = nowdate()
+    field = _subscription_status_field(customer, seller)
+    cached = frappe.cache.hget(SUBSCRIPTION_STATUS_CACHE_KEY, field)
+    hit = bool(cached) and cached.get("date") == today
+    record_cache_access("subscription_status", hit=hit)
+    if hit:
+        return cached["result"]
+
+    result = _compute_customer_subscription_status(customer, seller, today)
+    frappe.cache.hset(SUBSCRIPTION_STATUS_CACHE_KEY, field, {"date": today, "result": result})
+    return result
+
+
+def clear_subscription_status_cache(doc=None, method=None, *args):
+    """
+    hooks.py -> doc_events -> Newspaper Subscription -> on_update / on_trash
+    customer / seller badla ho to purana pair bhi. doc na ho to poora cache.
+    """
+    if doc is None:
+        frappe.cache.delete_value(SUBSCRIPTION_STATUS_CACHE_KEY)
+        return
+    pairs = {(doc.customer, doc.seller)}
+    before = doc.get_doc_before_save()
+    if before:
+        pairs.add((before.customer, before.seller))
+    for customer, seller in pairs:
+        frappe.cache.hdel(SUBSCRIPTION_STATUS_CACHE_KEY, _subscription_status_field(customer, seller))
+
+
+def _clear_subscription_status_for(sub_names):
+    """Bulk UPDATE paths (expiry, approval) — doc events nahi chalte."""
+    if len(sub_names) > SUBSCRIPTION_STATUS_BULK_CLEAR:
+        clear_subscription_status_cache()
+        return
+    pairs = frappe.db.sql("""
+        SELECT DISTINCT customer, seller FROM `tabNewspaper Subscription`
+        WHERE name IN %(names)s
+    """, {"names": tuple(sub_names)})
+    for customer, seller in pairs:
+        frappe.cache.hdel(SUBSCRIPTION_STATUS_CACHE_KEY, _subscription_status_field(customer, seller))
+
+
+@frappe.whitelist()
+@instrument
 def get_seller_items(category=None, seller=None):
     if not category:
         return []
@@ -241,29 +385,80 @@ def get_seller_items(category=None, seller=None):
     target_date = nowdate()
     day = get_datetime(target_date).strftime("%A")
 
+    all_prices = find_prices_bulk([i.item_code for i in items], seller_territory, ALL_DAYS, target_date)
+
     for item in items:
         item["is_subscription_item"] = category_is_subscription
+        item_prices = all_prices[item.item_code]
 
-        result = find_price_recursive(item.item_code, seller_territory, day, target_date)
+        result = item_prices[day]
         item["price"]           = result["price"]
         item["price_available"] = result["price_available"]
         item["price_reason"]    = result["price_reason"]
         item["formatted_price"] = fmt_money(result["price"], currency="INR") if result["price_available"] else ""
 
-        day_prices = {}
-        for d in ALL_DAYS:
-            pr = find_price_recursive(item.item_code, seller_territory, d, target_date)
-            day_prices[d] = pr["price"] if pr["price_available"] else 0.0
-        item["day_prices"] = day_prices
+        item["day_prices"] = {
+            d: pr["price"] if pr["price_available"] else 0.0
+            for d, pr in item_prices.items()
+        }
 
     return items
 
+# ─── ACTIVE SUBSCRIPTION KEY ─────────────────────────────────────────────────
+def _active_subscription_key(customer, seller, primary_item_code):
+    """
+    (customer, seller, primary item) — ek waqt pe ek hi active subscription.
+    Teeno names milke varchar(140) se lambe ho sakte hain, isliye sha1 hex (40 chars).
+    """
+    return hashlib.sha1(f"{customer}::{seller}::{primary_item_code}".encode()).hexdigest()
+
+
+def set_active_subscription_key(doc, method=None):
+    """
+    hooks.py -> doc_events -> Newspaper Subscription -> validate
+    Accept Pending / Active → key set, baaki statuses → NULL (index se bahar).
+    """
+    primary = next((r for r in doc.get("schedule_items") or [] if r.is_primary_item), None)
+    if doc.status in ACTIVE_SUBSCRIPTION_STATUSES and primary and primary.item_code:
+        doc.active_key = _active_subscription_key(doc.customer, doc.seller, primary.item_code)
+    else:
+        doc.active_key = None
+
+
+def _insert_subscription(doc, today):
+    """
+    Insert karo; duplicate active subscription ho to unique index conflict deta hai.
+    Conflict wali subscription end_date nikal chuki ho (expiry cron abhi chala nahi)
+    to use expire karke ek baar retry. Returns conflicting row ya None.
+    """
+    for attempt in range(2):
+        frappe.db.savepoint("subscription_insert")
+        try:
+            doc.insert()
+            return None
+        except (frappe.UniqueValidationError, frappe.DuplicateEntryError):
+            frappe.db.rollback(save_point="subscription_insert")
+            existing = frappe.db.get_value(
+                "Newspaper Subscription", {"active_key": doc.active_key},
+                ["name", "status", "end_date"], as_dict=True
+            )
+            if not existing:
+                raise
+            if attempt or getdate(existing.end_date) >= getdate(today):
+                return existing
+            _set_subscriptions_status([existing.name], "Expired")
+            doc.name = None
+    return existing
+
+
 @frappe.whitelist()
+@instrument
 def create_subscription(
     customer, seller,
     schedule_items,
     start_date=None,
-    months=1
+    months=1,
+    auto_renew=0
 ):
     try:
         import json
@@ -296,38 +491,23 @@ def create_subscription(
         if not has_any_day:
             return {"status": "error", "message": "Please select at least one day for delivery."}
 
-        existing = frappe.db.sql("""
-            SELECT ns.name, ns.status
-            FROM `tabNewspaper Subscription` ns
-            JOIN `tabNewspaper Subscription Item` nsi ON nsi.parent = ns.name
-            WHERE ns.customer = %s AND ns.seller = %s
-              AND nsi.item_code = %s AND nsi.is_primary_item = 1
-              AND ns.status IN ('Active', 'Accept Pending')
-              AND ns.end_date >= %s
-        """, (customer, seller, primary_item_code, today), as_dict=True)
-
-        if existing:
-            return {
-                "status": "error",
-                "message": (
-                    f"Subscription already exists with status '{existing[0].status}' "
-                    f"({existing[0].name}). Wait for seller to accept or subscription to expire."
-                )
-            }
-
         doc = frappe.new_doc("Newspaper Subscription")
         doc.customer   = customer
         doc.seller     = seller
         doc.start_date = start_dt
         doc.end_date   = end_dt
         doc.status     = "Accept Pending"
+        doc.auto_renew     = 1 if int(auto_renew or 0) else 0
+        doc.renewal_months = int(months)
         doc.territory  = get_seller_territory(seller)
 
+        item_names = get_item_names([si.get("item_code") for si in schedule_items])
+
         for si in schedule_items:
             ic = si.get("item_code")
             if not ic:
                 continue
-            item_name_val = frappe.db.get_value("Item", ic, "item_name") or ic
+            item_name_val = item_names.get(ic) or ic
             child_row = doc.append("schedule_items", {})
             child_row.item_code       = ic
             child_row.item_name       = item_name_val
@@ -340,11 +520,20 @@ def create_subscription(
                     qty = 0
                 setattr(child_row, qty_field, qty)
 
+        # Duplicate check = active_key unique index pe insert conflict (race-safe)
         doc.flags.ignore_permissions = True
-        doc.insert()
+        existing = _insert_subscription(doc, today)
+        if existing:
+            return {
+                "status": "error",
+                "message": (
+                    f"Subscription already exists with status '{existing.status}' "
+                    f"({existing.name}). Wait for seller to accept or subscription to expire."
+                )
+            }
         frappe.db.commit()
 
-        primary_item_name = frappe.db.get_value("Item", primary_item_code, "item_name") or primary_item_code
+        primary_item_name = item_names.get(primary_item_code) or primary_item_code
         msg = f"Subscription request sent for '{primary_item_name}'. Waiting for seller approval."
 
         return {
@@ -358,6 +547,7 @@ def create_subscription(
         return {"status": "error", "message": str(e)}
 
 @frappe.whitelist()
+@instrument
 def get_seller_subscriptions(seller=None, status_filter=None):
     try:
         if not seller:
@@ -413,12 +603,13 @@ def _get_customer_email(customer_name):
 
 
 @frappe.whitelist()
+@instrument
 def process_subscription(sub_name, action):
     """
     action: 'accept' or 'reject'
     - accept: sets status=Active
     - reject: sets status=Cancelled
-    Dono cases me customer ka frontend realtime se auto-refresh hoga.
+    Customer ko commit ke baad ek hi batched 'customer_changes' event jaata hai.
     """
     try:
         sub = frappe.get_doc("Newspaper Subscription", sub_name)
@@ -431,26 +622,15 @@ def process_subscription(sub_name, action):
             sub.status = "Active"
             sub.flags.ignore_permissions = True
             sub.save()
-            frappe.db.commit()
 
-            # ✅ FIX 1: Custom realtime event — frontend ka subscription_update handler trigger hoga
-            if customer_email:
-                frappe.publish_realtime(
-                    event='subscription_update',
-                    message={
-                        'sub_name': sub_name,
-                        'action': 'accepted',
-                        'customer': customer_email
-                    },
-                    user=customer_email
-                )
-
-            # Existing: msgprint + Notification Log (bhi trigger hoga — double refresh safe hai)
+            # Notification Log + batched realtime event, ek hi commit mein
             _notify_customer_subscription(
                 customer=sub.customer,
                 sub_name=sub.name,
-                action="accepted"
+                action="accepted",
+                user_email=customer_email
             )
+            frappe.db.commit()
 
             return {
                 "status": "success",
@@ -464,25 +644,14 @@ def process_subscription(sub_name, action):
             sub.status = "Cancelled"
             sub.flags.ignore_permissions = True
             sub.save()
-            frappe.db.commit()
-
-            # ✅ FIX 2: Reject pe bhi realtime event
-            if customer_email:
-                frappe.publish_realtime(
-                    event='subscription_update',
-                    message={
-                        'sub_name': sub_name,
-                        'action': 'rejected',
-                        'customer': customer_email
-                    },
-                    user=customer_email
-                )
 
             _notify_customer_subscription(
                 customer=sub.customer,
                 sub_name=sub.name,
-                action="rejected"
+                action="rejected",
+                user_email=customer_email
             )
+            frappe.db.commit()
 
             return {
                 "status": "success",
@@ -496,212 +665,619 @@ def process_subscription(sub_name, action):
         return {"status": "error", "message": str(e)}
 
 
+# ─── BULK SUBSCRIPTION APPROVAL ──────────────────────────────────────────────
+SUBSCRIPTION_APPROVAL_CHUNK_SIZE = 100
+BULK_SUBSCRIPTION_RESULT_TTL = 24 * 60 * 60
+
+# action → (allowed current statuses, new status, notification action)
+SUBSCRIPTION_TRANSITIONS = {
+    "accept": (("Accept Pending",), "Active", "accepted"),
+    "reject": (("Accept Pending", "Active"), "Cancelled", "rejected"),
+}
+
+
+def _set_subscriptions_status(sub_names, status):
+    """
+    Ek UPDATE mein status transition. Inactive status pe active_key NULL —
+    taaki customer wahi item dobara subscribe kar sake.
+    """
+    if not sub_names:
+        return
+    key_update = "" if status in ACTIVE_SUBSCRIPTION_STATUSES else ", active_key = NULL"
+    frappe.db.sql(f"""
+        UPDATE `tabNewspaper Subscription`
+        SET status = %(status)s, modified = %(now)s, modified_by = %(user)s{key_update}
+        WHERE name IN %(names)s
+    """, {
+        "status": status,
+        "now":    frappe.utils.now(),
+        "user":   frappe.session.user,
+        "names":  tuple(sub_names),
+    })
+    clear_print_run_forecast()
+    _clear_subscription_status_for(sub_names)
+
+
+def _process_subscription_chunk(sub_names, action):
+    """
+    Ek chunk = ek transaction: status check (ek query), set-based UPDATE,
+    bulk Notification Log, per customer ek batched realtime event.
+    """
+    allowed, new_status, notify_action = SUBSCRIPTION_TRANSITIONS[action]
+    subs = {
+        r.name: r for r in frappe.db.sql("""
+            SELECT name, customer, status FROM `tabNewspaper Subscription`
+            WHERE name IN %s
+        """, (tuple(sub_names),), as_dict=True)
+    }
+
+    results, to_update = [], []
+    for name in sub_names:
+        sub = subs.get(name)
+        if not sub:
+            results.append({"sub_name": name, "status": "error", "message": "Subscription not found"})
+        elif sub.status not in allowed:
+            results.append({
+                "sub_name": name, "status": "error",
+                "message":  f"Cannot {action} — status is '{sub.status}'",
+            })
+        else:
+            to_update.append(sub)
+
+    _set_subscriptions_status([s.name for s in to_update], new_status)
+
+    emails = _get_customer_emails([s.customer for s in to_update], contact_fallback=False)
+    logs = []
+    for sub in to_update:
+        user_email = emails.get(sub.customer)
+        if user_email:
+            _, message = _subscription_notification_text(sub.name, notify_action)
+            queue_customer_change(user_email, "Newspaper Subscription", sub.name, notify_action, message=message)
+            logs.append((user_email, sub.name, notify_action))
+        results.append({"sub_name": sub.name, "status": "success", "new_status": new_status})
+    _insert_notification_logs(logs)
+
+    return results
+
+
+@frappe.whitelist()
+@instrument
+def bulk_process_subscriptions(sub_names, action):
+    """
+    Seller ka bulk approval queue — action: 'accept' or 'reject'.
+    Ek chunk tak ke requests turant process hote hain aur per-subscription results
+    return hote hain. Usse bade background job mein jaate hain; progress
+    'bulk_subscription_progress' event se aata hai aur final results
+    get_bulk_subscription_results(job_id) se milte hain.
+    """
+    try:
+        import json
+        if isinstance(sub_names, str):
+            sub_names = json.loads(sub_names)
+        sub_names = list(dict.fromkeys(s for s in (sub_names or []) if s))
+        if not sub_names:
+            return {"status": "error", "message": "No subscriptions selected"}
+        if action not in SUBSCRIPTION_TRANSITIONS:
+            return {"status": "error", "message": "Unknown action"}
+
+        if len(sub_names) <= SUBSCRIPTION_APPROVAL_CHUNK_SIZE:
+            results = _process_subscription_chunk(sub_names, action)
+            frappe.db.commit()
+            return {"status": "success", "results": results, "total": len(sub_names)}
+
+        job_id = f"bulk_subscription::{frappe.generate_hash(length=10)}"
+        frappe.enqueue(
+            "my_frappe_app.api.run_bulk_subscription_approval",
+            queue="long",
+            timeout=60 * 60,
+            job_id=job_id,
+            sub_names=sub_names,
+            action=action,
+            progress_user=frappe.session.user,
+            progress_id=job_id,
+        )
+        return {"status": "success", "job_id": job_id, "total": len(sub_names)}
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Bulk Subscription Approval Error")
+        return {"status": "error", "message": str(e)}
+
+
+def run_bulk_subscription_approval(sub_names, action, progress_user=None, progress_id=None):
+    """Background job — har chunk ek commit, results cache mein."""
+    results = []
+    total = len(sub_names)
+
+    for start in range(0, total, SUBSCRIPTION_APPROVAL_CHUNK_SIZE):
+        chunk = sub_names[start:start + SUBSCRIPTION_APPROVAL_CHUNK_SIZE]
+        try:
+            chunk_results = _process_subscription_chunk(chunk, action)
+            frappe.db.commit()
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(frappe.get_traceback(), "Bulk Subscription Approval Chunk Error")
+            chunk_results = [{"sub_name": n, "status": "error", "message": str(e)} for n in chunk]
+        results.extend(chunk_results)
+
+        if progress_user:
+            frappe.publish_realtime(
+                event="bulk_subscription_progress",
+                message={
+                    "job_id":    progress_id,
+                    "action":    action,
+                    "total":     total,
+                    "processed": len(results),
+                    "succeeded": sum(1 for r in results if r["status"] == "success"),
+                    "results":   chunk_results,
+                    "done":      len(results) >= total,
+                },
+                user=progress_user,
+            )
+
+    if progress_id:
+        frappe.cache.set_value(
+            f"bulk_subscription_result::{progress_id}", results,
+            expires_in_sec=BULK_SUBSCRIPTION_RESULT_TTL,
+        )
+    return results
+
+
+@frappe.whitelist()
+@instrument
+def get_bulk_subscription_results(job_id):
+    """Background bulk approval ke per-subscription results (24h tak)."""
+    results = frappe.cache.get_value(f"bulk_subscription_result::{job_id}")
+    if results is None:
+        return {"status": "pending", "job_id": job_id}
+    return {"status": "success", "job_id": job_id, "results": results}
+
+
 def _run_daily_orders(override_day=None, test_mode=False):
+    """
+    Ek waqt pe ek hi generation run — doosra run "Skipped" ledger row
+    ke saath wapas. Har run ka ledger: Scheduler Job Run (job_ledger.py).
+    """
     today    = nowdate()
     day_name = override_day if override_day else get_datetime(today).strftime("%A")
-    qty_field = DAY_QTY_FIELD.get(day_name, "monday_qty")
+
+    try:
+        with job_run("generate_daily_orders", exclusive=True, test_mode=test_mode) as run:
+            _generate_orders(run, today, day_name, test_mode)
+    except JobAlreadyRunning as e:
+        frappe.logger().warning(str(e))
+        return {"status": "skipped", "date": today, "day": day_name, "message": str(e)}
+
+    summary = (
+        f"Date:{today} Day:{day_name} Mode:{'TEST' if test_mode else 'PROD'} "
+        f"Total:{run.counts['total']} Created:{run.counts['created']} DN:{run.counts['dn']} "
+        f"Skipped:{run.counts['skipped']} Failed:{run.failed_count} Run:{run.name}"
+    )
+    if run.failed_count:
+        frappe.log_error(f"{summary}\nDetails: Scheduler Job Run {run.name}", "Daily Order Generation")
+    else:
+        frappe.logger().info(summary)
+
+    return {
+        "date":       today,
+        "day":        day_name,
+        "job_run":    run.name,
+        "total":      run.counts["total"],
+        "created":    run.counts["created"],
+        "dn_created": run.counts["dn"],
+        "skipped":    run.counts["skipped"],
+        "failed":     run.failures
+    }
+
+
+def _generate_orders(run, today, day_name, test_mode):
+    reset_trusted_order_cache()
 
     if test_mode:
         date_condition = "AND start_date <= %(today)s"
     else:
         date_condition = "AND start_date < %(today)s"
 
-    active_subs = frappe.db.sql(f"""
-        SELECT name, customer, seller, territory
-        FROM `tabNewspaper Subscription`
-        WHERE status = 'Active'
-          {date_condition}
-          AND end_date >= %(today)s
-    """, {"today": today}, as_dict=True)
+    with run.stage("fetch"):
+        # Hold (vacation pause) wali subscriptions set query mein hi bahar
+        active_subs = frappe.db.sql(f"""
+            SELECT name, customer, seller, territory
+            FROM `tabNewspaper Subscription` ns
+            WHERE status = 'Active'
+              {date_condition}
+              AND end_date >= %(today)s
+              AND NOT EXISTS (
+                  SELECT 1 FROM `tabNewspaper Subscription Hold` h
+                  WHERE h.parent = ns.name AND h.parenttype = 'Newspaper Subscription'
+                    AND %(today)s BETWEEN h.from_date AND h.to_date
+              )
+        """, {"today": today}, as_dict=True)
+
+        # Aaj ke weekday ki saari deliveries ek indexed query mein
+        day_schedule = get_day_schedule(day_name, [s.name for s in active_subs])
 
-    total = len(active_subs)
-    created = skipped = dn_created = 0
-    failed = []
+    run.count(total=len(active_subs))
 
     for sub in active_subs:
         try:
-            already = frappe.db.get_value("Sales Order", {
-                "custom_subscription_refereance": sub.name,
-                "transaction_date": today,
-                "docstatus": ["!=", 2]
-            }, "name")
+            with run.stage("fetch"):
+                already = frappe.db.get_value("Sales Order", {
+                    "custom_subscription_refereance": sub.name,
+                    "transaction_date": today,
+                    "docstatus": ["!=", 2]
+                }, "name")
             if already:
-                skipped += 1
+                run.count(skipped=1)
                 continue
 
-            schedule_items = frappe.db.get_all(
-                "Newspaper Subscription Item",
-                filters={"parent": sub.name},
-                fields=["item_code", "item_name"] + list(DAY_QTY_FIELD.values())
-            )
-
-            items_to_order = []
-            for si in schedule_items:
-                qty = int(getattr(si, qty_field, 0) or 0)
-                if qty > 0:
-                    items_to_order.append({"item_code": si.item_code, "qty": qty})
-
+            items_to_order = day_schedule.get(sub.name, [])
             if not items_to_order:
-                skipped += 1
-                continue
-
-            item_prices  = []
-            price_failed = False
-            for entry in items_to_order:
-                price_result = find_price_recursive(
-                    entry["item_code"], sub.territory, day_name, today
-                )
-                if not price_result["price_available"]:
-                    failed.append({
-                        "subscription": sub.name,
-                        "customer":     sub.customer,
-                        "item":         entry["item_code"],
-                        "reason":       price_result["price_reason"]
-                    })
-                    price_failed = True
-                    break
-                item_prices.append({
-                    "item_code": entry["item_code"],
-                    "qty":       entry["qty"],
-                    "price":     price_result["price"]
-                })
-
-            if price_failed:
+                run.count(skipped=1)
                 continue
 
-            so = frappe.new_doc("Sales Order")
-            so.customer                       = sub.customer
-            so.company                        = sub.seller
-            so.transaction_date               = today
-            so.delivery_date                  = today
-            so.territory                      = sub.territory
-            so.custom_subscription_refereance = sub.name
-
-            for ip in item_prices:
-                so.append("items", {
-                    "item_code":           ip["item_code"],
-                    "qty":                 ip["qty"],
-                    "rate":                ip["price"],
-                    "delivery_date":       today,
-                    "ignore_pricing_rule": 1
-                })
-
-            so.flags.ignore_permissions = True
-            _insert_sales_order_with_warehouse_fallback(so, sub.seller)
-            so.reload()
-            so.submit()
-            created += 1
+            failure = _create_subscription_order(run, sub, items_to_order, today, day_name)
+        except Exception as e:
+            frappe.log_error(frappe.get_traceback(), f"Daily Order Error: {sub.name}")
+            failure = {"stage": "sales_order", "reason": str(e)}
 
+        if failure:
+            run.fail({"subscription": sub.name, "customer": sub.customer, **failure})
+            # Retry queue — price fix / warehouse fix ke baad sirf yahi dobara chalega.
+            # Queue insert fail ho to bhi baaki raat ke orders rollback nahi hone chahiye.
             try:
-                dn = get_mapped_doc("Sales Order", so.name, {
-                    "Sales Order": {
-                        "doctype": "Delivery Note",
-                        "validation": {"docstatus": ["=", 1]}
-                    },
-                    "Sales Order Item": {
-                        "doctype": "Delivery Note Item",
-                        "field_map": {
-                            "name":   "so_detail",
-                            "parent": "against_sales_order"
-                        }
-                    }
-                })
+                queue_order_retry(sub, today, day_name, failure, job_run=run.name)
+            except Exception:
+                frappe.log_error(frappe.get_traceback(), f"Order Retry Queue Error: {sub.name}")
 
-                for item in dn.items:
-                    item.warehouse = None
 
-                dn.flags.ignore_permissions        = True
-                dn.flags.ignore_mandatory          = True
-                dn.flags.ignore_stock_validation   = True
-                dn.flags.ignore_validate_link      = True
+def _create_subscription_order(run, sub, items_to_order, order_date, day_name, trusted=None):
+    """
+    Ek subscription ka order_date wala SO (+ DN). Success pe None,
+    warna {"stage", "reason", "item"?, "so"?} — stage: price / sales_order / delivery_note.
+    Nightly run aur retry queue (order_retry.py) dono yahi use karte hain.
+    trusted=None → site config (trusted_orders.py); False → standard path.
+    """
+    if trusted is None:
+        trusted = trusted_mode_enabled()
+
+    item_prices = []
+    with run.stage("price"):
+        for entry in items_to_order:
+            price_result = find_price_recursive(
+                entry["item_code"], sub.territory, day_name, order_date
+            )
+            if not price_result["price_available"]:
+                return {
+                    "stage":  "price",
+                    "item":   entry["item_code"],
+                    "reason": price_result["price_reason"]
+                }
+            item_prices.append({
+                "item_code": entry["item_code"],
+                "qty":       entry["qty"],
+                "price":     price_result["price"]
+            })
 
-                dn.insert(ignore_mandatory=True)
+    try:
+        with run.stage("so_insert"):
+            if trusted:
+                # Prepared template, no reload — submit in-memory doc pe hi
+                so = build_sales_order(sub, item_prices, order_date)
+                so.insert()
+            else:
+                so = frappe.new_doc("Sales Order")
+                so.customer                       = sub.customer
+                so.company                        = sub.seller
+                so.transaction_date               = order_date
+                so.delivery_date                  = order_date
+                so.territory                      = sub.territory
+                so.custom_subscription_refereance = sub.name
+
+                for ip in item_prices:
+                    so.append("items", {
+                        "item_code":           ip["item_code"],
+                        "qty":                 ip["qty"],
+                        "rate":                ip["price"],
+                        "delivery_date":       order_date,
+                        "ignore_pricing_rule": 1
+                    })
 
-                dn.flags.ignore_permissions        = True
-                dn.flags.ignore_stock_validation   = True
-                frappe.flags.ignore_stock_ledger   = True
-                dn.submit()
+                so.flags.ignore_permissions = True
+                _insert_sales_order(so, sub.seller)
+                so.reload()
 
-                frappe.flags.ignore_stock_ledger   = False
-                dn_created += 1
+        with run.stage("so_submit"):
+            so.submit()
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), f"Daily Order Error: {sub.name}")
+        return {"stage": "sales_order", "reason": str(e)}
+    run.count(created=1)
 
-            except Exception as dn_err:
-                frappe.log_error(frappe.get_traceback(), f"Auto DN Error: {so.name}")
-                failed.append({
-                    "subscription": sub.name,
-                    "so":           so.name,
-                    "reason":       f"SO created but DN failed: {str(dn_err)}"
-                })
+    return _create_subscription_delivery_note(run, so.name, so=so if trusted else None)
 
-        except Exception as e:
-            failed.append({"subscription": sub.name, "reason": str(e)})
-            frappe.log_error(frappe.get_traceback(), f"Daily Order Error: {sub.name}")
 
-    summary = (
-        f"Date:{today} Day:{day_name} Mode:{'TEST' if test_mode else 'PROD'} "
-        f"Total:{total} Created:{created} DN:{dn_created} "
-        f"Skipped:{skipped} Failed:{len(failed)}"
-    )
-    if failed:
-        frappe.log_error(f"{summary}\n{failed}", "Daily Order Generation")
-    else:
-        frappe.logger().info(summary)
+def _create_subscription_delivery_note(run, so_name, so=None):
+    """
+    Submitted subscription SO ka DN. Success pe None, warna delivery_note failure.
+    so (in-memory, trusted path) diya ho to DB se dobara load nahi.
+    """
+    try:
+        with run.stage("dn_insert"):
+            if so is not None:
+                dn = build_delivery_note(so)
+            else:
+                dn = get_mapped_doc("Sales Order", so_name, SO_TO_DN_MAPPING)
 
-    return {
-        "date":       today,
-        "day":        day_name,
-        "total":      total,
-        "created":    created,
-        "dn_created": dn_created,
-        "skipped":    skipped,
-        "failed":     failed
-    }
+            for item in dn.items:
+                item.warehouse = None
+
+            dn.flags.ignore_permissions        = True
+            dn.flags.ignore_mandatory          = True
+            dn.flags.ignore_stock_validation   = True
+            dn.flags.ignore_validate_link      = True
+
+            dn.insert(ignore_mandatory=True)
+
+        with run.stage("dn_submit"):
+            dn.flags.ignore_permissions        = True
+            dn.flags.ignore_stock_validation   = True
+            frappe.flags.ignore_stock_ledger   = True
+            dn.submit()
+        run.count(dn=1)
+        return None
+
+    except Exception as dn_err:
+        frappe.log_error(frappe.get_traceback(), f"Auto DN Error: {so_name}")
+        return {
+            "stage":  "delivery_note",
+            "so":     so_name,
+            "reason": f"SO created but DN failed: {str(dn_err)}"
+        }
+    finally:
+        frappe.flags.ignore_stock_ledger = False
 
 
 @frappe.whitelist()
+@instrument
 def generate_daily_orders():
     """Production cron — start_date < today (next day se orders shuru)"""
     return _run_daily_orders(test_mode=False)
 
 
 @frappe.whitelist()
+@instrument
 def generate_daily_orders_test(test_day=None):
     """Test mode — start_date <= today (same day bhi chalega)"""
     return _run_daily_orders(override_day=test_day, test_mode=True)
 
-def _insert_sales_order_with_warehouse_fallback(so, seller_company):
-    try:
-        so.insert()
-    except frappe.exceptions.ValidationError as ve:
-        if "warehouse" in str(ve).lower():
-            wh = (
-                frappe.db.get_value("Warehouse", {"company": seller_company, "is_group": 0}, "name")
-                or frappe.db.get_value("Warehouse", {"is_group": 0}, "name")
+# ─── DEFAULT WAREHOUSE ───────────────────────────────────────────────────────
+DEFAULT_WAREHOUSE_CACHE_KEY = "my_frappe_app:default_warehouse"
+
+
+def get_default_warehouse(company):
+    """
+    Company ka leaf warehouse (na ho to koi bhi leaf warehouse).
+    Redis hash mein cached + frappe.flags mein per run — nightly job
+    mein har company ke liye ek hi lookup. Warehouse change → clear.
+    """
+    resolved = frappe.flags.setdefault("default_warehouse", {})
+    if company in resolved:
+        return resolved[company]
+
+    warehouse = frappe.cache.hget(DEFAULT_WAREHOUSE_CACHE_KEY, company)
+    record_cache_access("default_warehouse", hit=warehouse is not None)
+    if warehouse is None:
+        warehouse = (
+            frappe.db.get_value("Warehouse", {"company": company, "is_group": 0}, "name")
+            or frappe.db.get_value("Warehouse", {"is_group": 0}, "name")
+            or ""
+        )
+        frappe.cache.hset(DEFAULT_WAREHOUSE_CACHE_KEY, company, warehouse)
+
+    resolved[company] = warehouse or None
+    return resolved[company]
+
+
+def clear_default_warehouse_cache(doc=None, method=None, *args):
+    """hooks.py -> doc_events -> Warehouse -> after_insert / on_update / on_trash / after_rename"""
+    frappe.cache.delete_value(DEFAULT_WAREHOUSE_CACHE_KEY)
+    frappe.flags.default_warehouse = {}
+    frappe.flags.item_warehouse = {}
+
+
+def _stock_settings_warehouse(company):
+    """Stock Settings ka default warehouse — sirf tab jab woh isi company ka ho."""
+    warehouse = frappe.db.get_single_value("Stock Settings", "default_warehouse")
+    if warehouse and frappe.get_cached_value("Warehouse", warehouse, "company") == company:
+        return warehouse
+    return None
+
+
+def get_item_warehouses(item_codes, company):
+    """
+    {item_code: warehouse} — ERPNext jaisa order: Item Default (company ka)
+    → Item Group Default → Stock Settings → get_default_warehouse (last fallback).
+    Item Defaults ek query mein; per run frappe.flags mein.
+    """
+    resolved = frappe.flags.setdefault("item_warehouse", {})
+    codes = [c for c in dict.fromkeys(item_codes) if c and (company, c) not in resolved]
+    if codes:
+        meta = get_item_meta_many(codes)
+        groups = {m.get("item_group") for m in meta.values() if m.get("item_group")}
+        rows = frappe.db.sql("""
+            SELECT parenttype, parent, default_warehouse
+            FROM `tabItem Default`
+            WHERE company = %(company)s
+              AND IFNULL(default_warehouse, '') != ''
+              AND ((parenttype = 'Item' AND parent IN %(items)s)
+                OR (parenttype = 'Item Group' AND parent IN %(groups)s))
+        """, {"company": company, "items": tuple(codes), "groups": tuple(groups) or ("",)}, as_dict=True)
+        defaults = {(r.parenttype, r.parent): r.default_warehouse for r in rows}
+
+        fallback = _stock_settings_warehouse(company) or get_default_warehouse(company)
+        for code in codes:
+            group = (meta.get(code) or {}).get("item_group")
+            resolved[(company, code)] = (
+                defaults.get(("Item", code)) or defaults.get(("Item Group", group)) or fallback
             )
-            if wh:
-                for row in so.items:
-                    if not row.get("warehouse"):
-                        row.warehouse = wh
-                so.insert()
-            else:
-                raise
-        else:
-            raise
+    return {c: resolved.get((company, c)) for c in item_codes if c}
+
+
+def _insert_sales_order(so, seller_company):
+    """
+    Stock items pe warehouse pehle hi set (get_item_warehouses), phir ek hi
+    insert — warehouse validation fail hone ke baad dobara insert nahi.
+    """
+    missing = [row for row in so.items if not row.get("warehouse")]
+    if missing:
+        meta = get_item_meta_many(row.item_code for row in missing)
+        stock_rows = [row for row in missing if (meta.get(row.item_code) or {}).get("is_stock_item")]
+        warehouses = get_item_warehouses([row.item_code for row in stock_rows], seller_company)
+        for row in stock_rows:
+            if warehouses.get(row.item_code):
+                row.warehouse = warehouses[row.item_code]
+    so.insert()
+
+
+# ─── AUTO RENEWAL ────────────────────────────────────────────────────────────
+RENEWAL_CHUNK_SIZE = 500
+RENEWAL_METRICS_KEY = "my_frappe_app:subscription_renewal_metrics"
+RENEWAL_METRICS_KEEP = 60
+
+
+def renew_subscriptions():
+    """
+    Nightly — expiry cron se pehle (hooks.py). Auto-renew wali Active
+    subscriptions jinka end_date aaj ya usse pehle hai, unka end_date
+    renewal_months aage — base GREATEST(end_date, today), taaki missed
+    scheduler run ke baad bhi naya term aaj se aage ho. Same doc extend hota hai, isliye active_key,
+    schedule rows aur holds waise hi rehte hain — seller ko dobara
+    approve nahi karna padta.
+    Har chunk: ek UPDATE + bulk Notification Log + ek event per customer + commit.
+    """
+    import json
+    import time
+
+    started = time.monotonic()
+    today = nowdate()
+    due = frappe.db.sql("""
+        SELECT name, customer
+        FROM `tabNewspaper Subscription`
+        WHERE status = 'Active' AND auto_renew = 1 AND end_date <= %(today)s
+        ORDER BY name
+    """, {"today": today}, as_dict=True)
+
+    renewed = failed = notified = 0
+    for start in range(0, len(due), RENEWAL_CHUNK_SIZE):
+        chunk = due[start:start + RENEWAL_CHUNK_SIZE]
+        try:
+            frappe.db.sql("""
+                UPDATE `tabNewspaper Subscription`
+                SET end_date = DATE_ADD(
+                        GREATEST(end_date, %(today)s),
+                        INTERVAL GREATEST(IFNULL(renewal_months, 1), 1) MONTH
+                    ),
+                    renewal_count = IFNULL(renewal_count, 0) + 1,
+                    last_renewed_on = %(today)s,
+                    modified = %(now)s, modified_by = %(user)s
+                WHERE name IN %(names)s AND status = 'Active' AND auto_renew = 1
+            """, {
+                "today": today,
+                "now":   frappe.utils.now(),
+                "user":  frappe.session.user,
+                "names": tuple(s.name for s in chunk),
+            })
+
+            emails = _get_customer_emails([s.customer for s in chunk], contact_fallback=False)
+            logs = []
+            for sub in chunk:
+                user_email = emails.get(sub.customer)
+                if user_email:
+                    _, message = _subscription_notification_text(sub.name, "renewed")
+                    queue_customer_change(user_email, "Newspaper Subscription", sub.name, "renewed", message=message)
+                    logs.append((user_email, sub.name, "renewed"))
+            _insert_notification_logs(logs)
+
+            frappe.db.commit()
+            renewed  += len(chunk)
+            notified += len(logs)
+        except Exception:
+            frappe.db.rollback()
+            failed += len(chunk)
+            frappe.log_error(frappe.get_traceback(), "Subscription Renewal Error")
+
+    if renewed:
+        clear_print_run_forecast()
+        clear_subscription_status_cache()
+
+    metrics = {
+        "date":        today,
+        "due":         len(due),
+        "renewed":     renewed,
+        "failed":      failed,
+        "notified":    notified,
+        "duration_ms": int((time.monotonic() - started) * 1000),
+    }
+    frappe.cache.lpush(RENEWAL_METRICS_KEY, json.dumps(metrics))
+    frappe.cache.ltrim(RENEWAL_METRICS_KEY, 0, RENEWAL_METRICS_KEEP - 1)
+    frappe.logger().info(f"Subscription renewal: {metrics}")
+    return metrics
+
+
+@frappe.whitelist()
+@instrument
+def get_renewal_metrics():
+    """Pichle runs ke renewal metrics (latest pehle)."""
+    import json
+    frappe.only_for("System Manager")
+    rows = frappe.cache.lrange(RENEWAL_METRICS_KEY, 0, RENEWAL_METRICS_KEEP - 1) or []
+    return {"status": "success", "runs": [json.loads(r) for r in rows]}
+
+
+@frappe.whitelist()
+@instrument
+def set_subscription_auto_renew(sub_name, auto_renew, renewal_months=None):
+    """Customer app se auto-renew on / off."""
+    try:
+        sub = _get_own_subscription(sub_name)
+        if sub.status not in ACTIVE_SUBSCRIPTION_STATUSES:
+            return {"status": "error", "message": f"Cannot change — status is '{sub.status}'"}
+
+        sub.auto_renew = 1 if int(auto_renew or 0) else 0
+        if renewal_months:
+            sub.renewal_months = max(1, min(int(renewal_months), 12))
+        sub.flags.ignore_permissions = True
+        sub.save()
+
+        queue_customer_change(_get_customer_email(sub.customer), "Newspaper Subscription", sub.name, "auto_renew")
+        frappe.db.commit()
+        return {
+            "status":  "success",
+            "message": "Auto-renew turned on." if sub.auto_renew else "Auto-renew turned off.",
+        }
+    except frappe.PermissionError:
+        return {"status": "error", "message": _("Not permitted")}
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Subscription Auto Renew Error")
+        return {"status": "error", "message": str(e)}
+
 
 @frappe.whitelist()
+@instrument
 def expire_old_subscriptions():
     today = nowdate()
-    expired = frappe.db.sql("""
-        SELECT name FROM `tabNewspaper Subscription`
-        WHERE status IN ('Active', 'Accept Pending') AND end_date < %(today)s
-    """, {"today": today}, pluck=True)
-    for name in expired:
-        frappe.db.set_value("Newspaper Subscription", name, "status", "Expired")
-    if expired:
-        frappe.db.commit()
-    return {"expired_count": len(expired)}
+    with job_run("expire_old_subscriptions") as run:
+        with run.stage("fetch"):
+            expired = frappe.db.sql("""
+                SELECT name FROM `tabNewspaper Subscription`
+                WHERE status IN ('Active', 'Accept Pending') AND end_date < %(today)s
+            """, {"today": today}, pluck=True)
+        run.count(total=len(expired))
+        if expired:
+            _set_subscriptions_status(expired, "Expired")
+            frappe.db.commit()
+    return {"expired_count": len(expired), "job_run": run.name}
 
 @frappe.whitelist()
+@instrument
 def place_order(cart_data, customer, seller, pincode, society=None, delivery_address=None):
     try:
         import json
@@ -728,13 +1304,15 @@ def place_order(cart_data, customer, seller, pincode, society=None, delivery_add
         if hasattr(so, "custom_society") and society:
             so.custom_society = society
 
+        # Saare cart items ke prices + names ek saath
+        cart_prices = find_prices_bulk(list(cart_data), seller_territory, [day], target_date)
+        item_names  = get_item_names(list(cart_data))
+
         unavailable_items = []
         for item_code, qty in cart_data.items():
-            result = find_price_recursive(item_code, seller_territory, day, target_date)
+            result = cart_prices[item_code][day]
             if not result["price_available"]:
-                unavailable_items.append(
-                    frappe.db.get_value("Item", item_code, "item_name") or item_code
-                )
+                unavailable_items.append(item_names.get(item_code) or item_code)
                 continue
             so.append("items", {
                 "item_code": item_code,
@@ -751,7 +1329,7 @@ def place_order(cart_data, customer, seller, pincode, society=None, delivery_add
             }
 
         so.flags.ignore_permissions = True
-        so.insert()
+        _insert_sales_order(so, seller)
 
         return {
             "status": "success",
@@ -766,76 +1344,323 @@ def place_order(cart_data, customer, seller, pincode, society=None, delivery_add
         frappe.log_error(frappe.get_traceback(), "Place Order Error")
         return {"status": "error", "message": str(e)}
 
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+
+SCHEDULE_ITEM_FIELDS = [
+    "item_code", "item_name", "is_primary_item",
+    "monday_qty", "tuesday_qty", "wednesday_qty",
+    "thursday_qty", "friday_qty", "saturday_qty", "sunday_qty",
+]
+
+
+def _get_session_customer():
+    user_email = frappe.session.user
+    return (
+        frappe.db.get_value("Customer", {"email_id": user_email}, "name")
+        or frappe.db.get_value("Customer", {"user": user_email}, "name")
+    )
+
+
+def _decorate_customer_order(order):
+    order.is_subscription_order = bool(order.custom_subscription_refereance)
+
+    if order.docstatus == 0:
+        order.display_status = "Pending Acceptance"
+        order.can_cancel     = True
+        order.status_color   = "orange"
+    elif order.docstatus == 1:
+        order.can_cancel     = False
+        order.display_status = {
+            "To Deliver and Bill": "Accepted - Pending Delivery",
+            "To Bill":             "Delivered - Payment Due",
+            "Completed":           "Completed"
+        }.get(order.status, order.status)
+        order.status_color = "green" if order.status == "Completed" else "blue"
+    else:
+        order.display_status = "Cancelled"
+        order.status_color   = "red"
+        order.can_cancel     = False
+
+    order.formatted_total = fmt_money(order.grand_total, currency="INR")
+    order.formatted_date  = format_date(order.transaction_date)
+    return order
+
+
+def _attach_schedule_items(subs):
+    """Saari subscriptions ke schedule items + holds — do queries mein."""
+    if not subs:
+        return subs
+    rows = frappe.db.get_all(
+        "Newspaper Subscription Item",
+        filters={"parent": ["in", [s.name for s in subs]]},
+        fields=["parent"] + SCHEDULE_ITEM_FIELDS,
+        order_by="idx asc"
+    )
+    by_parent = {}
+    for row in rows:
+        by_parent.setdefault(row.pop("parent"), []).append(row)
+
+    holds = {}
+    for row in frappe.db.get_all(
+        "Newspaper Subscription Hold",
+        filters={"parent": ["in", [s.name for s in subs]], "parenttype": "Newspaper Subscription"},
+        fields=["name", "parent", "from_date", "to_date", "reason"],
+        order_by="from_date asc"
+    ):
+        holds.setdefault(row.pop("parent"), []).append(row)
+
+    for sub in subs:
+        sub.schedule_items  = by_parent.get(sub.name, [])
+        sub.holds           = holds.get(sub.name, [])
+        sub.formatted_start = format_date(sub.start_date)
+        sub.formatted_end   = format_date(sub.end_date)
+    return subs
+
+
+def _parse_sync_cursor(since):
+    """'<modified>|<name>' (ya {"modified", "name"}) → (datetime, name)."""
+    if not since:
+        return None
+    if isinstance(since, str) and since.strip().startswith("{"):
+        import json
+        since = json.loads(since)
+    if isinstance(since, dict):
+        modified, name = since.get("modified"), since.get("name") or ""
+    else:
+        modified, _sep, name = str(since).partition("|")
+    if not modified:
+        return None
+    return (get_datetime(modified), name)
+
+
+def _make_sync_cursor(rows, current=None):
+    best = current
+    for r in rows:
+        key = (get_datetime(r.modified), r.name)
+        if best is None or key > best:
+            best = key
+    if not best:
+        return None
+    return f"{best[0].isoformat(sep=' ', timespec='microseconds')}|{best[1]}"
+
+
+def _customer_order_rows(customer, cursor=None):
+    values = {"customer": customer}
+    cursor_condition = ""
+    if cursor:
+        values["ts"], values["cname"] = cursor
+        cursor_condition = "AND (so.modified > %(ts)s OR (so.modified = %(ts)s AND so.name > %(cname)s))"
+    return frappe.db.sql(f"""
+        SELECT so.name, so.transaction_date, so.delivery_date, so.grand_total,
+               so.docstatus, so.status, so.company as seller,
+               so.per_delivered, so.per_billed,
+               so.custom_subscription_refereance, so.modified
+        FROM `tabSales Order` so
+        WHERE so.customer = %(customer)s
+          {cursor_condition}
+        ORDER BY so.creation DESC
+    """, values, as_dict=True)
+
+
+def _customer_subscription_rows(customer, cursor=None):
+    values = {"customer": customer}
+    cursor_condition = ""
+    if cursor:
+        values["ts"], values["cname"] = cursor
+        cursor_condition = "AND (modified > %(ts)s OR (modified = %(ts)s AND name > %(cname)s))"
+    return frappe.db.sql(f"""
+        SELECT name, status, start_date, end_date, seller, auto_renew, renewal_months,
+               creation, modified
+        FROM `tabNewspaper Subscription`
+        WHERE customer = %(customer)s
+          {cursor_condition}
+        ORDER BY creation DESC
+    """, values, as_dict=True)
+
+
 @frappe.whitelist()
+@instrument
 def get_customer_orders(customer=None):
     try:
         if not customer:
-            user_email = frappe.session.user
-            customer = (
-                frappe.db.get_value("Customer", {"email_id": user_email}, "name")
-                or frappe.db.get_value("Customer", {"user": user_email}, "name")
-            )
+            customer = _get_session_customer()
         if not customer:
             return {"status": "error", "message": _("Customer not found")}
 
-        orders = frappe.db.sql("""
-            SELECT so.name, so.transaction_date, so.delivery_date, so.grand_total,
-                   so.docstatus, so.status, so.company as seller,
-                   so.per_delivered, so.per_billed,
-                   so.custom_subscription_refereance
-            FROM `tabSales Order` so
-            WHERE so.customer = %s
-            ORDER BY so.creation DESC
-        """, (customer,), as_dict=True)
-
-        for order in orders:
-            order.is_subscription_order = bool(order.custom_subscription_refereance)
-
-            if order.docstatus == 0:
-                order.display_status = "Pending Acceptance"
-                order.can_cancel     = True
-                order.status_color   = "orange"
-            elif order.docstatus == 1:
-                order.can_cancel     = False
-                order.display_status = {
-                    "To Deliver and Bill": "Accepted - Pending Delivery",
-                    "To Bill":             "Delivered - Payment Due",
-                    "Completed":           "Completed"
-                }.get(order.status, order.status)
-                order.status_color = "green" if order.status == "Completed" else "blue"
-            else:
-                order.display_status = "Cancelled"
-                order.status_color   = "red"
-                order.can_cancel     = False
+        orders = [_decorate_customer_order(o) for o in _customer_order_rows(customer)]
+        subs   = _attach_schedule_items(_customer_subscription_rows(customer))
 
-            order.formatted_total = fmt_money(order.grand_total, currency="INR")
-            order.formatted_date  = format_date(order.transaction_date)
+        return {
+            "status": "success",
+            "orders": orders,
+            "subscriptions": subs,
+            "cursor": _make_sync_cursor(orders + subs)
+        }
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Customer Orders Error")
+        return {"status": "error", "message": str(e)}
 
-        subs = frappe.db.sql("""
-            SELECT name, status, start_date, end_date, seller, creation
-            FROM `tabNewspaper Subscription`
-            WHERE customer = %s
-            ORDER BY creation DESC
-        """, (customer,), as_dict=True)
 
-        for sub in subs:
-            sub.schedule_items = frappe.db.get_all(
-                "Newspaper Subscription Item",
-                filters={"parent": sub.name},
-                fields=["item_code", "item_name", "is_primary_item",
-                        "monday_qty", "tuesday_qty", "wednesday_qty",
-                        "thursday_qty", "friday_qty", "saturday_qty", "sunday_qty"]
-            )
-            sub.formatted_start = format_date(sub.start_date)
-            sub.formatted_end   = format_date(sub.end_date)
+@frappe.whitelist()
+@instrument
+def get_customer_changes(since=None, customer=None):
+    """
+    Delta sync: cursor ke baad jo Sales Orders / Subscriptions bane, badle ya delete hue.
+    since = get_customer_orders / pichhle call ka 'cursor'. Cursor purana ho
+    (tombstone retention se bahar) ya na ho to full=True ke saath poora snapshot.
+    """
+    try:
+        if not customer:
+            customer = _get_session_customer()
+        if not customer:
+            return {"status": "error", "message": _("Customer not found")}
+
+        cursor = _parse_sync_cursor(since)
+        retention_start = get_datetime(frappe.utils.add_days(nowdate(), -SYNC_TOMBSTONE_RETENTION_DAYS))
+        full = cursor is None or cursor[0] < retention_start
+        if full:
+            cursor = None
+
+        orders = [_decorate_customer_order(o) for o in _customer_order_rows(customer, cursor)]
+        subs   = _attach_schedule_items(_customer_subscription_rows(customer, cursor))
 
-        return {"status": "success", "orders": orders, "subscriptions": subs}
+        tombstones = []
+        if cursor:
+            tombstones = frappe.db.sql("""
+                SELECT name, reference_doctype, reference_name, modified
+                FROM `tabCustomer Sync Tombstone`
+                WHERE customer = %(customer)s
+                  AND (modified > %(ts)s OR (modified = %(ts)s AND name > %(cname)s))
+            """, {"customer": customer, "ts": cursor[0], "cname": cursor[1]}, as_dict=True)
+
+        return {
+            "status":                "success",
+            "full":                  full,
+            "orders":                orders,
+            "subscriptions":         subs,
+            "removed_orders":        [t.reference_name for t in tombstones if t.reference_doctype == "Sales Order"],
+            "removed_subscriptions": [t.reference_name for t in tombstones if t.reference_doctype == "Newspaper Subscription"],
+            "cursor":                _make_sync_cursor(orders + subs + tombstones, cursor) or since
+        }
     except Exception as e:
-        frappe.log_error(frappe.get_traceback(), "Customer Orders Error")
+        frappe.log_error(frappe.get_traceback(), "Customer Changes Error")
+        return {"status": "error", "message": str(e)}
+
+
+# ─── SUBSCRIPTION HOLDS (vacation pause) ─────────────────────────────────────
+def _get_own_subscription(sub_name):
+    """Customer sirf apni subscription ke holds badal sakta hai."""
+    sub = frappe.get_doc("Newspaper Subscription", sub_name)
+    if "System Manager" not in frappe.get_roles() and sub.customer != _get_session_customer():
+        frappe.throw(_("Not permitted"), frappe.PermissionError)
+    return sub
+
+
+@frappe.whitelist()
+@instrument
+def add_subscription_hold(sub_name, from_date, to_date, reason=None):
+    """
+    from_date..to_date (dono inclusive) delivery pause. Aaj ka order midnight
+    pe ban chuka hota hai, isliye hold kal se hi shuru ho sakta hai.
+    """
+    try:
+        sub = _get_own_subscription(sub_name)
+        from_dt, to_dt = getdate(from_date), getdate(to_date)
+        tomorrow = getdate(frappe.utils.add_days(nowdate(), 1))
+
+        if sub.status not in ACTIVE_SUBSCRIPTION_STATUSES:
+            return {"status": "error", "message": f"Cannot pause — status is '{sub.status}'"}
+        if to_dt < from_dt:
+            return {"status": "error", "message": "To date must be on or after from date"}
+        if from_dt < tomorrow:
+            return {"status": "error", "message": "Hold can start from tomorrow onwards"}
+        if sub.end_date and from_dt > getdate(sub.end_date):
+            return {"status": "error", "message": "Hold must start before the subscription ends"}
+        for h in sub.holds:
+            if from_dt <= getdate(h.to_date) and to_dt >= getdate(h.from_date):
+                return {
+                    "status": "error",
+                    "message": f"Overlaps existing hold {format_date(h.from_date)} → {format_date(h.to_date)}"
+                }
+
+        sub.append("holds", {"from_date": from_dt, "to_date": to_dt, "reason": reason})
+        sub.flags.ignore_permissions = True
+        sub.save()
+
+        user_email = _get_customer_email(sub.customer)
+        queue_customer_change(user_email, "Newspaper Subscription", sub.name, "hold_added")
+        frappe.db.commit()
+
+        return {
+            "status":  "success",
+            "message": f"Delivery paused from {format_date(from_dt)} to {format_date(to_dt)}.",
+        }
+    except frappe.PermissionError:
+        return {"status": "error", "message": _("Not permitted")}
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Subscription Hold Error")
         return {"status": "error", "message": str(e)}
 
 
 @frappe.whitelist()
+@instrument
+def remove_subscription_hold(sub_name, hold_id):
+    """Hold hatao — jo hold chal raha hai uska aaj tak ka hissa rehne do."""
+    try:
+        sub = _get_own_subscription(sub_name)
+        hold = next((h for h in sub.holds if h.name == hold_id), None)
+        if not hold:
+            return {"status": "error", "message": "Hold not found"}
+
+        today = getdate(nowdate())
+        if getdate(hold.from_date) <= today:
+            if getdate(hold.to_date) <= today:
+                return {"status": "error", "message": "Hold is already over"}
+            hold.to_date = today
+        else:
+            sub.remove(hold)
+
+        sub.flags.ignore_permissions = True
+        sub.save()
+
+        user_email = _get_customer_email(sub.customer)
+        queue_customer_change(user_email, "Newspaper Subscription", sub.name, "hold_removed")
+        frappe.db.commit()
+
+        return {"status": "success", "message": "Delivery resumed."}
+    except frappe.PermissionError:
+        return {"status": "error", "message": _("Not permitted")}
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Subscription Hold Error")
+        return {"status": "error", "message": str(e)}
+
+
+def record_sync_tombstone(doc, method=None):
+    """
+    hooks.py -> doc_events -> Sales Order / Newspaper Subscription -> on_trash
+    cancel_order / reject delete_doc karte hain — delta sync ko pata chalna chahiye.
+    """
+    if not doc.get("customer"):
+        return
+    tomb = frappe.new_doc("Customer Sync Tombstone")
+    tomb.customer          = doc.customer
+    tomb.reference_doctype = doc.doctype
+    tomb.reference_name    = doc.name
+    tomb.action            = "deleted"
+    tomb.flags.ignore_permissions = True
+    tomb.insert()
+
+
+def clear_old_sync_tombstones():
+    """Daily scheduler — retention ke bahar ke tombstones hatao."""
+    frappe.db.sql("""
+        DELETE FROM `tabCustomer Sync Tombstone` WHERE modified < %s
+    """, (frappe.utils.add_days(nowdate(), -SYNC_TOMBSTONE_RETENTION_DAYS),))
+    frappe.db.commit()
+
+
+@frappe.whitelist()
+@instrument
 def cancel_order(order_id):
     try:
         doc = frappe.get_doc("Sales Order", order_id)
@@ -855,6 +1680,7 @@ def cancel_order(order_id):
         return {"status": "error", "message": str(e)}
 
 @frappe.whitelist()
+@instrument
 def process_order_workflow(order_id, action):
     try:
         doc = frappe.get_doc("Sales Order", order_id)
@@ -865,17 +1691,8 @@ def process_order_workflow(order_id, action):
                 return {"status": "error", "message": _("Already accepted.")}
             doc.submit()
 
-            # ✅ FIX 3: Order accept pe customer ko notify karo
-            if customer_email:
-                frappe.publish_realtime(
-                    event='order_update',
-                    message={
-                        'order_id': doc.name,
-                        'action': 'accepted',
-                        'customer': customer_email
-                    },
-                    user=customer_email
-                )
+            # Order accept pe customer ko notify karo (commit ke baad, batched)
+            queue_customer_change(customer_email, "Sales Order", doc.name, "accepted")
 
             return {
                 "status": "success",
@@ -887,17 +1704,8 @@ def process_order_workflow(order_id, action):
                 return {"status": "error", "message": _("Cannot reject accepted orders")}
             frappe.delete_doc("Sales Order", order_id, ignore_permissions=True)
 
-            # ✅ FIX 4: Order reject pe bhi notify karo
-            if customer_email:
-                frappe.publish_realtime(
-                    event='order_update',
-                    message={
-                        'order_id': order_id,
-                        'action': 'rejected',
-                        'customer': customer_email
-                    },
-                    user=customer_email
-                )
+            # Order reject pe bhi notify karo
+            queue_customer_change(customer_email, "Sales Order", order_id, "rejected", removed=True)
 
             return {"status": "success", "message": _("Order rejected")}
 
@@ -906,33 +1714,12 @@ def process_order_workflow(order_id, action):
                 return {"status": "error", "message": _("Accept the order first")}
             if doc.per_delivered >= 100:
                 return {"status": "error", "message": _("Already fully delivered")}
-            dn = get_mapped_doc("Sales Order", order_id, {
-                "Sales Order": {
-                    "doctype": "Delivery Note",
-                    "validation": {"docstatus": ["=", 1]}
-                },
-                "Sales Order Item": {
-                    "doctype": "Delivery Note Item",
-                    "field_map": {
-                        "name": "so_detail",
-                        "parent": "against_sales_order"
-                    }
-                }
-            })
+            dn = get_mapped_doc("Sales Order", order_id, SO_TO_DN_MAPPING)
             dn.insert(ignore_permissions=True)
             dn.submit()
 
-            # ✅ FIX 5: Delivery pe bhi customer notify karo
-            if customer_email:
-                frappe.publish_realtime(
-                    event='order_update',
-                    message={
-                        'order_id': order_id,
-                        'action': 'delivered',
-                        'customer': customer_email
-                    },
-                    user=customer_email
-                )
+            # Delivery pe bhi customer notify karo
+            queue_customer_change(customer_email, "Sales Order", order_id, "delivered")
 
             return {
                 "status": "success",
@@ -971,32 +1758,258 @@ def process_order_workflow(order_id, action):
         return {"status": "error", "message": str(e)}
 
 
-def _notify_customer_subscription(customer, sub_name, action):
+# ─── BULK ORDER WORKFLOW ─────────────────────────────────────────────────────
+BULK_ORDER_CHUNK_SIZE = 50
+BULK_ORDER_ACTIONS = ("accept", "reject", "deliver")
+
+
+def _chunk_orders_by_customer(orders, chunk_size):
+    """
+    Ek customer ke saare orders ek hi chunk mein — taaki har customer ko
+    poore job mein ek hi batched notification jaaye.
+    """
+    by_customer = {}
+    for o in orders:
+        by_customer.setdefault((o.customer, o.company), []).append(o)
+
+    chunk = []
+    for group in by_customer.values():
+        if chunk and len(chunk) + len(group) > chunk_size:
+            yield chunk
+            chunk = []
+        chunk.extend(group)
+    if chunk:
+        yield chunk
+
+
+def _deliver_order_group(orders):
+    """
+    Ek (customer, company) ke orders ka ek combined Delivery Note.
+    Combined fail ho to har order ka alag DN try karo.
+    Returns {order_name: (ok, message)}.
+    """
+    results = {}
+    dn = None
+    frappe.db.savepoint("bulk_dn_group")
+    try:
+        for o in orders:
+            dn = get_mapped_doc("Sales Order", o.name, SO_TO_DN_MAPPING, target_doc=dn)
+        dn.insert(ignore_permissions=True)
+        dn.submit()
+        for o in orders:
+            results[o.name] = (True, dn.name)
+        return results
+    except Exception:
+        frappe.db.rollback(save_point="bulk_dn_group")
+        if len(orders) == 1:
+            results[orders[0].name] = (False, frappe.get_traceback().strip().splitlines()[-1])
+            return results
+
+    for o in orders:
+        results.update(_deliver_order_group([o]))
+    return results
+
+
+def _process_bulk_order_chunk(chunk, action, customer_emails):
+    results = []
+
+    if action == "deliver":
+        groups = {}
+        for o in chunk:
+            if o.docstatus != 1:
+                results.append({"order_id": o.name, "status": "error", "message": _("Accept the order first")})
+            elif flt(o.per_delivered) >= 100:
+                results.append({"order_id": o.name, "status": "error", "message": _("Already fully delivered")})
+            else:
+                groups.setdefault((o.customer, o.company), []).append(o)
+
+        for group in groups.values():
+            group_results = _deliver_order_group(group)
+            for o in group:
+                ok, msg = group_results[o.name]
+                if ok:
+                    queue_customer_change(customer_emails.get(o.customer), "Sales Order", o.name, "delivered")
+                    results.append({"order_id": o.name, "status": "success", "delivery_note": msg})
+                else:
+                    results.append({"order_id": o.name, "status": "error", "message": msg})
+        return results
+
+    for o in chunk:
+        savepoint = f"bulk_order_{frappe.scrub(o.name)}"
+        frappe.db.savepoint(savepoint)
+        try:
+            if action == "accept":
+                if o.docstatus != 0:
+                    results.append({"order_id": o.name, "status": "error", "message": _("Already accepted.")})
+                    continue
+                frappe.get_doc("Sales Order", o.name).submit()
+                queue_customer_change(customer_emails.get(o.customer), "Sales Order", o.name, "accepted")
+            else:
+                if o.docstatus != 0:
+                    results.append({"order_id": o.name, "status": "error", "message": _("Cannot reject accepted orders")})
+                    continue
+                frappe.delete_doc("Sales Order", o.name, ignore_permissions=True)
+                queue_customer_change(customer_emails.get(o.customer), "Sales Order", o.name, "rejected", removed=True)
+            results.append({"order_id": o.name, "status": "success"})
+        except Exception as e:
+            frappe.db.rollback(save_point=savepoint)
+            frappe.log_error(frappe.get_traceback(), f"Bulk Order Workflow Error: {o.name}")
+            results.append({"order_id": o.name, "status": "error", "message": str(e)})
+    return results
+
+
+@frappe.whitelist()
+@instrument
+def bulk_process_order_workflow(order_ids, action):
+    """
+    Seller UI se bahut saare orders ek saath accept / reject / deliver.
+    Kaam background job mein hota hai; progress 'bulk_order_progress'
+    realtime event se seller ko stream hota hai.
+    """
+    try:
+        import json
+        if isinstance(order_ids, str):
+            order_ids = json.loads(order_ids)
+        order_ids = [o for o in (order_ids or []) if o]
+        if not order_ids:
+            return {"status": "error", "message": _("No orders selected")}
+        if action not in BULK_ORDER_ACTIONS:
+            return {"status": "error", "message": _("Unknown action")}
+
+        job_id = f"bulk_order_workflow::{frappe.generate_hash(length=10)}"
+        frappe.enqueue(
+            "my_frappe_app.api.run_bulk_order_workflow",
+            queue="long",
+            timeout=60 * 60,
+            job_id=job_id,
+            order_ids=order_ids,
+            action=action,
+            progress_user=frappe.session.user,
+            progress_id=job_id,
+        )
+        return {"status": "success", "job_id": job_id, "total": len(order_ids)}
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Bulk Order Workflow Error")
+        return {"status": "error", "message": str(e)}
+
+
+def run_bulk_order_workflow(order_ids, action, progress_user=None, progress_id=None):
+    """Background job — chunked commits, ek notification per customer, progress stream."""
+    orders = frappe.db.sql("""
+        SELECT name, customer, company, docstatus, per_delivered
+        FROM `tabSales Order`
+        WHERE name IN %s
+    """, (tuple(order_ids),), as_dict=True)
+
+    found = {o.name for o in orders}
+    results = [
+        {"order_id": name, "status": "error", "message": _("Order not found")}
+        for name in order_ids if name not in found
+    ]
+    customer_emails = _get_customer_emails([o.customer for o in orders], contact_fallback=False)
+    total = len(order_ids)
+
+    def _publish(done=False, chunk_results=None):
+        if not progress_user:
+            return
+        frappe.publish_realtime(
+            event="bulk_order_progress",
+            message={
+                "job_id":    progress_id,
+                "action":    action,
+                "total":     total,
+                "processed": len(results),
+                "succeeded": sum(1 for r in results if r["status"] == "success"),
+                "failed":    sum(1 for r in results if r["status"] != "success"),
+                "results":   chunk_results or [],
+                "done":      done,
+            },
+            user=progress_user,
+        )
+
+    for chunk in _chunk_orders_by_customer(orders, BULK_ORDER_CHUNK_SIZE):
+        try:
+            chunk_results = _process_bulk_order_chunk(chunk, action, customer_emails)
+            frappe.db.commit()
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(frappe.get_traceback(), "Bulk Order Workflow Chunk Error")
+            chunk_results = [{"order_id": o.name, "status": "error", "message": str(e)} for o in chunk]
+        results.extend(chunk_results)
+        _publish(chunk_results=chunk_results)
+
+    _publish(done=True, chunk_results=[r for r in results if r["status"] != "success"])
+    frappe.logger().info(
+        f"Bulk order {action}: total={total} "
+        f"ok={sum(1 for r in results if r['status'] == 'success')}"
+    )
+    return results
+
+
+def _subscription_notification_text(sub_name, action):
+    """(subject, message) — single aur bulk dono paths same text use karte hain."""
+    if action == "accepted":
+        subject = f"✅ Subscription {sub_name} Activated!"
+        message = (
+            f"Great news! Your subscription plan <b>{sub_name}</b> has been "
+            f"<b>accepted and activated</b> by the seller. "
+            f"Daily newspaper delivery will start automatically from tomorrow."
+        )
+    elif action == "renewed":
+        subject = f"🔄 Subscription {sub_name} Renewed"
+        message = (
+            f"Your subscription plan <b>{sub_name}</b> has been "
+            f"<b>renewed automatically</b>. Daily delivery continues without a break. "
+            f"You can turn off auto-renew anytime from My Subscriptions."
+        )
+    else:
+        subject = f"❌ Subscription {sub_name} Rejected"
+        message = (
+            f"Your subscription plan <b>{sub_name}</b> has been "
+            f"<b>rejected</b> by the seller. "
+            f"Please contact the seller or create a new subscription."
+        )
+    return subject, message
+
+
+def _insert_notification_logs(rows):
+    """
+    rows: [(user_email, sub_name, action)] — ek bulk_insert.
+    Notification Log ke per-doc hooks (har log pe alag realtime) skip hote hain;
+    customer ko coalesced 'customer_changes' event jaata hai.
+    """
+    if not rows:
+        return
+    now  = frappe.utils.now()
+    user = frappe.session.user
+    values = []
+    for user_email, sub_name, action in rows:
+        subject, message = _subscription_notification_text(sub_name, action)
+        values.append((
+            frappe.generate_hash(length=10), now, now, user, user,
+            subject, message, user_email, user, "Alert",
+            "Newspaper Subscription", sub_name, 0,
+        ))
+    frappe.db.bulk_insert("Notification Log", [
+        "name", "creation", "modified", "owner", "modified_by",
+        "subject", "email_content", "for_user", "from_user", "type",
+        "document_type", "document_name", "read",
+    ], values)
+
+
+def _notify_customer_subscription(customer, sub_name, action, user_email=None):
+    """
+    Notification Log insert + batched realtime event. Commit caller karta hai —
+    event usi commit ke baad publish hota hai.
+    """
     try:
-        user_email = _get_customer_email(customer)
+        user_email = user_email or _get_customer_email(customer)
         if not user_email:
             return
 
-        if action == "accepted":
-            subject = f"✅ Subscription {sub_name} Activated!"
-            message = (
-                f"Great news! Your subscription plan <b>{sub_name}</b> has been "
-                f"<b>accepted and activated</b> by the seller. "
-                f"Daily newspaper delivery will start automatically from tomorrow."
-            )
-        else:
-            subject = f"❌ Subscription {sub_name} Rejected"
-            message = (
-                f"Your subscription plan <b>{sub_name}</b> has been "
-                f"<b>rejected</b> by the seller. "
-                f"Please contact the seller or create a new subscription."
-            )
+        subject, message = _subscription_notification_text(sub_name, action)
 
-        frappe.publish_realtime(
-            event="msgprint",
-            message=message,
-            user=user_email
-        )
+        queue_customer_change(user_email, "Newspaper Subscription", sub_name, action, message=message)
 
         note = frappe.new_doc("Notification Log")
         note.subject          = subject
@@ -1007,12 +2020,12 @@ def _notify_customer_subscription(customer, sub_name, action):
         note.document_name    = sub_name
         note.flags.ignore_permissions = True
         note.insert()
-        frappe.db.commit()
 
     except Exception:
         frappe.log_error(frappe.get_traceback(), "Subscription Notification Error")
 
 @frappe.whitelist()
+@instrument
 def get_seller_orders(seller=None, status_filter=None):
     try:
         if not seller:
@@ -1056,6 +2069,7 @@ def get_seller_orders(seller=None, status_filter=None):
         return {"status": "error", "message": str(e)}
 
 @frappe.whitelist()
+@instrument
 def debug_price_setup(seller=None):
     result = {}
     if not seller:
@@ -1082,6 +2096,7 @@ def debug_price_setup(seller=None):
 
 
 @frappe.whitelist()
+@instrument
 def get_seller_sidebar_data():
     try:
         seller = frappe.db.get_value(
@@ -1159,6 +2174,7 @@ def get_seller_sidebar_data():
         return {"status": "error", "message": str(e)}
 
 @frappe.whitelist()
+@instrument
 def get_customers_by_pincode_society(pincode, society=None):
     try:
         if society:
@@ -1184,6 +2200,7 @@ def get_customers_by_pincode_society(pincode, society=None):
         return {"status": "error", "message": str(e)}
 
 @frappe.whitelist()
+@instrument
 def get_seller_customers(seller=None):
     try:
         if not seller:
@@ -1329,9 +2346,10 @@ def get_seller_customers(seller=None):
 import json
 import frappe
 from frappe import _
-from frappe.utils import nowdate, flt
+from frappe.utils import nowdate
 
 @frappe.whitelist()
+@instrument
 def create_invoice_from_sales_orders(sales_orders):
     if isinstance(sales_orders, str):
         sales_orders = json.loads(sales_orders)
@@ -1523,6 +2541,7 @@ def _get_income_account(item, company: str) -> str:
 
 
 @frappe.whitelist()
+@instrument
 def get_sales_order_items(order_names):
     if isinstance(order_names, str):
         order_names = json.loads(order_names)
@@ -0,0 +1,228 @@
+# ══════════════════════════════════════════════════════════════════
+# API BENCHMARK — query count + latency regression check
+#
+# Har endpoint synthetic dataset pe chalta hai; pehla run warmup
+# (caches bharne ke liye), phir `repeat` runs:
+#
+#   queries  — ek run ke frappe.db.sql calls (deterministic)
+#   p50_ms   — runs ka median wall time
+#
+# benchmark_baseline.json (checked in) se compare:
+#   queries > baseline.queries                   → regression
+#   p50_ms  > baseline.p50_ms * LATENCY_TOLERANCE → regression
+#   baseline wala case input data na mile          → failure
+#   case baseline mein nahi                       → warning (jab tak file
+#                                                   update_baseline se na bhare)
+#
+# Mutating cases (daily orders, invoice) savepoint ke andar chalte hain,
+# commit no-op rehta hai aur baad mein rollback — dataset nahi badalta.
+#
+#   bench --site bench.local generate-synthetic-data --scale 200
+#   bench --site bench.local execute my_frappe_app.benchmark.run
+#   bench --site bench.local execute my_frappe_app.benchmark.run --kwargs "{'update_baseline': 1}"
+# ══════════════════════════════════════════════════════════════════
+import json
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import frappe
+
+from my_frappe_app.instrumentation import SUM_FIELDS, _start_db_timing
+from my_frappe_app.synthetic_data import PREFIX
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "benchmark_baseline.json")
+LATENCY_TOLERANCE = 1.5
+DEFAULT_REPEAT = 5
+
+
+# ── Dataset picks ─────────────────────────────────────────────────
+
+def _seller():
+    return frappe.db.get_value("Company", {"name": ["like", f"{PREFIX} Seller%"]}, "name", order_by="name asc")
+
+
+def _customer():
+    return frappe.db.get_value(
+        "Newspaper Subscription", {"customer": ["like", f"{PREFIX} Customer%"], "seller": _seller()},
+        "customer", order_by="customer asc"
+    )
+
+
+def _invoice_candidate():
+    """Delivered, unbilled SO — na mile to daily orders chala ke banao (setup, measured nahi)."""
+    from my_frappe_app.api import _run_daily_orders
+
+    def pick():
+        return frappe.db.get_value("Sales Order", {
+            "company": _seller(), "docstatus": 1, "per_delivered": [">", 0], "per_billed": ["<", 100],
+        }, "name")
+
+    so = pick()
+    if not so:
+        _run_daily_orders(test_mode=True)
+        so = pick()
+    return {"sales_orders": json.dumps([so])} if so else None
+
+
+# ── Cases ─────────────────────────────────────────────────────────
+
+def _cases():
+    from my_frappe_app import api, delivery_calendar, forecast, receivables
+
+    seller = _seller()
+    customer = _customer()
+    category = f"{PREFIX} Newspapers"
+
+    return [
+        # (name, fn, kwargs or setup callable, mutating)
+        ("get_seller_items", api.get_seller_items, {"category": category, "seller": seller}, False),
+        ("get_seller_orders", api.get_seller_orders, {"seller": seller}, False),
+        ("get_seller_customers", api.get_seller_customers, {"seller": seller}, False),
+        ("get_seller_subscriptions", api.get_seller_subscriptions, {"seller": seller}, False),
+        ("get_customer_orders", api.get_customer_orders, {"customer": customer}, False),
+        ("get_customer_subscription_status", api.get_customer_subscription_status,
+         {"customer": customer, "seller": seller}, False),
+        ("get_receivables_aging", receivables.get_receivables_aging, {"company": seller}, False),
+        ("get_delivery_projection", delivery_calendar.get_delivery_projection, {"seller": seller}, False),
+        ("get_print_run_forecast", forecast.get_print_run_forecast, {"seller": seller, "refresh": 1}, False),
+        ("_run_daily_orders", api._run_daily_orders, {"test_mode": True}, True),
+        ("create_invoice_from_sales_orders", api.create_invoice_from_sales_orders, _invoice_candidate, True),
+    ]
+
+
+@contextmanager
+def _isolated(mutating: bool):
+    """Mutating case: savepoint + commit no-op, baad mein rollback."""
+    if not mutating:
+        yield
+        return
+    db = frappe.db
+    original_commit = db.commit
+    db.commit = lambda *args, **kwargs: None
+    db.savepoint("benchmark_case")
+    try:
+        yield
+    finally:
+        db.rollback(save_point="benchmark_case")
+        db.commit = original_commit
+
+
+def _measure(fn, kwargs: dict) -> dict:
+    stats = dict.fromkeys(SUM_FIELDS, 0)
+    # perf_stats set hone se @instrument nested call record nahi karta
+    frappe.local.perf_stats = stats
+    restore_db = _start_db_timing(stats)
+    start = time.perf_counter()
+    try:
+        fn(**kwargs)
+    finally:
+        wall_ms = (time.perf_counter() - start) * 1000
+        restore_db()
+        frappe.local.perf_stats = None
+    return {"queries": stats["queries"], "wall_ms": wall_ms, "db_ms": stats["db_ms"]}
+
+
+def _run_case(fn, kwargs_or_setup, mutating: bool, repeat: int) -> dict | None:
+    runs = []
+    for i in range(repeat + 1):
+        with _isolated(mutating):
+            kwargs = kwargs_or_setup() if callable(kwargs_or_setup) else kwargs_or_setup
+            if kwargs is None:
+                return None
+            result = _measure(fn, kwargs)
+        if i:  # pehla run warmup
+            runs.append(result)
+    return {
+        "queries": max(r["queries"] for r in runs),
+        "p50_ms":  round(statistics.median(r["wall_ms"] for r in runs), 2),
+        "max_ms":  round(max(r["wall_ms"] for r in runs), 2),
+        "db_ms":   round(statistics.median(r["db_ms"] for r in runs), 2),
+    }
+
+
+def _load_baseline() -> dict:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f).get("cases", {})
+
+
+def _write_baseline(results: dict):
+    """Chalaye gaye cases update, baaki baseline waisa hi."""
+    cases = _load_baseline()
+    cases.update({
+        name: {"queries": r["queries"], "p50_ms": r["p50_ms"]}
+        for name, r in results.items() if r
+    })
+    data = {
+        "_meta": {
+            "generated_on": frappe.utils.now(),
+            "note": "Regenerate with my_frappe_app.benchmark.run --kwargs \"{'update_baseline': 1}\"",
+        },
+        "cases": cases,
+    }
+    with open(BASELINE_PATH, "w") as f:
+        f.write(json.dumps(data, indent=1, sort_keys=True))
+
+
+def run(repeat=DEFAULT_REPEAT, cases=None, update_baseline=0):
+    """
+    Benchmark chalao. Regression pe exception (bench execute non-zero exit).
+    cases: comma-separated names — sirf wahi chalenge.
+    """
+    frappe.set_user("Administrator")
+    if not _seller():
+        frappe.throw("Benchmark dataset missing — run bench generate-synthetic-data first")
+
+    wanted = set(cases.split(",")) if isinstance(cases, str) and cases else None
+    baseline = _load_baseline()
+    results, regressions, unbaselined = {}, [], []
+
+    for name, fn, kwargs, mutating in _cases():
+        if wanted and name not in wanted:
+            continue
+        base = baseline.get(name) or {}
+        has_baseline = base.get("queries") is not None and base.get("p50_ms") is not None
+
+        r = _run_case(fn, kwargs, mutating, int(repeat))
+        results[name] = r
+        if r is None:
+            if has_baseline:
+                regressions.append(f"{name}: no input data")
+            print(f"{name:<36} SKIPPED (no input data)")
+            continue
+
+        if not has_baseline:
+            unbaselined.append(name)
+        flags = []
+        if base.get("queries") is not None and r["queries"] > base["queries"]:
+            flags.append(f"queries {r['queries']} > {base['queries']}")
+        if base.get("p50_ms") is not None and r["p50_ms"] > base["p50_ms"] * LATENCY_TOLERANCE:
+            flags.append(f"p50 {r['p50_ms']}ms > {base['p50_ms']}ms x{LATENCY_TOLERANCE}")
+        if flags:
+            regressions.append(f"{name}: " + "; ".join(flags))
+
+        print(
+            f"{name:<36} queries={r['queries']:<5} p50={r['p50_ms']:>9.2f}ms "
+            f"max={r['max_ms']:>9.2f}ms db={r['db_ms']:>9.2f}ms"
+            + (f"  REGRESSION ({'; '.join(flags)})" if flags else "")
+            + ("" if has_baseline else "  (no baseline)")
+        )
+
+    if int(update_baseline):
+        _write_baseline(results)
+        print(f"Baseline written: {BASELINE_PATH}")
+        return results
+
+    if unbaselined:
+        # Gate sirf baseline wale cases pe — baaki ke liye file bharni hai
+        print(
+            f"WARNING: {len(unbaselined)} case(s) without baseline, not gated: {', '.join(unbaselined)}\n"
+            "Run with --kwargs \"{'update_baseline': 1}\" on the synthetic dataset and commit the file."
+        )
+
+    if regressions:
+        frappe.throw("<br>".join(regressions), title="Benchmark Regression")
+    return results
@@ -0,0 +1,45 @@
+# ══════════════════════════════════════════════════════════════════
+# BENCH COMMANDS
+#
+#   bench --site bench.local generate-synthetic-data --scale 100000 --seed 42
+#   bench --site bench.local generate-synthetic-data --scale 5000 --reset
+# ══════════════════════════════════════════════════════════════════
+import time
+
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("generate-synthetic-data")
+@click.option("--scale", default=1000, type=int, help="Customers (har ek ki current subscription)")
+@click.option("--seed", default=42, type=int, help="Random seed — same seed + scale, same dataset")
+@click.option("--sellers", default=None, type=int, help="Seller companies (default scale / 5000, min 2)")
+@click.option("--items", default=20, type=int, help="Newspaper items")
+@click.option("--states", default=3, type=int)
+@click.option("--cities-per-state", default=3, type=int)
+@click.option("--history-months", default=12, type=int, help="Monthly SO / DN / invoice history per customer")
+@click.option("--reset", is_flag=True, default=False, help="Pehle purana BENCH data delete karo")
+@pass_context
+def generate_synthetic_data(context, scale, seed, sellers, items, states, cities_per_state,
+                            history_months, reset):
+    """Load testing ke liye synthetic newspaper distribution dataset."""
+    import frappe
+
+    from my_frappe_app.synthetic_data import generate
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        start = time.perf_counter()
+        result = generate(
+            customers=scale, sellers=sellers, items=items, states=states,
+            cities_per_state=cities_per_state, history_months=history_months,
+            seed=seed, reset=reset, verbose=True,
+        )
+        click.echo(f"Done in {time.perf_counter() - start:.1f}s: {result}")
+    finally:
+        frappe.destroy()
+
+
+commands = [generate_synthetic_data]
@@ -0,0 +1,225 @@
+# ══════════════════════════════════════════════════════════════════
+# DELIVERY CALENDAR — subscription schedule ka date-range projection
+#
+# UI pehle monday_qty…sunday_qty se khud calendar banata tha. Ab server
+# har (subscription, item) ko date range pe expand karta hai:
+#
+#   dates    = [d0, d1, ...]              (ek baar)
+#   weekday  = [0..6 per date]            (ek baar)
+#   qty[i]   = week_qty[weekday[i]]       (subscription window mein, holds chhod ke)
+#   rate[i]  = rule_price[rule[i]][weekday[i]]
+#
+# Queries: subscriptions (1) + schedule items + holds (2) + har territory ke
+# price rules (1) + day prices (1). Seller ki saari subscriptions ka
+# ek mahina ek call mein.
+#
+# Payload columnar hai — series metadata alag lists, qty / rate
+# per series ek list (dates ke saath aligned).
+#
+# Frontend call:
+#   /api/method/my_frappe_app.delivery_calendar.get_delivery_projection
+# ══════════════════════════════════════════════════════════════════
+from bisect import bisect_left, bisect_right
+
+import frappe
+from frappe.utils import add_days, date_diff, flt, getdate, nowdate
+
+from my_frappe_app.api import (
+    ALL_DAYS,
+    DAY_QTY_FIELD,
+    _attach_schedule_items,
+    _get_session_customer,
+    _ordered_price_rules,
+    _territory_chain,
+    get_seller_territory,
+)
+from my_frappe_app.instrumentation import instrument
+
+MAX_PROJECTION_DAYS = 62
+
+# date.weekday() → ALL_DAYS index (Monday = 0) same hai
+WEEK_QTY_FIELDS = [DAY_QTY_FIELD[d] for d in ALL_DAYS]
+
+
+def _date_range(from_date, to_date):
+    start = getdate(from_date)
+    days = date_diff(to_date, start) + 1
+    dates = [add_days(start, i) for i in range(days)]
+    return dates, [d.weekday() for d in dates]
+
+
+def _price_matrix(item_codes, territory, dates, weekdays):
+    """
+    {item_code: [rate per date]} — har date pe wahi rule jo find_price_recursive
+    us date ke liye chunta (nearest territory, phir start_date desc).
+    Rules precedence order mein aate hain; har rule apni window ki
+    abhi tak khali dates bhar deta hai.
+    """
+    rules = _ordered_price_rules(item_codes, _territory_chain(territory))
+    n = len(dates)
+
+    rule_at = {ic: [None] * n for ic in item_codes}
+    for r in rules:
+        if not r.start_date:
+            continue
+        lo = bisect_left(dates, getdate(r.start_date))
+        hi = bisect_right(dates, getdate(r.end_date)) if r.end_date else n
+        slots = rule_at.get(r.item_code)
+        if slots is None:
+            continue
+        for i in range(lo, hi):
+            if slots[i] is None:
+                slots[i] = r.name
+
+    used = {name for slots in rule_at.values() for name in slots if name}
+    week_price = {}
+    if used:
+        for row in frappe.db.get_all(
+            "Daily Price Detail",
+            filters={"parent": ["in", list(used)]},
+            fields=["parent", "day", "price"]
+        ):
+            if row.day in ALL_DAYS:
+                week = week_price.setdefault(row.parent, [None] * 7)
+                idx = ALL_DAYS.index(row.day)
+                if week[idx] is None:
+                    week[idx] = flt(row.price)
+
+    matrix = {}
+    for ic, slots in rule_at.items():
+        matrix[ic] = [
+            flt((week_price.get(rule) or [0.0] * 7)[wd] or 0.0) if rule else 0.0
+            for rule, wd in zip(slots, weekdays, strict=True)
+        ]
+    return matrix
+
+
+def project_subscriptions(subs, from_date, to_date):
+    """
+    subs: schedule_items attached rows (name, customer, seller, territory,
+    start_date, end_date, status). Delivery window _run_daily_orders jaisi:
+    start_date < date <= end_date.
+    """
+    dates, weekdays = _date_range(from_date, to_date)
+    n = len(dates)
+
+    by_territory = {}
+    for sub in subs:
+        territory = sub.territory or get_seller_territory(sub.seller)
+        by_territory.setdefault(territory, set()).update(
+            si.item_code for si in sub.schedule_items if si.item_code
+        )
+    prices = {
+        (territory, ic): row
+        for territory, codes in by_territory.items()
+        for ic, row in _price_matrix(list(codes), territory, dates, weekdays).items()
+    }
+
+    series = {
+        "subscription": [], "customer": [], "status": [],
+        "item_code": [], "item_name": [], "is_primary_item": [],
+    }
+    qty_rows, rate_rows, amount_totals, qty_totals = [], [], [], []
+    day_qty = [0] * n
+    day_amount = [0.0] * n
+
+    for sub in subs:
+        territory = sub.territory or get_seller_territory(sub.seller)
+        lo = bisect_right(dates, getdate(sub.start_date))
+        hi = bisect_right(dates, getdate(sub.end_date)) if sub.end_date else n
+        if lo >= hi:
+            continue
+
+        # Delivery mask: subscription window minus hold periods
+        deliver = [lo <= i < hi for i in range(n)]
+        for h in sub.get("holds") or []:
+            h_lo = bisect_left(dates, getdate(h.from_date))
+            h_hi = bisect_right(dates, getdate(h.to_date))
+            for i in range(h_lo, h_hi):
+                deliver[i] = False
+
+        for si in sub.schedule_items:
+            if not si.item_code:
+                continue
+            week = [int(si.get(f) or 0) for f in WEEK_QTY_FIELDS]
+            qty = [week[wd] if ok else 0 for ok, wd in zip(deliver, weekdays, strict=True)]
+            rate = prices.get((territory, si.item_code)) or [0.0] * n
+            amounts = [q * r for q, r in zip(qty, rate, strict=True)]
+
+            series["subscription"].append(sub.name)
+            series["customer"].append(sub.customer)
+            series["status"].append(sub.status)
+            series["item_code"].append(si.item_code)
+            series["item_name"].append(si.item_name or si.item_code)
+            series["is_primary_item"].append(int(si.is_primary_item or 0))
+            qty_rows.append(qty)
+            rate_rows.append(rate)
+            qty_totals.append(sum(qty))
+            amount_totals.append(flt(sum(amounts), 2))
+
+            day_qty = [a + b for a, b in zip(day_qty, qty, strict=True)]
+            day_amount = [a + b for a, b in zip(day_amount, amounts, strict=True)]
+
+    return {
+        "dates":    [str(d) for d in dates],
+        "weekdays": [ALL_DAYS[wd] for wd in weekdays],
+        "series":   series,
+        "qty":      qty_rows,
+        "rate":     rate_rows,
+        "series_totals": {"qty": qty_totals, "amount": amount_totals},
+        "day_totals": {
+            "qty":    day_qty,
+            "amount": [flt(a, 2) for a in day_amount],
+        },
+        "grand_total": flt(sum(day_amount), 2),
+    }
+
+
+@frappe.whitelist()
+@instrument
+def get_delivery_projection(seller=None, customer=None, subscription=None,
+                            from_date=None, to_date=None, include_pending=0):
+    """
+    Upcoming deliveries + expected bill. Filters: seller / customer / subscription.
+    Kuch na diya ho to logged-in customer ki subscriptions.
+    Default range: kal se 30 din.
+    """
+    try:
+        from_date = getdate(from_date or add_days(nowdate(), 1))
+        to_date   = getdate(to_date or add_days(from_date, 29))
+        if to_date < from_date:
+            return {"status": "error", "message": "to_date must be after from_date"}
+        if date_diff(to_date, from_date) + 1 > MAX_PROJECTION_DAYS:
+            return {"status": "error", "message": f"Range cannot exceed {MAX_PROJECTION_DAYS} days"}
+
+        if not (seller or customer or subscription):
+            customer = _get_session_customer()
+            if not customer:
+                return {"status": "error", "message": "Customer not found"}
+
+        statuses = ["Active", "Accept Pending"] if int(include_pending or 0) else ["Active"]
+        filters = {
+            "status":     ["in", statuses],
+            "start_date": ["<", to_date],
+            "end_date":   [">=", from_date],
+        }
+        if seller:
+            filters["seller"] = seller
+        if customer:
+            filters["customer"] = customer
+        if subscription:
+            filters["name"] = subscription
+
+        subs = frappe.get_all(
+            "Newspaper Subscription",
+            filters=filters,
+            fields=["name", "customer", "seller", "territory", "status", "start_date", "end_date"],
+            order_by="customer asc, name asc"
+        )
+        _attach_schedule_items(subs)
+
+        projection = project_subscriptions(subs, from_date, to_date)
+        return {"status": "success", "subscriptions": len(subs), **projection}
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Delivery Projection Error")
+        return {"status": "error", "message": str(e)}
@@ -0,0 +1,163 @@
+# ══════════════════════════════════════════════════════════════════
+# PRINT-RUN FORECAST — kal kitni copies chahiye (per seller / item / pincode)
+#
+# Publisher ko midnight se pehle copy count chahiye, jabki Sales Orders
+# _run_daily_orders ke baad hi bante hain. Yahan:
+#
+#   subscriptions: Active + kal delivery window mein + hold nahi → SUM(qty)
+#                  (Subscription Schedule Day pe ek grouped query)
+#   ad-hoc:        kal ki delivery_date wale non-subscription Sales Orders
+#
+# Pincode = Sales Order ka delivery address, warna customer ka primary address.
+#
+# Result Redis mein cached — Newspaper Subscription / ad-hoc Sales Order
+# change hote hi poora cache clear (hooks.py + bulk status updates).
+#
+# Frontend call:
+#   /api/method/my_frappe_app.forecast.get_print_run_forecast
+# ══════════════════════════════════════════════════════════════════
+import frappe
+from frappe.utils import add_days, cint, getdate, nowdate
+
+from my_frappe_app.instrumentation import instrument, record_cache_access
+
+FORECAST_CACHE_KEY = "my_frappe_app:print_run_forecast"
+
+_CUSTOMER_PINCODE_SQL = """
+    SELECT dl.link_name AS customer, MAX(a.pincode) AS pincode
+    FROM `tabAddress` a
+    JOIN `tabDynamic Link` dl ON dl.parent = a.name AND dl.parenttype = 'Address'
+    WHERE dl.link_doctype = 'Customer' AND a.is_primary_address = 1
+    GROUP BY dl.link_name
+"""
+
+
+def _subscription_demand(target_date, seller=None):
+    seller_condition = "AND ns.seller = %(seller)s" if seller else ""
+
+    # Subscription Schedule Day pe weekday index scan.
+    # Delivery window _run_daily_orders jaisi: start_date < date <= end_date
+    return frappe.db.sql(f"""
+        SELECT ns.seller, ssd.item_code,
+               MAX(i.item_name) AS item_name,
+               COALESCE(cp.pincode, '') AS pincode,
+               SUM(ssd.qty) AS qty,
+               COUNT(DISTINCT ns.name) AS subscriptions
+        FROM `tabSubscription Schedule Day` ssd
+        JOIN `tabNewspaper Subscription` ns ON ns.name = ssd.subscription
+        LEFT JOIN `tabItem` i ON i.name = ssd.item_code
+        LEFT JOIN ({_CUSTOMER_PINCODE_SQL}) cp ON cp.customer = ns.customer
+        WHERE ssd.weekday = %(weekday)s
+          AND ns.status = 'Active'
+          AND ns.start_date < %(date)s
+          AND ns.end_date >= %(date)s
+          AND NOT EXISTS (
+              SELECT 1 FROM `tabNewspaper Subscription Hold` h
+              WHERE h.parent = ns.name AND h.parenttype = 'Newspaper Subscription'
+                AND %(date)s BETWEEN h.from_date AND h.to_date
+          )
+          {seller_condition}
+        GROUP BY ns.seller, ssd.item_code, COALESCE(cp.pincode, '')
+    """, {
+        "date":    target_date,
+        "weekday": getdate(target_date).strftime("%A"),
+        "seller":  seller,
+    }, as_dict=True)
+
+
+def _adhoc_demand(target_date, seller=None):
+    seller_condition = "AND so.company = %(seller)s" if seller else ""
+    return frappe.db.sql(f"""
+        SELECT so.company AS seller, soi.item_code,
+               MAX(soi.item_name) AS item_name,
+               COALESCE(sa.pincode, cp.pincode, '') AS pincode,
+               SUM(soi.qty - IFNULL(soi.delivered_qty, 0)) AS qty,
+               COUNT(DISTINCT so.name) AS orders
+        FROM `tabSales Order` so
+        JOIN `tabSales Order Item` soi ON soi.parent = so.name
+        LEFT JOIN `tabAddress` sa ON sa.name = so.customer_address
+        LEFT JOIN ({_CUSTOMER_PINCODE_SQL}) cp ON cp.customer = so.customer
+        WHERE so.docstatus < 2
+          AND so.delivery_date = %(date)s
+          AND IFNULL(so.custom_subscription_refereance, '') = ''
+          AND so.status NOT IN ('Closed', 'Completed')
+          {seller_condition}
+        GROUP BY so.company, soi.item_code, COALESCE(sa.pincode, cp.pincode, '')
+        HAVING qty > 0
+    """, {"date": target_date, "seller": seller}, as_dict=True)
+
+
+def compute_print_run_forecast(target_date, seller=None):
+    """Subscription + ad-hoc demand ko (seller, item, pincode) pe merge karo."""
+    merged = {}
+
+    def _row(r):
+        key = (r.seller, r.item_code, r.pincode)
+        if key not in merged:
+            merged[key] = {
+                "seller": r.seller, "item_code": r.item_code, "item_name": r.item_name,
+                "pincode": r.pincode, "subscription_qty": 0, "adhoc_qty": 0,
+                "subscriptions": 0, "orders": 0,
+            }
+        return merged[key]
+
+    for r in _subscription_demand(target_date, seller):
+        row = _row(r)
+        row["subscription_qty"] += cint(r.qty)
+        row["subscriptions"]    += cint(r.subscriptions)
+    for r in _adhoc_demand(target_date, seller):
+        row = _row(r)
+        row["adhoc_qty"] += cint(r.qty)
+        row["orders"]    += cint(r.orders)
+
+    rows = sorted(merged.values(), key=lambda r: (r["seller"], r["item_code"], r["pincode"]))
+    titles = {}
+    for r in rows:
+        r["total_qty"] = r["subscription_qty"] + r["adhoc_qty"]
+        t = titles.setdefault((r["seller"], r["item_code"]), {
+            "seller": r["seller"], "item_code": r["item_code"],
+            "item_name": r["item_name"], "total_qty": 0,
+        })
+        t["total_qty"] += r["total_qty"]
+
+    return {
+        "date":      str(getdate(target_date)),
+        "rows":      rows,
+        "titles":    list(titles.values()),
+        "total_qty": sum(r["total_qty"] for r in rows),
+        "generated_on": frappe.utils.now(),
+    }
+
+
+@frappe.whitelist()
+@instrument
+def get_print_run_forecast(seller=None, target_date=None, refresh=0):
+    """
+    Kal (ya target_date) ka copy count per seller / item / pincode.
+    Cached — subscription / ad-hoc order change pe hi recompute hota hai.
+    """
+    try:
+        target_date = str(getdate(target_date or add_days(nowdate(), 1)))
+        field = f"{seller or '*'}|{target_date}"
+
+        forecast = None if cint(refresh) else frappe.cache.hget(FORECAST_CACHE_KEY, field)
+        record_cache_access("print_run_forecast", hit=forecast is not None)
+        if forecast is None:
+            forecast = compute_print_run_forecast(target_date, seller)
+            frappe.cache.hset(FORECAST_CACHE_KEY, field, forecast)
+
+        return {"status": "success", **forecast}
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Print Run Forecast Error")
+        return {"status": "error", "message": str(e)}
+
+
+def clear_print_run_forecast(doc=None, method=None, *args):
+    """
+    hooks.py -> doc_events -> Newspaper Subscription / Sales Order
+    Subscription orders (custom_subscription_refereance) demand mein count
+    nahi hote, unke changes pe cache mat chhedo.
+    """
+    if doc is not None and doc.doctype == "Sales Order" and doc.get("custom_subscription_refereance"):
+        return
+    frappe.cache.delete_value(FORECAST_CACHE_KEY)
@@ -19,12 +19,99 @@ get_website_user_home_page = "my_frappe_app.utils.get_home_page"
 # on_invoice_submit_hook is defined in payment_utils.py (NOT api.py)
 doc_events = {
     "Sales Invoice": {
-        "on_submit": "my_frappe_app.payment_utils.on_invoice_submit_hook",
+        "on_submit": [
+            "my_frappe_app.payment_utils.on_invoice_submit_hook",
+            "my_frappe_app.receivables.on_sales_invoice_change",
+        ],
+        "on_cancel": "my_frappe_app.receivables.on_sales_invoice_change",
+    },
+    # Delta sync ke liye delete tombstones
+    # Print-run forecast cache bhi yahin clear hota hai
+    "Sales Order": {
+        "on_update": "my_frappe_app.forecast.clear_print_run_forecast",
+        "on_submit": "my_frappe_app.forecast.clear_print_run_forecast",
+        "on_cancel": "my_frappe_app.forecast.clear_print_run_forecast",
+        "on_trash": [
+            "my_frappe_app.api.record_sync_tombstone",
+            "my_frappe_app.forecast.clear_print_run_forecast",
+        ],
+    },
+    "Newspaper Subscription": {
+        # Duplicate guard: (customer, seller, primary item) unique active key
+        "validate": "my_frappe_app.api.set_active_subscription_key",
+        # Subscription Schedule Day rows sync karo
+        "on_update": [
+            "my_frappe_app.subscription_schedule.sync_subscription_schedule",
+            "my_frappe_app.forecast.clear_print_run_forecast",
+            "my_frappe_app.api.clear_subscription_status_cache",
+        ],
+        "on_trash": [
+            "my_frappe_app.api.record_sync_tombstone",
+            "my_frappe_app.subscription_schedule.delete_subscription_schedule",
+            "my_frappe_app.forecast.clear_print_run_forecast",
+            "my_frappe_app.api.clear_subscription_status_cache",
+        ],
+    },
+    # Item meta cache (item_name / group / uom) reset karo
+    "Item": {
+        "on_update": "my_frappe_app.item_meta.clear_item_meta_cache",
+        "on_trash": "my_frappe_app.item_meta.clear_item_meta_cache",
+        "after_rename": "my_frappe_app.item_meta.clear_item_meta_cache",
+    },
+    # Failed subscription orders ka retry fix ke turant baad
+    "Daily Item Price": {
+        "on_update": "my_frappe_app.order_retry.expedite_price_retries",
+    },
+    # Default warehouse cache reset (+ us company ke failed orders ka retry)
+    "Warehouse": {
+        "after_insert": [
+            "my_frappe_app.api.clear_default_warehouse_cache",
+            "my_frappe_app.order_retry.expedite_warehouse_retries",
+        ],
+        "on_update": "my_frappe_app.api.clear_default_warehouse_cache",
+        "on_trash": "my_frappe_app.api.clear_default_warehouse_cache",
+        "after_rename": "my_frappe_app.api.clear_default_warehouse_cache",
+    },
+    # Receivable Aging buckets incrementally update karo
+    "Payment Entry": {
+        "on_submit": "my_frappe_app.receivables.on_payment_entry_change",
+        "on_cancel": "my_frappe_app.receivables.on_payment_entry_change",
+    },
+    # Cached Sales Invoice print format reset karo
+    "Property Setter": {
+        "on_update": "my_frappe_app.payment_utils.clear_print_format_cache",
+        "on_trash": "my_frappe_app.payment_utils.clear_print_format_cache",
+    },
+    "Print Format": {
+        "on_update": "my_frappe_app.payment_utils.clear_print_format_cache",
+        "on_trash": "my_frappe_app.payment_utils.clear_print_format_cache",
+        "after_rename": "my_frappe_app.payment_utils.clear_print_format_cache",
+    },
+    # Cached payment account map reset karo
+    "Account": {
+        "on_update": "my_frappe_app.payment_utils.clear_account_map_cache",
+        "on_trash": "my_frappe_app.payment_utils.clear_account_map_cache",
+        "after_rename": "my_frappe_app.payment_utils.clear_account_map_cache",
+    },
+    "Company": {
+        "on_update": "my_frappe_app.payment_utils.clear_account_map_cache",
+        "on_trash": "my_frappe_app.payment_utils.clear_account_map_cache",
+    },
+    "Mode of Payment": {
+        "on_update": "my_frappe_app.payment_utils.clear_account_map_cache",
+        "on_trash": "my_frappe_app.payment_utils.clear_account_map_cache",
     },
 }
 
 scheduler_events = {
+    "daily": [
+        "my_frappe_app.api.clear_old_sync_tombstones",
+    ],
     "cron": {
+        # Step 0: 11:50 PM IST — auto-renew wali subscriptions extend karo (UTC: 18:20)
+        "20 18 * * *": [
+            "my_frappe_app.api.renew_subscriptions",
+        ],
         # Step 1: 11:58 PM IST — expire old subscriptions (UTC: 18:28)
         "28 18 * * *": [
             "my_frappe_app.api.expire_old_subscriptions",
@@ -33,9 +120,23 @@ scheduler_events = {
         "35 18 * * *": [
             "my_frappe_app.api.generate_daily_orders",
         ],
+        # Daily generation ke failed orders — sirf due retries (backoff)
+        "*/15 * * * *": [
+            "my_frappe_app.order_retry.retry_failed_orders",
+        ],
+        # Step 3: 12:30 AM IST — receivable aging buckets aage shift karo (UTC: 19:00)
+        "0 19 * * *": [
+            "my_frappe_app.receivables.rebuild_receivable_aging",
+        ],
     },
 }
 
+# Composite indexes jo fixtures se nahi bante
+after_migrate = [
+    "my_frappe_app.subscription_schedule.ensure_schedule_day_index",
+    "my_frappe_app.order_retry.ensure_retry_unique_index",
+]
+
 # Role-based home page
 role_home_page = {
     "Seller": "/frontend/seller",
@@ -59,12 +160,17 @@ fixtures = [
         "doctype": "Custom Field",
         "filters": [["dt", "=", "Sales Order"]]
     },
-    # 4. Property Setters
+    # 4. Sales Invoice Custom Fields
+    {
+        "doctype": "Custom Field",
+        "filters": [["dt", "=", "Sales Invoice"]]
+    },
+    # 5. Property Setters
     {
         "doctype": "Property Setter",
         "filters": [["doc_type", "in", ["Company", "Sales Order"]]]
     },
-    # 5. Print Formats
+    # 6. Print Formats
     {
         "doctype": "Print Format",
         "filters": [["module", "=", "my_frappe_app"]]
@@ -0,0 +1,228 @@
+# ══════════════════════════════════════════════════════════════════
+# ENDPOINT INSTRUMENTATION — per-endpoint latency histogram (Redis)
+#
+# Usage (whitelist ke neeche lagao, taaki whitelist wrapped fn register kare):
+#
+#   @frappe.whitelist()
+#   @instrument
+#   def get_customer_orders(...):
+#
+# Sampled call pe record hota hai:
+#   wall time, DB query count + DB time, response payload size,
+#   cache hits / misses (record_cache_access se)
+#
+# Storage: 5-minute windows, har window ek Redis hash per endpoint
+# (latency buckets + sums), 24h TTL. Ek call = ek pipeline round trip.
+#
+# Sampling: site_config.json → "api_instrumentation_sample_rate"
+#   (0 = off, 1 = har call; default 0.1)
+#
+# Admin call:
+#   /api/method/my_frappe_app.instrumentation.get_endpoint_latency
+# ══════════════════════════════════════════════════════════════════
+import functools
+import inspect
+import json
+import random
+import time
+
+import frappe
+
+DEFAULT_SAMPLE_RATE = 0.1
+WINDOW_SECONDS = 5 * 60
+WINDOW_TTL = 24 * 60 * 60
+ENDPOINTS_KEY = "my_frappe_app:perf:endpoints"
+
+# Latency bucket upper bounds (ms) — last bucket open-ended
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+SUM_FIELDS = ("wall_ms", "db_ms", "queries", "payload_bytes", "cache_hits", "cache_misses")
+
+
+def _sample_rate() -> float:
+    rate = frappe.conf.get("api_instrumentation_sample_rate")
+    return DEFAULT_SAMPLE_RATE if rate is None else float(rate)
+
+
+def _window_key(endpoint: str, window: int) -> str:
+    return frappe.cache.make_key(f"my_frappe_app:perf:{endpoint}:{window}")
+
+
+def _bucket_index(wall_ms: float) -> int:
+    for i, bound in enumerate(LATENCY_BUCKETS_MS):
+        if wall_ms <= bound:
+            return i
+    return len(LATENCY_BUCKETS_MS)
+
+
+def record_cache_access(name: str, hit: bool, count: int = 1):
+    """Cache helpers isse call karte hain — sirf sampled call ke andar count hota hai."""
+    stats = getattr(frappe.local, "perf_stats", None)
+    if stats is not None:
+        stats["cache_hits" if hit else "cache_misses"] += count
+
+
+def _start_db_timing(stats):
+    """
+    frappe.recorder jaisa: request ke frappe.db.sql ko wrap karo, call ke baad restore.
+    """
+    db = frappe.db
+    original = db.sql
+
+    def timed_sql(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            stats["queries"] += 1
+            stats["db_ms"] += (time.perf_counter() - start) * 1000
+
+    db.sql = timed_sql
+    return lambda: setattr(db, "sql", original)
+
+
+def _payload_size(result) -> int:
+    try:
+        return len(json.dumps(result, default=str))
+    except Exception:
+        return 0
+
+
+def _record(endpoint: str, stats: dict, error: bool):
+    window = int(time.time()) // WINDOW_SECONDS
+    key = _window_key(endpoint, window)
+    pipe = frappe.cache.pipeline()
+    pipe.hincrby(key, "count", 1)
+    pipe.hincrby(key, f"b{_bucket_index(stats['wall_ms'])}", 1)
+    if error:
+        pipe.hincrby(key, "errors", 1)
+    for field in SUM_FIELDS:
+        pipe.hincrbyfloat(key, field, stats[field])
+    pipe.expire(key, WINDOW_TTL)
+    pipe.sadd(frappe.cache.make_key(ENDPOINTS_KEY), endpoint)
+    pipe.execute()
+
+
+def instrument(fn):
+    endpoint = f"{fn.__module__}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        # Nested instrumented calls parent call mein hi count hote hain
+        if getattr(frappe.local, "perf_stats", None) is not None or random.random() >= _sample_rate():
+            return fn(*args, **kwargs)
+
+        stats = dict.fromkeys(SUM_FIELDS, 0)
+        frappe.local.perf_stats = stats
+        restore_db = _start_db_timing(stats)
+        error = False
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+            if isinstance(result, dict) and result.get("status") == "error":
+                error = True
+            return result
+        except Exception:
+            error = True
+            result = None
+            raise
+        finally:
+            stats["wall_ms"] = (time.perf_counter() - start) * 1000
+            restore_db()
+            frappe.local.perf_stats = None
+            try:
+                stats["payload_bytes"] = _payload_size(result)
+                _record(endpoint, stats, error)
+            except Exception:
+                # Instrumentation kabhi endpoint ko fail na kare
+                pass
+
+    # frappe.call argument filtering (get_newargs) ke liye original signature
+    spec = inspect.getfullargspec(fn)
+    wrapper.fnargs = spec.args + spec.kwonlyargs
+    return wrapper
+
+
+def _percentile(buckets, total, q):
+    """Bucket upper bound jahan cumulative count q% cross karta hai."""
+    if not total:
+        return None
+    target = q * total
+    running = 0
+    for i, count in enumerate(buckets):
+        running += count
+        if running >= target:
+            return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else None
+    return None
+
+
+def _summarize(endpoint: str, minutes: int) -> dict:
+    current = int(time.time()) // WINDOW_SECONDS
+    windows = max(1, -(-minutes * 60 // WINDOW_SECONDS))
+    pipe = frappe.cache.pipeline()
+    for w in range(current - windows + 1, current + 1):
+        pipe.hgetall(_window_key(endpoint, w))
+
+    buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    count = errors = 0
+    sums = dict.fromkeys(SUM_FIELDS, 0.0)
+    for data in pipe.execute():
+        for field, value in (data or {}).items():
+            field = field.decode() if isinstance(field, bytes) else field
+            value = float(value)
+            if field == "count":
+                count += int(value)
+            elif field == "errors":
+                errors += int(value)
+            elif field.startswith("b"):
+                buckets[int(field[1:])] += int(value)
+            elif field in sums:
+                sums[field] += value
+
+    def avg(v):
+        return round(v / count, 2) if count else None
+
+    cache_total = sums["cache_hits"] + sums["cache_misses"]
+    return {
+        "endpoint":          endpoint,
+        "samples":           count,
+        "errors":            errors,
+        "p50_ms":            _percentile(buckets, count, 0.50),
+        "p95_ms":            _percentile(buckets, count, 0.95),
+        "p99_ms":            _percentile(buckets, count, 0.99),
+        "avg_ms":            avg(sums["wall_ms"]),
+        "avg_db_ms":         avg(sums["db_ms"]),
+        "avg_queries":       avg(sums["queries"]),
+        "avg_payload_bytes": avg(sums["payload_bytes"]),
+        "cache_hit_ratio":   round(sums["cache_hits"] / cache_total, 3) if cache_total else None,
+        "buckets":           dict(zip([*(str(b) for b in LATENCY_BUCKETS_MS), "inf"], buckets, strict=True)),
+    }
+
+
+@frappe.whitelist()
+def get_endpoint_latency(endpoint=None, minutes=60):
+    """
+    p50 / p95 / p99 (bucket upper bound, ms) + averages, pichle `minutes` ke liye.
+    endpoint na diya ho to saare recorded endpoints, slowest p95 pehle.
+    """
+    frappe.only_for("System Manager")
+    minutes = max(5, min(int(minutes or 60), WINDOW_TTL // 60))
+
+    if endpoint:
+        endpoints = [endpoint]
+    else:
+        endpoints = sorted(
+            (e.decode() if isinstance(e, bytes) else e)
+            # RedisWrapper.smembers khud make_key lagata hai (write side raw pipeline pe make_key)
+            for e in frappe.cache.smembers(ENDPOINTS_KEY)
+        )
+
+    rows = [_summarize(e, minutes) for e in endpoints]
+    rows = [r for r in rows if r["samples"]]
+    rows.sort(key=lambda r: (r["p95_ms"] is None, -(r["p95_ms"] or 0), -r["samples"]))
+    return {
+        "status":      "success",
+        "minutes":     minutes,
+        "sample_rate": _sample_rate(),
+        "endpoints":   rows,
+    }
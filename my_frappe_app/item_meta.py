@@ -0,0 +1,79 @@
+# ══════════════════════════════════════════════════════════════════
+# ITEM META CACHE — item_name / group / uom lookups ek call mein
+#
+# Cart aur subscription endpoints pehle har item pe alag
+# frappe.db.get_value("Item", ...) karte the. Ab:
+#
+#   get_item_meta_many(["ITEM-1", "ITEM-2"])
+#     → Redis hash se ek HMGET, misses ek hi query mein, phir ek
+#       pipelined HSET (frappe.cache.hget / hset jaisa pickle format)
+#
+# Item update / rename / delete → doc_events se sirf wahi entry clear.
+# ══════════════════════════════════════════════════════════════════
+import pickle
+
+import frappe
+
+from my_frappe_app.instrumentation import record_cache_access
+
+ITEM_META_CACHE_KEY = "my_frappe_app:item_meta:v2"
+
+ITEM_META_FIELDS = [
+    "name", "item_name", "item_group", "stock_uom", "disabled", "is_sales_item", "is_stock_item",
+]
+
+
+def get_item_meta_many(item_codes) -> dict:
+    """
+    {item_code: meta dict}. DB mein na mile wale codes result mein nahi aate.
+    """
+    codes = list(dict.fromkeys(c for c in item_codes if c))
+    if not codes:
+        return {}
+
+    # Raw redis calls — key pe make_key khud, values frappe.cache.hset jaise pickled
+    key = frappe.cache.make_key(ITEM_META_CACHE_KEY)
+    result, missing = {}, []
+    for code, raw in zip(codes, frappe.cache.hmget(key, codes), strict=True):
+        if raw is None:
+            missing.append(code)
+        else:
+            result[code] = pickle.loads(raw)
+    record_cache_access("item_meta", hit=True, count=len(result))
+    record_cache_access("item_meta", hit=False, count=len(missing))
+
+    if missing:
+        rows = frappe.get_all(
+            "Item", filters={"name": ["in", missing]}, fields=ITEM_META_FIELDS
+        )
+        if rows:
+            fresh = {row.name: dict(row) for row in rows}
+            pipe = frappe.cache.pipeline()
+            pipe.hset(key, mapping={name: pickle.dumps(meta) for name, meta in fresh.items()})
+            pipe.execute()
+            result.update(fresh)
+
+    return result
+
+
+def get_item_meta(item_code) -> dict | None:
+    return get_item_meta_many([item_code]).get(item_code)
+
+
+def get_item_names(item_codes) -> dict:
+    """{item_code: item_name} — missing item ka naam code hi."""
+    meta = get_item_meta_many(item_codes)
+    return {c: (meta.get(c) or {}).get("item_name") or c for c in item_codes if c}
+
+
+def clear_item_meta_cache(doc=None, method=None, *args):
+    """
+    hooks.py -> doc_events -> Item -> on_update / on_trash / after_rename
+    after_rename mein args[0] purana naam hota hai — dono clear.
+    """
+    if doc is None:
+        frappe.cache.delete_value(ITEM_META_CACHE_KEY)
+        return
+    frappe.cache.hdel(ITEM_META_CACHE_KEY, doc.name)
+    if args and isinstance(args[0], str):
+        frappe.cache.hdel(ITEM_META_CACHE_KEY, args[0])
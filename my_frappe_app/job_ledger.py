@@ -0,0 +1,180 @@
+# ══════════════════════════════════════════════════════════════════
+# SCHEDULER JOB LEDGER — nightly jobs ka persistent run record
+#
+# Har run ek "Scheduler Job Run" doc:
+#   started_on / finished_on / duration, counts, per-stage timings
+#   (fetch, price, so_insert, so_submit, dn_insert, dn_submit), failures JSON
+#
+#   with job_run("generate_daily_orders", exclusive=True) as run:
+#       with run.stage("fetch"):
+#           ...
+#       run.count(created=1)
+#       run.fail({"subscription": ..., "reason": ...})
+#
+# Overlap:
+#   - Har job ka Redis lock (SET NX). exclusive=True wala job lock na mile
+#     to start hi nahi hota — "Skipped" run likha jaata hai, JobAlreadyRunning.
+#   - Koi aur job abhi Running ho to uska naam overlapped_with mein.
+#   - Lock milne pe is job ke purane "Running" rows (crash / kill) → Aborted.
+#
+# Ledger row apne commit ke saath likhi jaati hai (start pe aur end pe).
+#
+# Admin call:
+#   /api/method/my_frappe_app.job_ledger.get_job_runs
+# ══════════════════════════════════════════════════════════════════
+import json
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import now_datetime, nowdate
+
+from my_frappe_app.instrumentation import instrument
+
+JOB_LOCK_TTL = 6 * 60 * 60
+MAX_STORED_FAILURES = 500
+STAGES = ("fetch", "price", "so_insert", "so_submit", "dn_insert", "dn_submit")
+COUNTS = ("total", "created", "dn", "skipped")
+
+
+class JobAlreadyRunning(frappe.ValidationError):
+    pass
+
+
+def _lock_key(job):
+    return frappe.cache.make_key(f"my_frappe_app:job_lock:{job}")
+
+
+def _acquire_lock(job, token) -> bool:
+    return bool(frappe.cache.set(_lock_key(job), token, nx=True, ex=JOB_LOCK_TTL))
+
+
+def _release_lock(job, token):
+    key = _lock_key(job)
+    holder = frappe.cache.get(key)
+    if holder is not None and (holder.decode() if isinstance(holder, bytes) else holder) == token:
+        frappe.cache.delete(key)
+
+
+def _running_runs(job=None):
+    filters = {"status": "Running"}
+    if job:
+        filters["job"] = job
+    return frappe.get_all("Scheduler Job Run", filters=filters, pluck="name", order_by="creation asc")
+
+
+class JobRun:
+    def __init__(self, job, test_mode=False):
+        self.job = job
+        self.test_mode = 1 if test_mode else 0
+        self.name = None
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.counts = dict.fromkeys(COUNTS, 0)
+        self.failures = []
+        self.failed_count = 0
+        self._started = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] += (time.perf_counter() - start) * 1000
+
+    def count(self, **counts):
+        for key, value in counts.items():
+            self.counts[key] += value
+
+    def fail(self, entry: dict):
+        self.failed_count += 1
+        if len(self.failures) < MAX_STORED_FAILURES:
+            self.failures.append(entry)
+
+    def _insert(self, status, overlapped_with=None):
+        doc = frappe.get_doc({
+            "doctype":         "Scheduler Job Run",
+            "job":             self.job,
+            "status":          status,
+            "run_date":        nowdate(),
+            "test_mode":       self.test_mode,
+            "started_on":      now_datetime(),
+            "overlapped_with": overlapped_with,
+        })
+        doc.flags.ignore_permissions = True
+        doc.insert()
+        self.name = doc.name
+        self._started = time.perf_counter()
+        frappe.db.commit()
+
+    def _finish(self, status, message=None):
+        values = {
+            "status":        status,
+            "finished_on":   now_datetime(),
+            "duration_ms":   int((time.perf_counter() - self._started) * 1000),
+            "total_count":   self.counts["total"],
+            "created_count": self.counts["created"],
+            "dn_count":      self.counts["dn"],
+            "skipped_count": self.counts["skipped"],
+            "failed_count":  self.failed_count,
+            "failures":      json.dumps(self.failures, indent=1, default=str) if self.failures else None,
+            "message":       message,
+        }
+        values.update({f"{stage}_ms": round(ms, 2) for stage, ms in self.stages.items()})
+        frappe.db.set_value("Scheduler Job Run", self.name, values, update_modified=False)
+        frappe.db.commit()
+
+
+@contextmanager
+def job_run(job, exclusive=False, test_mode=False):
+    """
+    exclusive=True: same job pehle se chal raha ho to JobAlreadyRunning
+    (Skipped row ke saath). Body ka exception → Failed row, phir re-raise.
+    """
+    run = JobRun(job, test_mode=test_mode)
+    token = frappe.generate_hash(length=12)
+
+    if _acquire_lock(job, token):
+        # Lock hamara hai — is job ke bache hue Running rows crash se hain
+        for stale in _running_runs(job):
+            frappe.db.set_value("Scheduler Job Run", stale, {
+                "status": "Aborted", "message": "Process ended without finishing the run",
+            }, update_modified=False)
+    elif exclusive:
+        running = ", ".join(_running_runs(job)) or None
+        run._insert("Skipped", overlapped_with=running)
+        run._finish("Skipped", message="Previous run still in progress")
+        raise JobAlreadyRunning(f"{job} is already running ({running})")
+
+    overlapped = _running_runs()
+    run._insert("Running", overlapped_with=", ".join(overlapped) or None)
+    try:
+        yield run
+    except Exception as e:
+        frappe.db.rollback()
+        run._finish("Failed", message=str(e)[:1000])
+        raise
+    else:
+        run._finish("Partial" if run.failed_count else "Completed")
+    finally:
+        _release_lock(job, token)
+
+
+@frappe.whitelist()
+@instrument
+def get_job_runs(job=None, limit=20):
+    """Latest runs (System Manager) — admin dashboard ke liye."""
+    frappe.only_for("System Manager")
+    filters = {"job": job} if job else {}
+    rows = frappe.get_all(
+        "Scheduler Job Run",
+        filters=filters,
+        fields=[
+            "name", "job", "status", "run_date", "test_mode", "started_on", "finished_on",
+            "duration_ms", "overlapped_with", "total_count", "created_count", "dn_count",
+            "skipped_count", "failed_count", *[f"{s}_ms" for s in STAGES],
+        ],
+        order_by="creation desc",
+        limit_page_length=min(int(limit or 20), 200),
+    )
+    return {"status": "success", "runs": rows}
@@ -0,0 +1,280 @@
+# ══════════════════════════════════════════════════════════════════
+# ORDER RETRY QUEUE — daily generation ke failed subscription orders
+#
+# _run_daily_orders mein price / Sales Order / DN fail ho to ek
+# "Subscription Order Retry" row — (subscription, order_date) pe unique
+# index (after_migrate), dobara fail ho to wahi row phir Pending:
+#   stage, reason, item_code / sales_order, attempts, next_retry_on
+#
+# retry_failed_orders (cron, har 15 min) sirf due Pending rows uthata hai —
+# nightly scan dobara nahi chalta, cost failures ke proportional:
+#   price / sales_order  → _create_subscription_order (SO + DN)
+#   delivery_note        → sirf _create_subscription_delivery_note
+# Fail → attempts + 1, backoff RETRY_BASE_MINUTES * 2^(attempts-1)
+# (max RETRY_MAX_MINUTES). MAX_ATTEMPTS ya delivery date (order_date) beet
+# gayi → Abandoned; back-dated SO / DN nahi bante.
+#
+# Fix ke baad wait nahi:
+#   Daily Item Price save  → us item ke price failures abhi due
+#   Warehouse insert       → us company ke sales_order failures abhi due
+#   retry_orders_now       → seller dashboard se manual trigger
+#
+# Frontend calls:
+#   /api/method/my_frappe_app.order_retry.get_order_retries
+#   /api/method/my_frappe_app.order_retry.retry_orders_now
+# ══════════════════════════════════════════════════════════════════
+from datetime import timedelta
+
+import frappe
+from frappe.utils import getdate, now_datetime, nowdate
+
+from my_frappe_app.instrumentation import instrument
+from my_frappe_app.job_ledger import JobAlreadyRunning, job_run
+from my_frappe_app.trusted_orders import reset_trusted_order_cache
+
+RETRY_DOCTYPE = "Subscription Order Retry"
+RETRY_BASE_MINUTES = 15
+RETRY_MAX_MINUTES = 6 * 60
+MAX_ATTEMPTS = 8
+RETRY_BATCH_SIZE = 500
+RETRY_SAVEPOINT = "order_retry"
+
+RETRY_FIELDS = [
+    "name", "subscription", "order_date", "weekday", "stage",
+    "item_code", "sales_order", "attempts",
+]
+
+
+def _backoff(attempts: int):
+    minutes = min(RETRY_BASE_MINUTES * 2 ** max(attempts - 1, 0), RETRY_MAX_MINUTES)
+    return now_datetime() + timedelta(minutes=minutes)
+
+
+def ensure_retry_unique_index():
+    """hooks.py -> after_migrate — ek (subscription, order_date) ki ek hi queue row."""
+    frappe.db.add_unique(RETRY_DOCTYPE, ["subscription", "order_date"], "subscription_order_date")
+
+
+def queue_order_retry(sub, order_date, weekday, failure: dict, job_run=None):
+    """
+    _run_daily_orders se — (subscription, order_date) ki row banao ya
+    update karo. Resolved / Abandoned row ho to wahi dobara Pending.
+    failure: {"stage", "reason", "item"?, "so"?}
+    """
+    values = {
+        "stage":       failure.get("stage") or "sales_order",
+        "reason":      str(failure.get("reason") or "")[:1000],
+        "item_code":   failure.get("item"),
+        "sales_order": failure.get("so"),
+        "job_run":     job_run,
+    }
+    existing = frappe.db.get_value(
+        RETRY_DOCTYPE, {"subscription": sub.name, "order_date": order_date}, ["name", "status"], as_dict=True
+    )
+    if existing:
+        if existing.status != "Pending":
+            values.update({"status": "Pending", "attempts": 0, "next_retry_on": _backoff(1)})
+        frappe.db.set_value(RETRY_DOCTYPE, existing.name, values)
+        return existing.name
+
+    doc = frappe.get_doc({
+        "doctype":       RETRY_DOCTYPE,
+        "subscription":  sub.name,
+        "customer":      sub.customer,
+        "seller":        sub.seller,
+        "order_date":    order_date,
+        "weekday":       weekday,
+        "status":        "Pending",
+        "attempts":      0,
+        "next_retry_on": _backoff(1),
+        **values,
+    })
+    doc.flags.ignore_permissions = True
+    doc.insert()
+    return doc.name
+
+
+def _close(row, status, reason=None):
+    values = {"status": status, "last_attempt_on": now_datetime(), "next_retry_on": None}
+    if reason:
+        values["reason"] = reason
+    frappe.db.set_value(RETRY_DOCTYPE, row.name, values)
+
+
+def _reschedule(row, failure: dict):
+    attempts = int(row.attempts or 0) + 1
+    values = {
+        "attempts":        attempts,
+        "last_attempt_on": now_datetime(),
+        "stage":           failure.get("stage") or row.stage,
+        "reason":          str(failure.get("reason") or "")[:1000],
+        "item_code":       failure.get("item") or row.item_code,
+        "sales_order":     failure.get("so") or row.sales_order,
+    }
+    if attempts >= MAX_ATTEMPTS:
+        values.update({"status": "Abandoned", "next_retry_on": None})
+    else:
+        values["next_retry_on"] = _backoff(attempts)
+    frappe.db.set_value(RETRY_DOCTYPE, row.name, values)
+
+
+def _retry_one(run, row):
+    """Ek queue row — SO / DN banao ya reschedule. Result status return."""
+    from my_frappe_app.api import (
+        _create_subscription_delivery_note,
+        _create_subscription_order,
+    )
+    from my_frappe_app.subscription_schedule import get_day_schedule
+
+    # Beete din ka order nahi banate — woh paper deliver hua hi nahi
+    if getdate(row.order_date) < getdate(nowdate()):
+        _close(row, "Abandoned", "Delivery date passed")
+        return "Abandoned"
+
+    sub = frappe.db.get_value(
+        "Newspaper Subscription", row.subscription,
+        ["name", "customer", "seller", "territory", "status"], as_dict=True
+    )
+    if not sub or sub.status != "Active":
+        _close(row, "Abandoned", "Subscription no longer active")
+        return "Abandoned"
+
+    so = frappe.db.get_value("Sales Order", {
+        "custom_subscription_refereance": sub.name,
+        "transaction_date": row.order_date,
+        "docstatus": ["!=", 2],
+    }, ["name", "docstatus"], as_dict=True)
+
+    if so and so.docstatus == 0:
+        # Pichli koshish ka adhoora draft — current prices se dobara banega
+        frappe.delete_doc("Sales Order", so.name, ignore_permissions=True, force=True)
+        so = None
+
+    retry_dn_only = bool(so)
+    if so:
+        has_dn = frappe.db.exists(
+            "Delivery Note Item", {"against_sales_order": so.name, "docstatus": 1}
+        )
+        if has_dn:
+            _close(row, "Resolved")
+            return "Resolved"
+        failure = _create_subscription_delivery_note(run, so.name)
+    else:
+        items = get_day_schedule(row.weekday, [sub.name]).get(sub.name)
+        if not items:
+            _close(row, "Abandoned", "Nothing scheduled for this day")
+            return "Abandoned"
+        failure = _create_subscription_order(run, sub, items, row.order_date, row.weekday)
+
+    if failure:
+        # Naya SO ban gaya aur sirf DN fail hua to SO rakho, warna adhoora kaam wapas
+        if retry_dn_only or failure.get("stage") != "delivery_note":
+            frappe.db.rollback(save_point=RETRY_SAVEPOINT)
+        _reschedule(row, failure)
+        run.fail({"subscription": sub.name, "retry": row.name, **failure})
+        return "Pending"
+
+    _close(row, "Resolved")
+    return "Resolved"
+
+
+def retry_failed_orders():
+    """
+    hooks.py → cron har 15 min. Sirf due rows; kuch due na ho to ledger
+    row bhi nahi banti.
+    """
+    due = frappe.get_all(
+        RETRY_DOCTYPE,
+        filters={"status": "Pending", "next_retry_on": ["<=", now_datetime()]},
+        fields=RETRY_FIELDS,
+        order_by="next_retry_on asc",
+        limit_page_length=RETRY_BATCH_SIZE,
+    )
+    if not due:
+        return {"due": 0}
+
+    results = {"due": len(due), "Resolved": 0, "Pending": 0, "Abandoned": 0}
+    try:
+        with job_run("retry_failed_orders", exclusive=True) as run:
+            run.count(total=len(due))
+            reset_trusted_order_cache()
+            for row in due:
+                frappe.db.savepoint(RETRY_SAVEPOINT)
+                try:
+                    status = _retry_one(run, row)
+                except Exception as e:
+                    frappe.db.rollback(save_point=RETRY_SAVEPOINT)
+                    frappe.log_error(frappe.get_traceback(), f"Order Retry Error: {row.subscription}")
+                    _reschedule(row, {"reason": str(e)})
+                    run.fail({"subscription": row.subscription, "retry": row.name, "reason": str(e)})
+                    status = "Pending"
+                results[status] += 1
+                frappe.db.commit()
+            run.count(skipped=results["Abandoned"])
+    except JobAlreadyRunning:
+        return {"due": len(due), "status": "skipped"}
+
+    return {**results, "job_run": run.name}
+
+
+def _expedite(filters):
+    frappe.db.set_value(
+        RETRY_DOCTYPE, {"status": "Pending", **filters}, "next_retry_on", now_datetime()
+    )
+
+
+def expedite_price_retries(doc, method=None):
+    """hooks.py -> doc_events -> Daily Item Price -> on_update"""
+    _expedite({"stage": "price", "item_code": doc.item_code})
+
+
+def expedite_warehouse_retries(doc, method=None):
+    """hooks.py -> doc_events -> Warehouse -> after_insert"""
+    _expedite({"stage": "sales_order", "seller": doc.company})
+
+
+@frappe.whitelist()
+@instrument
+def get_order_retries(seller=None, status="Pending"):
+    """Seller ke failed subscription orders (queue rows)."""
+    try:
+        if not seller:
+            seller = frappe.db.get_value("Company", {"custom_seller": 1}, "name")
+        if not seller:
+            return {"status": "error", "message": "Seller not found"}
+
+        rows = frappe.get_all(
+            RETRY_DOCTYPE,
+            filters={"seller": seller, "status": status or "Pending"},
+            fields=[*RETRY_FIELDS, "customer", "reason", "next_retry_on", "last_attempt_on"],
+            order_by="order_date desc, creation desc",
+        )
+        return {"status": "success", "retries": rows}
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Order Retries Error")
+        return {"status": "error", "message": str(e)}
+
+
+@frappe.whitelist()
+@instrument
+def retry_orders_now(seller=None):
+    """Seller ne price / warehouse fix kiya — uske Pending rows abhi due, job enqueue."""
+    try:
+        if not seller:
+            seller = frappe.db.get_value("Company", {"custom_seller": 1}, "name")
+        if not seller:
+            return {"status": "error", "message": "Seller not found"}
+
+        _expedite({"seller": seller})
+        frappe.enqueue(
+            "my_frappe_app.order_retry.retry_failed_orders",
+            queue="long",
+            timeout=60 * 60,
+            job_id="retry_failed_orders",
+            deduplicate=True,
+            enqueue_after_commit=True,
+        )
+        return {"status": "success", "message": "Retry started."}
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Order Retry Now Error")
+        return {"status": "error", "message": str(e)}
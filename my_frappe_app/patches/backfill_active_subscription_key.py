@@ -0,0 +1,37 @@
+import frappe
+
+from my_frappe_app.api import ACTIVE_SUBSCRIPTION_STATUSES, _active_subscription_key
+
+
+def execute():
+    """
+    Purani Accept Pending / Active subscriptions pe active_key bharo.
+    Ek hi (customer, seller, primary item) ke multiple active rows hon to
+    sirf latest ko key milti hai — baaki log ho jaate hain, seller manually dekhe.
+    """
+    rows = frappe.db.sql("""
+        SELECT ns.name, ns.customer, ns.seller, nsi.item_code
+        FROM `tabNewspaper Subscription` ns
+        JOIN `tabNewspaper Subscription Item` nsi
+          ON nsi.parent = ns.name AND nsi.is_primary_item = 1
+        WHERE ns.status IN %s
+        ORDER BY ns.creation DESC
+    """, (ACTIVE_SUBSCRIPTION_STATUSES,), as_dict=True)
+
+    seen, duplicates = set(), []
+    for r in rows:
+        key = _active_subscription_key(r.customer, r.seller, r.item_code)
+        if key in seen:
+            duplicates.append(r.name)
+            continue
+        seen.add(key)
+        frappe.db.sql(
+            "UPDATE `tabNewspaper Subscription` SET active_key = %s WHERE name = %s",
+            (key, r.name),
+        )
+
+    if duplicates:
+        frappe.log_error(
+            "Duplicate active subscriptions (no active_key): " + ", ".join(duplicates),
+            "Active Subscription Key Backfill",
+        )
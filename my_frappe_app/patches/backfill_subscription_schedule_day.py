@@ -0,0 +1,10 @@
+from my_frappe_app.subscription_schedule import (
+    ensure_schedule_day_index,
+    rebuild_subscription_schedule,
+)
+
+
+def execute():
+    """Existing Newspaper Subscription Items se Subscription Schedule Day bharo."""
+    ensure_schedule_day_index()
+    rebuild_subscription_schedule()
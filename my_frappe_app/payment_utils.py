@@ -9,10 +9,17 @@
 #   /api/method/my_frappe_app.payment_utils.get_company_account
 #   /api/method/my_frappe_app.payment_utils.get_print_format
 #   /api/method/my_frappe_app.payment_utils.create_payment_entry
+#   /api/method/my_frappe_app.payment_utils.create_bulk_payment_entries
 #   /api/method/my_frappe_app.payment_utils.get_invoice_outstanding
+#   /api/method/my_frappe_app.payment_utils.start_payment_reminder_campaign
+#   /api/method/my_frappe_app.payment_utils.get_payment_reminder_campaign
 # ══════════════════════════════════════════════════════════════════
+from contextlib import contextmanager
+
 import frappe
 
+from my_frappe_app.instrumentation import instrument, record_cache_access
+
 
 def _log(tag: str, msg: str, data=None):
     body = f"[PAY_REQ] [{tag}] {msg}"
@@ -58,7 +65,10 @@ def _get_customer_email(customer: str):
     return None
 
 
-def _get_print_format():
+PRINT_FORMAT_CACHE_KEY = "my_frappe_app:sales_invoice_print_format"
+
+
+def _resolve_print_format():
     fmt = frappe.db.get_value(
         "Property Setter",
         {"doc_type": "Sales Invoice", "property": "default_print_format"},
@@ -73,6 +83,29 @@ def _get_print_format():
     )
 
 
+def _get_print_format():
+    """
+    Site-wide cached print format. "" cache hota hai jab koi custom format nahi —
+    taaki Frappe Default wale sites pe bhi har PDF pe query na chale.
+    """
+    cached = frappe.cache.get_value(PRINT_FORMAT_CACHE_KEY)
+    record_cache_access("print_format", hit=cached is not None)
+    if cached is not None:
+        return cached or None
+    fmt = _resolve_print_format()
+    frappe.cache.set_value(PRINT_FORMAT_CACHE_KEY, fmt or "")
+    return fmt
+
+
+def clear_print_format_cache(doc=None, method=None, *args):
+    """
+    hooks.py -> doc_events -> Property Setter / Print Format
+    """
+    if doc is not None and doc.get("doc_type") != "Sales Invoice":
+        return
+    frappe.cache.delete_value(PRINT_FORMAT_CACHE_KEY)
+
+
 def _get_print_wkhtmltopdf(invoice_name: str, fmt) -> bytes:
     html = frappe.get_print(
         doctype="Sales Invoice",
@@ -293,7 +326,12 @@ def _build_email_html(inv, send_count: int = 1) -> str:
 </html>"""
 
 
-def _send_email(inv, pdf_bytes: bytes, recipient_email: str, send_count: int = 1):
+def _send_email(inv, pdf_bytes: bytes, recipient_email: str, send_count: int = 1,
+                now: bool = True, send_after=None):
+    """
+    now=True  -> SMTP pe turant bhejo (single invoice, UI se).
+    now=False -> Email Queue mein daalo; send_after se campaign throttle hota hai.
+    """
     outstanding = inv.outstanding_amount
     subject_prefix = f"Reminder #{send_count}: " if send_count > 1 else ""
     html = _build_email_html(inv, send_count)
@@ -305,10 +343,38 @@ def _send_email(inv, pdf_bytes: bytes, recipient_email: str, send_count: int = 1
             "fname":    f"Invoice_{inv.name}.pdf",
             "fcontent": pdf_bytes,
         }],
-        now=True,
+        reference_doctype="Sales Invoice",
+        reference_name=inv.name,
+        send_after=send_after,
+        now=now,
     )
 
 
+def _record_send_count(invoice_names, send_count=None):
+    """
+    Sales Invoice pe persistent send counter update karo.
+    send_count diya ho to wahi set hota hai, warna +1 (campaign batches).
+    """
+    if not invoice_names:
+        return
+    if isinstance(invoice_names, str):
+        invoice_names = [invoice_names]
+
+    if send_count is None:
+        count_sql = "COALESCE(custom_payment_request_count, 0) + 1"
+        values = {"names": tuple(invoice_names), "now": frappe.utils.now()}
+    else:
+        count_sql = "GREATEST(COALESCE(custom_payment_request_count, 0), %(count)s)"
+        values = {"names": tuple(invoice_names), "now": frappe.utils.now(), "count": int(send_count)}
+
+    frappe.db.sql(f"""
+        UPDATE `tabSales Invoice`
+        SET custom_payment_request_count   = {count_sql},
+            custom_last_payment_request_on = %(now)s
+        WHERE name IN %(names)s
+    """, values)
+
+
 def send_payment_request_email(invoice_name: str, send_count: int = 1) -> dict:
     _log("START", invoice_name, {"send_count": send_count})
 
@@ -338,6 +404,7 @@ def send_payment_request_email(invoice_name: str, send_count: int = 1) -> dict:
 
     _log("EMAIL", f"Sending to {email} (send #{send_count})")
     _send_email(inv, pdf, email, send_count)
+    _record_send_count(invoice_name, send_count)
     _log("EMAIL", "Sent successfully")
 
     return {
@@ -388,14 +455,88 @@ def on_invoice_submit_hook(doc, method):
 #      Receivable/Payable aaye to auto-fallback karo company default se.
 # ══════════════════════════════════════════════════════════════════
 
-def _is_receivable_or_payable_account(account_name: str) -> bool:
+ACCOUNT_MAP_CACHE_KEY = "my_frappe_app:payment_account_map"
+
+COMPANY_ACCOUNT_FIELDS = (
+    "default_cash_account",
+    "default_bank_account",
+    "default_receivable_account",
+    "default_payable_account",
+)
+
+
+def _build_account_map(company: str) -> dict:
+    """
+    Ek company ke liye saare payment-related accounts ek saath resolve karo:
+    Company defaults, har Mode of Payment ka account, account types,
+    aur Bank/Cash + Receivable fallbacks.
+    """
+    company_accounts = frappe.db.get_value(
+        "Company", company, list(COMPANY_ACCOUNT_FIELDS), as_dict=True
+    ) or {}
+
+    mop_accounts = dict(frappe.db.sql("""
+        SELECT parent, default_account FROM `tabMode of Payment Account`
+        WHERE company = %s AND default_account IS NOT NULL AND default_account != ''
+    """, (company,)))
+
+    accounts = frappe.db.sql("""
+        SELECT name, account_type, is_group, disabled FROM `tabAccount`
+        WHERE company = %s
+        ORDER BY lft
+    """, (company,), as_dict=True)
+
+    account_types = {a.name: a.account_type or "" for a in accounts}
+    leaf_accounts = [a for a in accounts if not a.is_group and not a.disabled]
+
+    return {
+        "company":             {f: company_accounts.get(f) or "" for f in COMPANY_ACCOUNT_FIELDS},
+        "mode_of_payment":     mop_accounts,
+        "account_types":       account_types,
+        "fallback_bank_cash":  next((a.name for a in leaf_accounts if a.account_type in ("Bank", "Cash")), ""),
+        "fallback_receivable": next((a.name for a in leaf_accounts if a.account_type == "Receivable"), ""),
+    }
+
+
+def _get_account_map(company: str) -> dict:
+    built = []
+
+    def _build():
+        built.append(company)
+        return _build_account_map(company)
+
+    account_map = frappe.cache.hget(ACCOUNT_MAP_CACHE_KEY, company, generator=_build)
+    record_cache_access("account_map", hit=not built)
+    return account_map
+
+
+def clear_account_map_cache(doc=None, method=None, *args):
+    """
+    hooks.py -> doc_events -> Account / Company / Mode of Payment
+    Mode of Payment kai companies ko touch karta hai, isliye poora map clear.
+    """
+    company = None
+    if doc is not None:
+        company = doc.name if doc.doctype == "Company" else doc.get("company")
+    if company and doc.doctype != "Mode of Payment":
+        frappe.cache.hdel(ACCOUNT_MAP_CACHE_KEY, company)
+    else:
+        frappe.cache.delete_value(ACCOUNT_MAP_CACHE_KEY)
+
+
+def _is_receivable_or_payable_account(account_name: str, company: str | None = None) -> bool:
     """
     Check karo ki account Receivable ya Payable type ka hai ya nahi.
     Aise accounts paid_to mein use nahi ho sakte — party mandatory hoti hai.
+    company diya ho to cached account map se check hota hai (no query).
     """
     if not account_name:
         return False
-    account_type = frappe.db.get_value("Account", account_name, "account_type")
+    account_types = _get_account_map(company)["account_types"] if company else {}
+    if account_name in account_types:
+        account_type = account_types[account_name]
+    else:
+        account_type = frappe.db.get_value("Account", account_name, "account_type")
     return account_type in ("Receivable", "Payable")
 
 
@@ -403,19 +544,17 @@ def _get_safe_paid_to_account(mode_of_payment: str, company: str, payment_mode_l
     """
     paid_to ke liye safe Bank/Cash account fetch karo.
 
-    Strategy (waterfall):
+    Strategy (waterfall) — sab cached account map se, koi query nahi:
     1. Mode of Payment ka configured account → valid (non-Receivable) hai to use karo
     2. Company default_bank_account / default_cash_account → valid hai to use karo
     3. Koi bhi non-Receivable Bank/Cash account dhundho DB mein
     4. Empty string return karo (caller error throw karega)
     """
+    account_map = _get_account_map(company)
+
     # Step 1: Mode of Payment ka account
-    mop_account = frappe.db.get_value(
-        "Mode of Payment Account",
-        {"parent": mode_of_payment, "company": company},
-        "default_account",
-    )
-    if mop_account and not _is_receivable_or_payable_account(mop_account):
+    mop_account = account_map["mode_of_payment"].get(mode_of_payment)
+    if mop_account and not _is_receivable_or_payable_account(mop_account, company):
         _log("ACCOUNT_RESOLVE", f"MoP account valid: {mop_account}")
         return mop_account
 
@@ -431,22 +570,13 @@ def _get_safe_paid_to_account(mode_of_payment: str, company: str, payment_mode_l
         field_order = ["default_bank_account", "default_cash_account"]
 
     for field in field_order:
-        account = frappe.db.get_value("Company", company, field)
-        if account and not _is_receivable_or_payable_account(account):
+        account = account_map["company"].get(field)
+        if account and not _is_receivable_or_payable_account(account, company):
             _log("ACCOUNT_RESOLVE", f"Company {field}: {account}")
             return account
 
     # Step 3: Koi bhi Bank/Cash account
-    fallback = frappe.db.get_value(
-        "Account",
-        {
-            "company": company,
-            "account_type": ["in", ["Bank", "Cash"]],
-            "is_group": 0,
-            "disabled": 0,
-        },
-        "name",
-    )
+    fallback = account_map["fallback_bank_cash"]
     if fallback:
         _log("ACCOUNT_RESOLVE", f"Fallback Bank/Cash account: {fallback}")
         return fallback
@@ -460,6 +590,7 @@ def _get_safe_paid_to_account(mode_of_payment: str, company: str, payment_mode_l
 # ══════════════════════════════════════════════════════════════════
 
 @frappe.whitelist()
+@instrument
 def get_payment_account(mode_of_payment, company):
     """
     Get the default account for a Mode of Payment for a given company.
@@ -470,15 +601,11 @@ def get_payment_account(mode_of_payment, company):
     try:
         if not mode_of_payment or not company:
             return ""
-        account = frappe.db.get_value(
-            "Mode of Payment Account",
-            {"parent": mode_of_payment, "company": company},
-            "default_account",
-        )
+        account = _get_account_map(company)["mode_of_payment"].get(mode_of_payment)
         if not account:
             return ""
         # ✅ NEW CHECK: Receivable/Payable account paid_to mein invalid hai
-        if _is_receivable_or_payable_account(account):
+        if _is_receivable_or_payable_account(account, company):
             _log("ACCOUNT_WARN",
                  f"MoP '{mode_of_payment}' account '{account}' is Receivable/Payable "
                  f"for company '{company}'. Returning empty so frontend uses fallback.")
@@ -490,6 +617,7 @@ def get_payment_account(mode_of_payment, company):
 
 
 @frappe.whitelist()
+@instrument
 def get_receivable_account(company):
     """
     Get the default receivable account for a company.
@@ -498,21 +626,19 @@ def get_receivable_account(company):
     try:
         if not company:
             return ""
-        account = frappe.db.get_value("Company", company, "default_receivable_account")
-        if account:
-            return account
-        account = frappe.db.get_value(
-            "Account",
-            {"company": company, "account_type": "Receivable", "is_group": 0},
-            "name",
+        account_map = _get_account_map(company)
+        return (
+            account_map["company"].get("default_receivable_account")
+            or account_map["fallback_receivable"]
+            or ""
         )
-        return account or ""
     except Exception:
         frappe.log_error(frappe.get_traceback(), "get_receivable_account failed")
         return ""
 
 
 @frappe.whitelist()
+@instrument
 def get_company_account(company, fieldname):
     """
     Get a specific account field from the Company doctype.
@@ -521,28 +647,23 @@ def get_company_account(company, fieldname):
     try:
         if not company or not fieldname:
             return ""
-        allowed_fields = {
-            "default_cash_account",
-            "default_bank_account",
-            "default_receivable_account",
-            "default_payable_account",
-        }
-        if fieldname not in allowed_fields:
+        if fieldname not in COMPANY_ACCOUNT_FIELDS:
             frappe.throw(f"Field '{fieldname}' is not allowed.")
-        account = frappe.db.get_value("Company", company, fieldname)
-        return account or ""
+        return _get_account_map(company)["company"].get(fieldname) or ""
     except Exception:
         frappe.log_error(frappe.get_traceback(), "get_company_account failed")
         return ""
 
 
 @frappe.whitelist()
+@instrument
 def get_print_format():
     """Returns best print format name for Sales Invoice."""
     return _get_print_format()
 
 
 @frappe.whitelist()
+@instrument
 def get_invoice_outstanding(invoice_name: str) -> dict:
     """
     Returns FRESH outstanding_amount directly from DB.
@@ -572,6 +693,7 @@ def get_invoice_outstanding(invoice_name: str) -> dict:
 
 
 @frappe.whitelist()
+@instrument
 def api_send_payment_request(invoice_name: str, send_count: int = 1) -> dict:
     """Send payment request email with invoice PDF attached."""
     return send_payment_request_email(invoice_name, int(send_count))
@@ -585,78 +707,29 @@ def _force_reconcile_invoice(invoice_name: str, payment_entry_name: str, allocat
     """
     Payment Entry submit hone ke baad invoice se manually reconcile karo.
     Invoice ka outstanding_amount aur status "Paid" hoga.
+    Single pair = _force_reconcile_invoices ka ek-row case.
     """
-    try:
-        _log("RECONCILE", f"Force reconciling {invoice_name} with {payment_entry_name}")
+    _log("RECONCILE", f"Force reconciling {invoice_name} with {payment_entry_name}")
+    _force_reconcile_invoices([(invoice_name, payment_entry_name, allocated_amount)])
 
-        # ── 1. GL Entry: against_voucher set karo ────────────────────────────
-        frappe.db.sql("""
-            UPDATE `tabGL Entry`
-            SET
-                against_voucher      = %(invoice)s,
-                against_voucher_type = 'Sales Invoice'
-            WHERE
-                voucher_no           = %(pe)s
-                AND account          IN (
-                    SELECT debit_to FROM `tabSales Invoice` WHERE name = %(invoice)s
-                )
-                AND (against_voucher IS NULL OR against_voucher = '')
-                AND docstatus = 1
-        """, {"invoice": invoice_name, "pe": payment_entry_name})
-
-        _log("RECONCILE", "GL Entry against_voucher updated")
-
-        # ── 2. Payment Ledger Entry (ERPNext v14+) ────────────────────────────
-        try:
-            if frappe.db.table_exists("Payment Ledger Entry"):
-                frappe.db.sql("""
-                    UPDATE `tabPayment Ledger Entry`
-                    SET
-                        against_voucher_no   = %(invoice)s,
-                        against_voucher_type = 'Sales Invoice'
-                    WHERE
-                        voucher_no   = %(pe)s
-                        AND (against_voucher_no IS NULL OR against_voucher_no = '')
-                        AND docstatus = 1
-                """, {"invoice": invoice_name, "pe": payment_entry_name})
-                _log("RECONCILE", "Payment Ledger Entry updated")
-        except Exception as ple_err:
-            _log("RECONCILE_WARN", f"Payment Ledger Entry update skipped: {ple_err}")
 
-        # ── 3. outstanding_amount recalculate karo ────────────────────────────
+def _recompute_outstanding_single(invoice_name: str):
+    """
+    Set-based recompute fail hone pe fallback — ERPNext ledger se outstanding.
+    Dono na chalein to submit wala outstanding hi rehta hai (woh sahi hai).
+    """
+    try:
+        from erpnext.accounts.utils import update_outstanding_amounts
+        update_outstanding_amounts("Sales Invoice", invoice_name)
+        _log("RECONCILE", f"update_outstanding_amounts called for {invoice_name}")
+    except ImportError:
         try:
-            from erpnext.accounts.utils import update_outstanding_amounts
-            update_outstanding_amounts("Sales Invoice", invoice_name)
-            _log("RECONCILE", "update_outstanding_amounts called successfully")
-        except ImportError:
-            try:
-                frappe.get_doc("Sales Invoice", invoice_name).set_outstanding_amount()
-                _log("RECONCILE", "set_outstanding_amount called (older ERPNext)")
-            except Exception as old_err:
-                _log("RECONCILE_WARN", f"Outstanding update fallback failed: {old_err}")
-                _recalculate_outstanding_direct(invoice_name, allocated_amount)
-
-        # ── 4. Invoice status update karo ────────────────────────────────────
-        _update_invoice_status(invoice_name)
-
-        _log("RECONCILE", f"Reconciliation complete for {invoice_name}")
-
-    except Exception as e:
-        # Payment Entry valid hai, reconciliation fail bhi ho to log karo
-        _log_error("FORCE_RECONCILE")
-        _log("RECONCILE_WARN", f"Reconciliation failed (payment entry still valid): {e}")
-
-
-def _recalculate_outstanding_direct(invoice_name: str, allocated_amount: float):
-    """Direct SQL se outstanding_amount update karo — last resort fallback."""
-    current = frappe.db.get_value("Sales Invoice", invoice_name, "outstanding_amount")
-    new_outstanding = max(0, flt(current) - flt(allocated_amount))
-    frappe.db.set_value(
-        "Sales Invoice", invoice_name,
-        "outstanding_amount", new_outstanding,
-        update_modified=False,
-    )
-    _log("RECONCILE", f"Direct SQL outstanding update: {current} → {new_outstanding}")
+            frappe.get_doc("Sales Invoice", invoice_name).set_outstanding_amount()
+            _log("RECONCILE", f"set_outstanding_amount called for {invoice_name} (older ERPNext)")
+        except Exception:
+            frappe.log_error(frappe.get_traceback(), f"PaymentRequest — OUTSTANDING_FALLBACK {invoice_name}")
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), f"PaymentRequest — OUTSTANDING_FALLBACK {invoice_name}")
 
 
 def _update_invoice_status(invoice_name: str):
@@ -686,11 +759,164 @@ def _update_invoice_status(invoice_name: str):
     _log("RECONCILE", f"Invoice {invoice_name} status → {new_status} (outstanding: {outstanding})")
 
 
+# Worker-level cache: Payment Ledger Entry table sirf ERPNext install/migrate pe
+# badalti hai, aur migrate ke baad workers restart hote hain.
+_PLE_TABLE_EXISTS = {}
+
+
+def _has_payment_ledger() -> bool:
+    site = getattr(frappe.local, "site", None)
+    if site not in _PLE_TABLE_EXISTS:
+        _PLE_TABLE_EXISTS[site] = bool(frappe.db.table_exists("Payment Ledger Entry"))
+    return _PLE_TABLE_EXISTS[site]
+
+
+def _recompute_outstanding_and_status(invoice_names):
+    """
+    Saare affected invoices ka outstanding + status ek hi UPDATE mein.
+    Outstanding ledger se aata hai (PLE, warna GL) — ERPNext jaisa hi source.
+    """
+    invoice_names = list(set(invoice_names))
+    if not invoice_names:
+        return
+
+    if _has_payment_ledger():
+        ledger_sql = """
+            SELECT against_voucher_no AS invoice,
+                   SUM(amount_in_account_currency) AS outstanding
+            FROM `tabPayment Ledger Entry`
+            WHERE against_voucher_type = 'Sales Invoice'
+              AND against_voucher_no IN %(invoices)s
+              AND delinked = 0
+            GROUP BY against_voucher_no
+        """
+    else:
+        ledger_sql = """
+            SELECT gle.against_voucher AS invoice,
+                   SUM(gle.debit_in_account_currency - gle.credit_in_account_currency) AS outstanding
+            FROM `tabGL Entry` gle
+            INNER JOIN `tabSales Invoice` inv
+                ON inv.name = gle.against_voucher AND inv.debit_to = gle.account
+            WHERE gle.against_voucher_type = 'Sales Invoice'
+              AND gle.against_voucher IN %(invoices)s
+              AND gle.is_cancelled = 0
+            GROUP BY gle.against_voucher
+        """
+
+    frappe.db.sql(f"""
+        UPDATE `tabSales Invoice` si
+        INNER JOIN ({ledger_sql}) ledger ON ledger.invoice = si.name
+        SET
+            si.outstanding_amount = ledger.outstanding,
+            si.status = CASE
+                WHEN ledger.outstanding <= 0 THEN 'Paid'
+                WHEN si.due_date < %(today)s THEN 'Overdue'
+                ELSE 'Unpaid'
+            END
+        WHERE si.docstatus = 1
+    """, {"invoices": tuple(invoice_names), "today": frappe.utils.today()})
+    _log("RECONCILE", f"Outstanding + status recomputed for {len(invoice_names)} invoice(s)")
+
+
+def _pairs_table(pairs) -> tuple:
+    """(invoice, payment_entry) pairs ko ek derived table bana do — JOIN ke liye."""
+    rows = " UNION ALL ".join(["SELECT %s AS invoice, %s AS pe"] * len(pairs))
+    values = [v for invoice, pe in pairs for v in (invoice, pe)]
+    return f"({rows})", values
+
+
+def _force_reconcile_invoices(pairs):
+    """
+    pairs: [(invoice_name, payment_entry_name, allocated_amount), ...]
+    GL Entry, Payment Ledger Entry aur outstanding/status — teeno set-based,
+    chahe ek pair ho ya hazaar. Payment Entry valid rehti hai agar yeh fail ho.
+    """
+    if not pairs:
+        return
+    try:
+        pair_sql, values = _pairs_table([(p[0], p[1]) for p in pairs])
+
+        # ── 1. GL Entry: against_voucher set karo (sab pairs ek saath) ──────
+        frappe.db.sql(f"""
+            UPDATE `tabGL Entry` gle
+            INNER JOIN {pair_sql} pairs ON pairs.pe = gle.voucher_no
+            INNER JOIN `tabSales Invoice` si
+                ON si.name = pairs.invoice AND si.debit_to = gle.account
+            SET
+                gle.against_voucher      = pairs.invoice,
+                gle.against_voucher_type = 'Sales Invoice'
+            WHERE
+                (gle.against_voucher IS NULL OR gle.against_voucher = '')
+                AND gle.docstatus = 1
+        """, values)
+
+        # ── 2. Payment Ledger Entry (ERPNext v14+) ──────────────────────────
+        try:
+            if _has_payment_ledger():
+                frappe.db.sql(f"""
+                    UPDATE `tabPayment Ledger Entry` ple
+                    INNER JOIN {pair_sql} pairs ON pairs.pe = ple.voucher_no
+                    SET
+                        ple.against_voucher_no   = pairs.invoice,
+                        ple.against_voucher_type = 'Sales Invoice'
+                    WHERE
+                        (ple.against_voucher_no IS NULL OR ple.against_voucher_no = '')
+                        AND ple.docstatus = 1
+                """, values)
+        except Exception as ple_err:
+            _log("RECONCILE_WARN", f"Payment Ledger Entry update skipped: {ple_err}")
+
+        _log("RECONCILE", f"GL/PLE reconciled for {len(pairs)} payment entries")
+
+    except Exception as e:
+        _log_error("FORCE_RECONCILE")
+        _log("RECONCILE_WARN", f"Reconciliation failed (payment entries still valid): {e}")
+        return
+
+    # ── 3 + 4. Outstanding aur status — saare invoices ek pass mein ─────────
+    try:
+        _recompute_outstanding_and_status([p[0] for p in pairs])
+    except Exception:
+        # PaymentEntry.submit() outstanding pehle hi ghata chuka hai — allocated
+        # dobara minus nahi. Ledger se per-invoice recompute (ERPNext).
+        _log_error("FORCE_RECONCILE_OUTSTANDING")
+        for invoice_name in dict.fromkeys(p[0] for p in pairs):
+            _recompute_outstanding_single(invoice_name)
+            _update_invoice_status(invoice_name)
+
+
 # ══════════════════════════════════════════════════════════════════
 # MAIN: CREATE PAYMENT ENTRY
 # ══════════════════════════════════════════════════════════════════
 
+@contextmanager
+def _skip_allocated_amount_validation():
+    """
+    ERPNext's validate_allocated_amount_with_latest_data() GL entries se
+    outstanding compute karta hai — stale data se "already paid" throw karta hai.
+    Caller fresh DB validation pehle kar chuka hota hai; block ke andar yeh
+    method no-op hai, bahar nikalte hi ALWAYS restore.
+    """
+    try:
+        from erpnext.accounts.doctype.payment_entry.payment_entry import PaymentEntry
+        _original_validate_allocated = PaymentEntry.validate_allocated_amount_with_latest_data
+    except Exception as patch_err:
+        _log("PATCH_WARN", f"Could not patch validate_allocated_amount_with_latest_data: {patch_err}")
+        yield
+        return
+
+    def _skip_gl_allocated_check(self):
+        pass  # No-op: fresh DB data se validation already done
+
+    PaymentEntry.validate_allocated_amount_with_latest_data = _skip_gl_allocated_check
+    try:
+        yield
+    finally:
+        PaymentEntry.validate_allocated_amount_with_latest_data = _original_validate_allocated
+
+
 @frappe.whitelist()
+@instrument
 def create_payment_entry(doc: str) -> dict:
     """
     Create and submit a Payment Entry via a single whitelisted call.
@@ -781,7 +1007,7 @@ def create_payment_entry(doc: str) -> dict:
     mode_of_payment = doc.get("mode_of_payment") or "Cash"
     current_paid_to = doc.get("paid_to", "")
 
-    if not current_paid_to or _is_receivable_or_payable_account(current_paid_to):
+    if not current_paid_to or _is_receivable_or_payable_account(current_paid_to, company):
         if current_paid_to:
             _log("ACCOUNT_FIX",
                  f"paid_to '{current_paid_to}' is Receivable/Payable — auto-fixing")
@@ -812,55 +1038,183 @@ def create_payment_entry(doc: str) -> dict:
         "allocated":         allocated,
     })
 
-    # ── Step 3: ERPNext GL-based validation bypass ────────────────────────────
-    try:
-        from erpnext.accounts.doctype.payment_entry.payment_entry import PaymentEntry
-        _original_validate_allocated = PaymentEntry.validate_allocated_amount_with_latest_data
+    # ── Step 3 + 4: GL-based validation bypass, create, insert, submit ───────
+    with _skip_allocated_amount_validation():
+        try:
+            pe = frappe.get_doc(doc)
+            pe.insert(ignore_permissions=True)
+            pe.submit()
 
-        def _skip_gl_allocated_check(self):
-            pass  # No-op: fresh DB data se validation already done
+            # Force reconcile so invoice status updates to "Paid"
+            _force_reconcile_invoice(invoice_name, pe.name, allocated)
 
-        PaymentEntry.validate_allocated_amount_with_latest_data = _skip_gl_allocated_check
-        _patched = True
-    except Exception as patch_err:
-        _log("PATCH_WARN", f"Could not patch validate_allocated_amount_with_latest_data: {patch_err}")
-        _patched = False
-        _original_validate_allocated = None
+            frappe.db.commit()
 
-    # ── Step 4: Create, insert, submit ───────────────────────────────────────
-    try:
-        pe = frappe.get_doc(doc)
-        pe.insert(ignore_permissions=True)
-        pe.submit()
+            _log("CREATE_PE", f"Payment Entry {pe.name} created, submitted, reconciled")
 
-        # Force reconcile so invoice status updates to "Paid"
-        _force_reconcile_invoice(invoice_name, pe.name, allocated)
+            return {
+                "name":      pe.name,
+                "docstatus": pe.docstatus,
+                "status":    "success",
+            }
 
-        frappe.db.commit()
+        except Exception:
+            frappe.db.rollback()
+            _log_error("CREATE_PAYMENT_ENTRY")
+            raise
 
-        _log("CREATE_PE", f"Payment Entry {pe.name} created, submitted, reconciled")
 
-        return {
-            "name":      pe.name,
-            "docstatus": pe.docstatus,
-            "status":    "success",
+# ══════════════════════════════════════════════════════════════════
+# BULK: CASH COLLECTION ROUND
+#
+# Delivery staff route pe dozens of households se payment collect karta hai.
+# Ek call mein saari entries: outstanding ek query, accounts ek baar,
+# validation bypass ek baar, chunked commits, set-based reconcile.
+# ══════════════════════════════════════════════════════════════════
+
+BULK_PAYMENT_CHUNK_SIZE = 25
+
+_REFERENCE_PREFIX = {"Cash": "CASH", "UPI": "UPI", "Cheque": "CHQ"}
+
+
+def _build_bulk_payment_doc(inv, amount: float, mode_of_payment: str, paid_to: str,
+                            posting_date, reference_no: str | None = None) -> dict:
+    return {
+        "doctype":         "Payment Entry",
+        "payment_type":    "Receive",
+        "mode_of_payment": mode_of_payment,
+        "party_type":      "Customer",
+        "party":           inv.customer,
+        "party_name":      inv.customer_name,
+        "posting_date":    posting_date,
+        "paid_amount":     amount,
+        "received_amount": amount,
+        "company":         inv.company,
+        "paid_from":       inv.debit_to,
+        "paid_to":         paid_to,
+        "reference_no":    reference_no or f"{_REFERENCE_PREFIX.get(mode_of_payment, 'PAY')}-{posting_date}",
+        "reference_date":  posting_date,
+        "remarks":         f"{mode_of_payment} Payment for {inv.name}",
+        "references": [{
+            "reference_doctype": "Sales Invoice",
+            "reference_name":    inv.name,
+            "allocated_amount":  amount,
+        }],
+    }
+
+
+@frappe.whitelist()
+@instrument
+def create_bulk_payment_entries(entries, posting_date=None) -> dict:
+    """
+    entries: [{"invoice": "...", "amount": 120, "mode_of_payment": "Cash", "reference_no": "..."}]
+    Har entry ka apna result — ek fail ho to baaki entries commit hoti rehti hain.
+    """
+    import json
+
+    if isinstance(entries, str):
+        entries = json.loads(entries)
+    if not entries or not isinstance(entries, list):
+        frappe.throw("No payment entries provided.")
+
+    posting_date = posting_date or frappe.utils.today()
+    results = [None] * len(entries)
+
+    # ── Step 1: Saare invoices ka fresh outstanding — ek query ───────────────
+    invoice_names = list({e.get("invoice") for e in entries if e.get("invoice")})
+    invoices = {}
+    if invoice_names:
+        invoices = {
+            r.name: r for r in frappe.db.sql("""
+                SELECT name, customer, customer_name, company, debit_to,
+                       outstanding_amount, docstatus
+                FROM `tabSales Invoice`
+                WHERE name IN %s
+            """, (invoice_names,), as_dict=True)
         }
+    remaining = {name: flt(inv.outstanding_amount) for name, inv in invoices.items()}
+
+    # ── Step 2: Validate + accounts resolve (per company/mode ek baar) ───────
+    paid_to_accounts = {}
+    to_create = []
+    for idx, entry in enumerate(entries):
+        invoice_name    = entry.get("invoice")
+        amount          = flt(entry.get("amount"))
+        mode_of_payment = entry.get("mode_of_payment") or entry.get("mode") or "Cash"
+        inv             = invoices.get(invoice_name)
+
+        error = None
+        if not inv:
+            error = f"Invoice '{invoice_name}' not found."
+        elif inv.docstatus != 1:
+            error = f"Invoice {invoice_name} is not submitted (docstatus={inv.docstatus})."
+        elif amount <= 0:
+            error = "Amount must be greater than 0."
+        elif amount > remaining[invoice_name]:
+            error = (
+                f"Amount \u20b9{amount:.2f} exceeds outstanding "
+                f"\u20b9{remaining[invoice_name]:.2f} for {invoice_name}."
+            )
 
-    except Exception:
-        frappe.db.rollback()
-        _log_error("CREATE_PAYMENT_ENTRY")
-        raise
+        if not error:
+            key = (inv.company, mode_of_payment)
+            if key not in paid_to_accounts:
+                paid_to_accounts[key] = _get_safe_paid_to_account(mode_of_payment, inv.company, mode_of_payment)
+            if not paid_to_accounts[key]:
+                error = f"No valid Bank/Cash account found for company '{inv.company}' ({mode_of_payment})."
+
+        if error:
+            results[idx] = {"invoice": invoice_name, "amount": amount, "status": "error", "message": error}
+            continue
+
+        remaining[invoice_name] -= amount
+        to_create.append((idx, inv, amount, mode_of_payment, paid_to_accounts[key], entry.get("reference_no")))
+
+    _log("BULK_PE", f"{len(to_create)} of {len(entries)} entries valid", {"posting_date": posting_date})
+
+    # ── Step 3: Chunks mein create + submit, chunk ke baad reconcile + commit ─
+    with _skip_allocated_amount_validation():
+        for start in range(0, len(to_create), BULK_PAYMENT_CHUNK_SIZE):
+            chunk = to_create[start:start + BULK_PAYMENT_CHUNK_SIZE]
+            reconcile_pairs = []
+
+            for idx, inv, amount, mode_of_payment, paid_to, reference_no in chunk:
+                savepoint = f"bulk_pe_{idx}"
+                frappe.db.savepoint(savepoint)
+                try:
+                    pe = frappe.get_doc(_build_bulk_payment_doc(
+                        inv, amount, mode_of_payment, paid_to, posting_date, reference_no
+                    ))
+                    pe.insert(ignore_permissions=True)
+                    pe.submit()
+                    reconcile_pairs.append((inv.name, pe.name, amount))
+                    results[idx] = {
+                        "invoice":       inv.name,
+                        "amount":        amount,
+                        "status":        "success",
+                        "payment_entry": pe.name,
+                    }
+                except Exception as e:
+                    frappe.db.rollback(save_point=savepoint)
+                    _log_error("BULK_PAYMENT_ENTRY")
+                    results[idx] = {"invoice": inv.name, "amount": amount, "status": "error", "message": str(e)}
+
+            _force_reconcile_invoices(reconcile_pairs)
+            frappe.db.commit()
+
+    created = sum(1 for r in results if r["status"] == "success")
+    _log("BULK_PE", f"Created {created}, failed {len(results) - created}")
 
-    finally:
-        # ALWAYS restore original method
-        if _patched and _original_validate_allocated is not None:
-            try:
-                PaymentEntry.validate_allocated_amount_with_latest_data = _original_validate_allocated
-            except Exception:
-                pass
+    return {
+        "status":  "success",
+        "created": created,
+        "failed":  len(results) - created,
+        "results": results,
+    }
 
 
 @frappe.whitelist()
+@instrument
 def api_debug_payment_request(invoice_name: str) -> dict:
     """Dry-run — validates all checks without sending email."""
     from frappe.utils import cstr
@@ -918,6 +1272,231 @@ def api_debug_payment_request(invoice_name: str) -> dict:
     return {"ready": len(issues) == 0, "issues": issues, **result}
 
 
+# ══════════════════════════════════════════════════════════════════
+# BULK PAYMENT REMINDER CAMPAIGN
+#
+# Ek company ke saare unpaid/overdue invoices ko reminder bhejo —
+# background job mein, batches mein, Email Queue ke through.
+# Har batch ka send_after aage shift hota hai taaki SMTP pe
+# rate_per_minute se zyada mails na jaayein.
+# ══════════════════════════════════════════════════════════════════
+
+REMINDER_BATCH_SIZE = 50
+REMINDER_RATE_PER_MINUTE = 60
+REMINDER_INVOICE_STATUSES = ("Unpaid", "Overdue", "Partly Paid")
+
+
+def _get_reminder_invoices(company: str, overdue_only: bool = False) -> list:
+    statuses = ("Overdue",) if overdue_only else REMINDER_INVOICE_STATUSES
+    return frappe.db.sql("""
+        SELECT name, customer, customer_name, company, posting_date, due_date,
+               grand_total, outstanding_amount,
+               COALESCE(custom_payment_request_count, 0) AS send_count
+        FROM `tabSales Invoice`
+        WHERE company = %(company)s
+          AND docstatus = 1
+          AND outstanding_amount > 0
+          AND status IN %(statuses)s
+        ORDER BY due_date ASC, name ASC
+    """, {"company": company, "statuses": statuses}, as_dict=True)
+
+
+def _get_customer_emails(customers, contact_fallback: bool = True) -> dict:
+    """
+    Customer.email_id / user ek query mein. contact_fallback=True ho to
+    baaki customers ke liye _get_customer_email (Contact lookups).
+    api.py ke notifications bhi yahi helper use karte hain (contact_fallback=False).
+    """
+    customers = list({c for c in customers if c})
+    if not customers:
+        return {}
+    rows = frappe.db.sql("""
+        SELECT name, email_id, user FROM `tabCustomer` WHERE name IN %s
+    """, (customers,), as_dict=True)
+    emails = {}
+    for r in rows:
+        email = (r.email_id or "").strip() or (r.user or "").strip()
+        if email:
+            emails[r.name] = email
+    if contact_fallback:
+        for customer in customers:
+            if customer not in emails:
+                emails[customer] = _get_customer_email(customer)
+    return emails
+
+
+def _insert_reminder_logs(campaign_name: str, results: list):
+    if not results:
+        return
+    now = frappe.utils.now()
+    user = frappe.session.user
+    fields = [
+        "name", "creation", "modified", "owner", "modified_by", "docstatus",
+        "campaign", "sales_invoice", "customer", "email",
+        "status", "send_count", "send_after", "message",
+    ]
+    values = [
+        (
+            frappe.generate_hash(length=10), now, now, user, user, 0,
+            campaign_name, r["invoice"], r["customer"], r.get("email"),
+            r["status"], r.get("send_count") or 0, r.get("send_after"), r.get("message") or "",
+        )
+        for r in results
+    ]
+    frappe.db.bulk_insert("Payment Reminder Log", fields, values)
+
+
+CAMPAIGN_ROLES = ("Seller", "Accounts Manager", "System Manager")
+
+
+def _check_campaign_access(company: str):
+    """
+    Sirf Seller / Accounts Manager / System Manager, aur company caller ki
+    apni seller company ho (Company pe User Permission → has_permission).
+    """
+    frappe.only_for(CAMPAIGN_ROLES)
+    if not frappe.db.get_value("Company", company, "custom_seller"):
+        frappe.throw(f"'{company}' is not a seller company.", frappe.PermissionError)
+    if "System Manager" not in frappe.get_roles() and not frappe.has_permission("Company", "read", company):
+        frappe.throw(f"Not permitted for company '{company}'.", frappe.PermissionError)
+
+
+@frappe.whitelist()
+@instrument
+def start_payment_reminder_campaign(company, overdue_only=0, batch_size=None, rate_per_minute=None) -> dict:
+    """Campaign doc banao aur background job enqueue karo. Web worker turant free."""
+    if not company:
+        frappe.throw("Company is required.")
+    _check_campaign_access(company)
+
+    running = frappe.db.get_value(
+        "Payment Reminder Campaign",
+        {"company": company, "status": ["in", ["Queued", "Running"]]},
+        "name",
+    )
+    if running:
+        frappe.throw(f"Reminder campaign {running} is already in progress for '{company}'.")
+
+    campaign = frappe.new_doc("Payment Reminder Campaign")
+    campaign.company         = company
+    campaign.overdue_only    = 1 if frappe.utils.cint(overdue_only) else 0
+    campaign.batch_size      = frappe.utils.cint(batch_size) or frappe.conf.get("payment_reminder_batch_size") or REMINDER_BATCH_SIZE
+    campaign.rate_per_minute = frappe.utils.cint(rate_per_minute) or frappe.conf.get("payment_reminder_rate_per_minute") or REMINDER_RATE_PER_MINUTE
+    campaign.status          = "Queued"
+    campaign.flags.ignore_permissions = True
+    campaign.insert()
+
+    frappe.enqueue(
+        "my_frappe_app.payment_utils.run_payment_reminder_campaign",
+        queue="long",
+        timeout=4 * 60 * 60,
+        job_id=f"payment_reminder_campaign::{campaign.name}",
+        enqueue_after_commit=True,
+        campaign_name=campaign.name,
+    )
+    _log("CAMPAIGN", f"Queued {campaign.name} for {company}", {
+        "batch_size": campaign.batch_size, "rate_per_minute": campaign.rate_per_minute,
+    })
+    return {"status": "success", "campaign": campaign.name}
+
+
+def run_payment_reminder_campaign(campaign_name: str):
+    """Background job (queue=long). Har batch ke baad commit — progress UI mein dikhta hai."""
+    campaign = frappe.get_doc("Payment Reminder Campaign", campaign_name)
+    batch_size      = max(1, frappe.utils.cint(campaign.batch_size) or REMINDER_BATCH_SIZE)
+    rate_per_minute = max(1, frappe.utils.cint(campaign.rate_per_minute) or REMINDER_RATE_PER_MINUTE)
+    # Ek batch ko bhejne mein kitne seconds lagne chahiye
+    batch_interval  = 60.0 * batch_size / rate_per_minute
+
+    invoices = _get_reminder_invoices(campaign.company, bool(campaign.overdue_only))
+    started  = frappe.utils.now_datetime()
+    frappe.db.set_value("Payment Reminder Campaign", campaign_name, {
+        "status":         "Running",
+        "started_on":     started,
+        "total_invoices": len(invoices),
+    }, update_modified=False)
+    frappe.db.commit()
+
+    emails = _get_customer_emails(inv.customer for inv in invoices)
+    queued = skipped = failed = 0
+
+    try:
+        for batch_no, start in enumerate(range(0, len(invoices), batch_size)):
+            batch      = invoices[start:start + batch_size]
+            send_after = frappe.utils.add_to_date(started, seconds=batch_no * batch_interval)
+            results    = []
+
+            for inv in batch:
+                send_count = frappe.utils.cint(inv.send_count) + 1
+                email      = emails.get(inv.customer)
+                row = {
+                    "invoice":    inv.name,
+                    "customer":   inv.customer,
+                    "email":      email,
+                    "send_count": send_count,
+                    "send_after": send_after,
+                }
+                if not email:
+                    skipped += 1
+                    results.append(dict(row, status="Skipped", message="No email found for customer"))
+                    continue
+                try:
+                    pdf = _generate_pdf(inv.name)
+                    _send_email(inv, pdf, email, send_count, now=False, send_after=send_after)
+                    queued += 1
+                    results.append(dict(row, status="Queued"))
+                except Exception as e:
+                    _log_error("CAMPAIGN_INVOICE_FAIL")
+                    failed += 1
+                    results.append(dict(row, status="Failed", message=str(e)[:500]))
+
+            _record_send_count([r["invoice"] for r in results if r["status"] == "Queued"])
+            _insert_reminder_logs(campaign_name, results)
+            frappe.db.set_value("Payment Reminder Campaign", campaign_name, {
+                "queued_count":  queued,
+                "skipped_count": skipped,
+                "failed_count":  failed,
+            }, update_modified=False)
+            frappe.db.commit()
+
+        status = "Completed"
+    except Exception:
+        frappe.db.rollback()
+        _log_error("CAMPAIGN_FAIL")
+        status = "Failed"
+
+    frappe.db.set_value("Payment Reminder Campaign", campaign_name, {
+        "status":      status,
+        "finished_on": frappe.utils.now_datetime(),
+    }, update_modified=False)
+    frappe.db.commit()
+    _log("CAMPAIGN", f"{campaign_name} {status}", {
+        "total": len(invoices), "queued": queued, "skipped": skipped, "failed": failed,
+    })
+
+
+@frappe.whitelist()
+@instrument
+def get_payment_reminder_campaign(campaign_name: str) -> dict:
+    """Campaign progress + Failed/Skipped invoices ki list."""
+    campaign = frappe.db.get_value(
+        "Payment Reminder Campaign", campaign_name,
+        ["name", "company", "status", "total_invoices", "queued_count",
+         "skipped_count", "failed_count", "started_on", "finished_on"],
+        as_dict=True,
+    )
+    if not campaign:
+        frappe.throw(f"Campaign '{campaign_name}' not found.")
+    _check_campaign_access(campaign.company)
+    campaign["problems"] = frappe.get_all(
+        "Payment Reminder Log",
+        filters={"campaign": campaign_name, "status": ["in", ["Skipped", "Failed"]]},
+        fields=["sales_invoice", "customer", "status", "message"],
+        order_by="creation asc",
+    )
+    return campaign
+
+
 # ── Helper ────────────────────────────────────────────────────────
 def flt(value, precision=None):
     try:
@@ -0,0 +1,79 @@
+# ══════════════════════════════════════════════════════════════════
+# REALTIME BATCHER — per-user coalesced customer notifications
+#
+# Pehle har action pe alag events jaate the (subscription_update +
+# msgprint, har order pe order_update) aur customer ka browser har
+# event pe sab kuch refetch karta tha.
+#
+# Ab: transaction ke andar saare changes per user collect hote hain aur
+# commit ke baad har user ko EK typed event jaata hai:
+#
+#   event: "customer_changes"
+#   message: {
+#       "customer":       <user email>,
+#       "orders":         [Sales Order names — created/updated],
+#       "removed_orders": [Sales Order names — deleted/rejected],
+#       "subscriptions":  [Newspaper Subscription names],
+#       "actions":        {<doc name>: "accepted" | "rejected" | ...},
+#       "messages":       [plain-text notification for toast],
+#   }
+#
+# Bulk jobs (200 orders accept) mein har chunk commit pe ek event per
+# customer jaata hai. Rollback pe pending events discard.
+# ══════════════════════════════════════════════════════════════════
+import frappe
+from frappe.utils import strip_html_tags
+
+REALTIME_EVENT = "customer_changes"
+
+_DOCTYPE_KEY = {
+    "Sales Order":            "orders",
+    "Newspaper Subscription": "subscriptions",
+}
+
+
+def _new_batch(user):
+    return {
+        "customer":       user,
+        "orders":         [],
+        "removed_orders": [],
+        "subscriptions":  [],
+        "actions":        {},
+        "messages":       [],
+    }
+
+
+def queue_customer_change(user, doctype, name, action, message=None, removed=False):
+    """
+    Change ko current transaction ke batch mein daalo. Publish commit ke baad hota hai.
+    removed=True → doc delete ho chuka hai (client list se hata de).
+    """
+    if not user or not name:
+        return
+
+    batches = frappe.flags.get("realtime_batches")
+    if batches is None:
+        batches = frappe.flags.realtime_batches = {}
+        frappe.db.after_commit.add(flush_customer_changes)
+        frappe.db.after_rollback.add(lambda: frappe.flags.pop("realtime_batches", None))
+
+    batch = batches.setdefault(user, _new_batch(user))
+    key = "removed_orders" if removed else _DOCTYPE_KEY.get(doctype)
+    if key and name not in batch[key]:
+        batch[key].append(name)
+    if action:
+        batch["actions"][name] = action
+    if message:
+        # Notification Log wala text <b> markup ke saath hota hai — toast
+        # plain text render karta hai (v-html nahi, names user ke hain)
+        batch["messages"].append(strip_html_tags(message))
+
+
+def flush_customer_changes():
+    """after_commit callback — har user ko ek event."""
+    batches = frappe.flags.pop("realtime_batches", None) or {}
+    for user, batch in batches.items():
+        try:
+            frappe.publish_realtime(event=REALTIME_EVENT, message=batch, user=user)
+        except Exception:
+            frappe.log_error(frappe.get_traceback(), "Realtime Batch Publish Error")
@@ -0,0 +1,231 @@
+# ══════════════════════════════════════════════════════════════════
+# RECEIVABLES AGING — per (company, customer) outstanding buckets
+#
+# "Receivable Aging" table har (company, customer) ka outstanding
+# 0-30 / 31-60 / 61-90 / 90+ days (due_date se) buckets mein rakhta hai.
+#
+#   - Sales Invoice / Payment Entry submit-cancel → sirf affected
+#     (company, customer) pairs refresh (commit se pehle, ek baar)
+#   - Nightly sweep → poori table rebuild, buckets aage shift hote hain
+#
+# Frontend calls:
+#   /api/method/my_frappe_app.receivables.get_receivables_aging
+# ══════════════════════════════════════════════════════════════════
+import frappe
+from frappe.utils import cint, flt, nowdate
+
+from my_frappe_app.instrumentation import instrument
+
+AGING_FIELDS = [
+    "name", "creation", "modified", "owner", "modified_by", "docstatus",
+    "company", "customer", "total_outstanding",
+    "bucket_0_30", "bucket_31_60", "bucket_61_90", "bucket_90_plus",
+    "invoice_count", "oldest_due_date", "as_of_date",
+]
+
+AGING_BUCKETS = ("bucket_0_30", "bucket_31_60", "bucket_61_90", "bucket_90_plus")
+
+AGING_INSERT_CHUNK = 1000
+
+
+def _aging_name(company: str, customer: str) -> str:
+    """Receivable Aging autoname (format:{company}-{customer}) ke jaisa hi."""
+    return f"{company}-{customer}"
+
+
+def _compute_aging(pairs=None, as_of=None) -> list:
+    """
+    Ek grouped query: outstanding invoices → per (company, customer) buckets.
+    pairs=None → poori site.
+    """
+    as_of = as_of or nowdate()
+    values = {"as_of": as_of}
+    pair_condition = ""
+    if pairs:
+        values["companies"] = tuple({p[0] for p in pairs})
+        values["customers"] = tuple({p[1] for p in pairs})
+        pair_condition = "AND company IN %(companies)s AND customer IN %(customers)s"
+
+    rows = frappe.db.sql(f"""
+        SELECT company, customer,
+               SUM(outstanding_amount) AS total_outstanding,
+               SUM(CASE WHEN age <= 30 THEN outstanding_amount ELSE 0 END) AS bucket_0_30,
+               SUM(CASE WHEN age BETWEEN 31 AND 60 THEN outstanding_amount ELSE 0 END) AS bucket_31_60,
+               SUM(CASE WHEN age BETWEEN 61 AND 90 THEN outstanding_amount ELSE 0 END) AS bucket_61_90,
+               SUM(CASE WHEN age > 90 THEN outstanding_amount ELSE 0 END) AS bucket_90_plus,
+               COUNT(*) AS invoice_count,
+               MIN(due) AS oldest_due_date
+        FROM (
+            SELECT company, customer, outstanding_amount,
+                   COALESCE(due_date, posting_date) AS due,
+                   DATEDIFF(%(as_of)s, COALESCE(due_date, posting_date)) AS age
+            FROM `tabSales Invoice`
+            WHERE docstatus = 1 AND outstanding_amount > 0
+              {pair_condition}
+        ) inv
+        GROUP BY company, customer
+    """, values, as_dict=True)
+
+    if pairs:
+        wanted = set(pairs)
+        rows = [r for r in rows if (r.company, r.customer) in wanted]
+    return rows
+
+
+def _write_aging(rows, delete_names=None, as_of=None):
+    """Purani rows delete, nayi bulk insert — same transaction."""
+    as_of = as_of or nowdate()
+    if delete_names is None:
+        frappe.db.sql("DELETE FROM `tabReceivable Aging`")
+    elif delete_names:
+        frappe.db.sql(
+            "DELETE FROM `tabReceivable Aging` WHERE name IN %s", (tuple(delete_names),)
+        )
+
+    now = frappe.utils.now()
+    user = frappe.session.user
+    values = [
+        (
+            _aging_name(r.company, r.customer), now, now, user, user, 0,
+            r.company, r.customer, flt(r.total_outstanding),
+            flt(r.bucket_0_30), flt(r.bucket_31_60), flt(r.bucket_61_90), flt(r.bucket_90_plus),
+            cint(r.invoice_count), r.oldest_due_date, as_of,
+        )
+        for r in rows
+    ]
+    for start in range(0, len(values), AGING_INSERT_CHUNK):
+        frappe.db.bulk_insert(
+            "Receivable Aging", AGING_FIELDS, values[start:start + AGING_INSERT_CHUNK]
+        )
+
+
+def refresh_receivable_aging(pairs):
+    """Sirf diye gaye (company, customer) pairs recompute karo."""
+    pairs = {(c, cust) for c, cust in pairs if c and cust}
+    if not pairs:
+        return
+    rows = _compute_aging(pairs)
+    _write_aging(rows, delete_names=[_aging_name(c, cust) for c, cust in pairs])
+
+
+# ── Doc event hooks ───────────────────────────────────────────────
+
+def _flush_pending_aging():
+    pairs = frappe.flags.pop("pending_receivable_aging", None)
+    if pairs:
+        try:
+            refresh_receivable_aging(pairs)
+        except Exception:
+            frappe.log_error(frappe.get_traceback(), "Receivable Aging Refresh Error")
+
+
+def _mark_aging_dirty(company, customer):
+    """
+    Pair ko pending set mein daalo; commit se pehle ek hi baar refresh hota hai.
+    Bulk payments (25 PEs per chunk) mein isse har PE pe alag query nahi lagti.
+    """
+    if not company or not customer:
+        return
+    pending = frappe.flags.get("pending_receivable_aging")
+    if pending is None:
+        pending = frappe.flags.pending_receivable_aging = set()
+        frappe.db.before_commit.add(_flush_pending_aging)
+        frappe.db.after_rollback.add(lambda: frappe.flags.pop("pending_receivable_aging", None))
+    pending.add((company, customer))
+
+
+def on_sales_invoice_change(doc, method=None):
+    """
+    hooks.py -> doc_events -> Sales Invoice -> on_submit / on_cancel
+    """
+    _mark_aging_dirty(doc.company, doc.customer)
+
+
+def on_payment_entry_change(doc, method=None):
+    """
+    hooks.py -> doc_events -> Payment Entry -> on_submit / on_cancel
+    """
+    if doc.party_type == "Customer":
+        _mark_aging_dirty(doc.company, doc.party)
+
+
+def rebuild_receivable_aging():
+    """
+    Nightly sweep (hooks.py scheduler_events). Date badalte hi invoices
+    agle bucket mein jaate hain — isliye poori table ek pass mein rebuild.
+    """
+    as_of = nowdate()
+    rows = _compute_aging(as_of=as_of)
+    _write_aging(rows, as_of=as_of)
+    frappe.db.commit()
+    frappe.logger().info(f"Receivable Aging rebuilt: {len(rows)} customers as of {as_of}")
+    return {"customers": len(rows), "as_of": as_of}
+
+
+# ── API ───────────────────────────────────────────────────────────
+
+@frappe.whitelist()
+@instrument
+def get_receivables_aging(company=None, customer=None, bucket=None, page=1, page_length=20):
+    """
+    Seller UI ke liye paginated aging list + company totals.
+    bucket diya ho (e.g. 'bucket_90_plus') to sirf wahi customers jinka us bucket mein amount hai,
+    aur sorting bhi usi bucket pe.
+    """
+    try:
+        if not company:
+            company = frappe.db.get_value("Company", {"custom_seller": 1}, "name")
+        if not company:
+            return {"status": "error", "message": "Seller not found"}
+
+        page        = max(1, cint(page))
+        page_length = min(max(1, cint(page_length) or 20), 200)
+
+        conditions = ["ra.company = %(company)s"]
+        values = {"company": company, "limit": page_length, "offset": (page - 1) * page_length}
+        if customer:
+            conditions.append("(ra.customer LIKE %(customer)s OR c.customer_name LIKE %(customer)s)")
+            values["customer"] = f"%{customer}%"
+
+        order_field = "total_outstanding"
+        if bucket in AGING_BUCKETS:
+            conditions.append(f"ra.{bucket} > 0")
+            order_field = bucket
+
+        where = " AND ".join(conditions)
+
+        rows = frappe.db.sql(f"""
+            SELECT ra.customer, c.customer_name, ra.total_outstanding,
+                   ra.bucket_0_30, ra.bucket_31_60, ra.bucket_61_90, ra.bucket_90_plus,
+                   ra.invoice_count, ra.oldest_due_date, ra.as_of_date
+            FROM `tabReceivable Aging` ra
+            LEFT JOIN `tabCustomer` c ON c.name = ra.customer
+            WHERE {where}
+            ORDER BY ra.{order_field} DESC, ra.customer ASC
+            LIMIT %(limit)s OFFSET %(offset)s
+        """, values, as_dict=True)
+
+        totals = frappe.db.sql(f"""
+            SELECT COUNT(*) AS customers,
+                   COALESCE(SUM(ra.total_outstanding), 0) AS total_outstanding,
+                   COALESCE(SUM(ra.bucket_0_30), 0) AS bucket_0_30,
+                   COALESCE(SUM(ra.bucket_31_60), 0) AS bucket_31_60,
+                   COALESCE(SUM(ra.bucket_61_90), 0) AS bucket_61_90,
+                   COALESCE(SUM(ra.bucket_90_plus), 0) AS bucket_90_plus
+            FROM `tabReceivable Aging` ra
+            LEFT JOIN `tabCustomer` c ON c.name = ra.customer
+            WHERE {where}
+        """, values, as_dict=True)[0]
+
+        return {
+            "status":      "success",
+            "company":     company,
+            "rows":        rows,
+            "totals":      totals,
+            "page":        page,
+            "page_length": page_length,
+            "has_more":    page * page_length < cint(totals.customers),
+        }
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Receivables Aging Error")
+        return {"status": "error", "message": str(e)}
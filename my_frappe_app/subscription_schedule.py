@@ -0,0 +1,114 @@
+# ══════════════════════════════════════════════════════════════════
+# SUBSCRIPTION SCHEDULE DAY — weekday-wise normalized schedule
+#
+# Newspaper Subscription Item mein qty 7 alag columns (monday_qty …
+# sunday_qty) mein hai, isliye har query ko column dynamically chunna
+# padta tha. "Subscription Schedule Day" same data ko rows mein rakhta hai:
+#
+#   (subscription, item_code, weekday, qty)    — sirf qty > 0 wale din
+#
+# weekday + subscription pe index → "Tuesday ki saari deliveries" ek
+# indexed range scan. Order generation aur print-run forecast isi ko
+# padhte hain.
+#
+# Maintained: Newspaper Subscription on_update / on_trash (hooks.py).
+# Backfill: patches/backfill_subscription_schedule_day.py
+# ══════════════════════════════════════════════════════════════════
+import frappe
+
+SCHEDULE_DAY_DOCTYPE = "Subscription Schedule Day"
+
+SCHEDULE_DAY_FIELDS = [
+    "name", "creation", "modified", "owner", "modified_by", "docstatus",
+    "subscription", "item_code", "weekday", "qty",
+]
+
+
+def _row_name(child_name, weekday):
+    """Deterministic name — hook aur backfill dono same rows likhte hain."""
+    return f"{child_name}-{weekday[:3]}"
+
+
+def sync_subscription_schedule(doc, method=None):
+    """
+    hooks.py -> doc_events -> Newspaper Subscription -> on_update
+    Us subscription ki rows delete karke schedule_items se dobara likho.
+    """
+    from my_frappe_app.api import ALL_DAYS, DAY_QTY_FIELD
+
+    frappe.db.delete(SCHEDULE_DAY_DOCTYPE, {"subscription": doc.name})
+
+    now = frappe.utils.now()
+    user = frappe.session.user
+    values = []
+    for si in doc.get("schedule_items") or []:
+        if not si.item_code:
+            continue
+        for day in ALL_DAYS:
+            qty = int(si.get(DAY_QTY_FIELD[day]) or 0)
+            if qty > 0:
+                values.append((
+                    _row_name(si.name, day), now, now, user, user, 0,
+                    doc.name, si.item_code, day, qty,
+                ))
+    if values:
+        frappe.db.bulk_insert(SCHEDULE_DAY_DOCTYPE, SCHEDULE_DAY_FIELDS, values)
+
+
+def delete_subscription_schedule(doc, method=None):
+    """hooks.py -> doc_events -> Newspaper Subscription -> on_trash"""
+    frappe.db.delete(SCHEDULE_DAY_DOCTYPE, {"subscription": doc.name})
+
+
+def rebuild_subscription_schedule():
+    """
+    Poori table ek INSERT … SELECT mein (har weekday ek UNION ALL branch).
+    Backfill patch aur manual repair ke liye.
+    """
+    from my_frappe_app.api import ALL_DAYS, DAY_QTY_FIELD
+
+    frappe.db.sql(f"DELETE FROM `tab{SCHEDULE_DAY_DOCTYPE}`")
+    branches = " UNION ALL ".join(
+        f"""
+        SELECT CONCAT(nsi.name, '-{day[:3]}'), NOW(), NOW(), 'Administrator', 'Administrator', 0,
+               nsi.parent, nsi.item_code, '{day}', nsi.{DAY_QTY_FIELD[day]}
+        FROM `tabNewspaper Subscription Item` nsi
+        WHERE nsi.parenttype = 'Newspaper Subscription'
+          AND IFNULL(nsi.item_code, '') != ''
+          AND nsi.{DAY_QTY_FIELD[day]} > 0
+        """
+        for day in ALL_DAYS
+    )
+    columns = ", ".join(f"`{f}`" for f in SCHEDULE_DAY_FIELDS)
+    frappe.db.sql(f"INSERT INTO `tab{SCHEDULE_DAY_DOCTYPE}` ({columns}) {branches}")
+
+
+def ensure_schedule_day_index():
+    """(weekday, subscription) composite index — fixture se sirf single-column index banta hai."""
+    frappe.db.add_index(SCHEDULE_DAY_DOCTYPE, ["weekday", "subscription"], "weekday_subscription_index")
+
+
+def get_day_schedule(weekday, subscriptions=None):
+    """
+    {subscription: [{"item_code", "qty"}]} — ek weekday ki deliveries, ek indexed query.
+    subscriptions diya ho to sirf unki rows.
+    """
+    values = {"weekday": weekday}
+    condition = ""
+    if subscriptions is not None:
+        if not subscriptions:
+            return {}
+        values["subscriptions"] = tuple(subscriptions)
+        condition = "AND subscription IN %(subscriptions)s"
+
+    rows = frappe.db.sql(f"""
+        SELECT subscription, item_code, qty
+        FROM `tab{SCHEDULE_DAY_DOCTYPE}`
+        WHERE weekday = %(weekday)s {condition}
+        ORDER BY subscription, name
+    """, values, as_dict=True)
+
+    by_sub = {}
+    for r in rows:
+        by_sub.setdefault(r.subscription, []).append({"item_code": r.item_code, "qty": int(r.qty)})
+    return by_sub
@@ -0,0 +1,423 @@
+# ══════════════════════════════════════════════════════════════════
+# SYNTHETIC DATA — load testing ke liye reproducible dataset
+#
+#   bench --site bench.local generate-synthetic-data --scale 100000 --seed 42
+#
+# Domain ka poora shape:
+#   Territory tree (Region → State → City)
+#   Seller Companies (+ Address, city = Territory) — doc insert, kam hote hain
+#   Society Companies (+ Address per pincode)      — bulk
+#   Customers + primary Address (Dynamic Link)      — bulk
+#   Items + Daily Item Price / Daily Price Detail   — state level, recursion chale
+#   Newspaper Subscriptions + Items (varied weekday shapes, kuch expired history)
+#   Historical Sales Orders → Delivery Notes → Sales Invoices (monthly per customer)
+#
+# Master data chhota hai isliye doc insert; baaki sab frappe.db.bulk_insert
+# se customer chunks mein (har chunk ek commit). Derived tables (Subscription
+# Schedule Day, Receivable Aging) end mein set-based rebuild.
+#
+# Historical invoices pe GL / Payment Ledger entries nahi bante — outstanding
+# sirf Sales Invoice pe hai (aging isi se chalta hai). Reconciliation flows
+# ke liye real submitted documents chahiye.
+#
+# Saare records "BENCH" prefix ke saath; --reset se sirf wahi delete hote hain.
+# Same seed + scale → same dataset.
+# ══════════════════════════════════════════════════════════════════
+import random
+
+import frappe
+from frappe.utils import add_days, add_months, get_first_day, getdate, nowdate
+from frappe.utils.nestedset import rebuild_tree
+
+PREFIX = "BENCH"
+ROOT_TERRITORY = "All Territories"
+ITEM_GROUP = f"{PREFIX} Newspapers"
+CUSTOMER_CHUNK = 5000
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+WEEKDAY_FIELDS = [
+    "monday_qty", "tuesday_qty", "wednesday_qty", "thursday_qty",
+    "friday_qty", "saturday_qty", "sunday_qty",
+]
+
+# Weekday schedule shapes: roz, weekdays only, weekend only, alternate days, weekend extra
+SCHEDULE_SHAPES = [
+    [1, 1, 1, 1, 1, 1, 1],
+    [1, 1, 1, 1, 1, 0, 0],
+    [0, 0, 0, 0, 0, 1, 1],
+    [1, 0, 1, 0, 1, 0, 1],
+    [2, 1, 1, 1, 1, 2, 2],
+]
+
+STD_FIELDS = ["name", "creation", "modified", "owner", "modified_by", "docstatus"]
+CHILD_FIELDS = [*STD_FIELDS, "parent", "parenttype", "parentfield", "idx"]
+
+# --reset: in tables se BENCH rows delete (child tables parent se)
+RESET_TABLES = [
+    ("Sales Invoice Item", "parent"), ("Sales Invoice", "name"),
+    ("Delivery Note Item", "parent"), ("Delivery Note", "name"),
+    ("Sales Order Item", "parent"), ("Sales Order", "name"),
+    ("Subscription Schedule Day", "subscription"),
+    ("Newspaper Subscription Item", "parent"), ("Newspaper Subscription", "name"),
+    ("Daily Price Detail", "parent"), ("Daily Item Price", "name"),
+    ("Dynamic Link", "parent"), ("Address", "name"),
+    ("Customer", "name"), ("Receivable Aging", "customer"),
+]
+
+
+class _Rows:
+    """Doctype-wise pending rows; flush pe bulk_insert."""
+
+    def __init__(self):
+        self.now = frappe.utils.now()
+        self.rows = {}
+        self.fields = {}
+
+    def std(self, name, docstatus=0):
+        return (name, self.now, self.now, "Administrator", "Administrator", docstatus)
+
+    def child(self, name, parent, parenttype, parentfield, idx, docstatus=0):
+        return (*self.std(name, docstatus), parent, parenttype, parentfield, idx)
+
+    def add(self, doctype, fields, row):
+        self.fields.setdefault(doctype, fields)
+        self.rows.setdefault(doctype, []).append(row)
+
+    def flush(self):
+        for doctype, rows in self.rows.items():
+            frappe.db.bulk_insert(doctype, self.fields[doctype], rows, ignore_duplicates=True)
+        self.rows = {}
+
+
+# ── Masters (doc insert) ──────────────────────────────────────────
+
+def _ensure(doctype: str, name: str, doc: dict):
+    if not frappe.db.exists(doctype, name):
+        d = frappe.get_doc({"doctype": doctype, **doc})
+        d.flags.ignore_permissions = True
+        d.flags.ignore_mandatory = True
+        d.insert()
+    return name
+
+
+def _territories(states: int, cities_per_state: int) -> list:
+    """Depth-3 tree; leaf cities return karo."""
+    region = _ensure("Territory", f"{PREFIX} Region", {
+        "territory_name": f"{PREFIX} Region", "parent_territory": ROOT_TERRITORY, "is_group": 1,
+    })
+    cities = []
+    for s in range(1, states + 1):
+        state = _ensure("Territory", f"{PREFIX} State {s}", {
+            "territory_name": f"{PREFIX} State {s}", "parent_territory": region, "is_group": 1,
+        })
+        for c in range(1, cities_per_state + 1):
+            cities.append(_ensure("Territory", f"{PREFIX} City {s}-{c}", {
+                "territory_name": f"{PREFIX} City {s}-{c}", "parent_territory": state, "is_group": 0,
+            }))
+    return cities
+
+
+def _sellers(count: int, cities: list, pincodes_per_seller: int) -> list:
+    sellers = []
+    for n in range(1, count + 1):
+        name = f"{PREFIX} Seller {n}"
+        _ensure("Company", name, {
+            "company_name": name,
+            "abbr": f"BS{n}",
+            "default_currency": "INR",
+            "country": "India",
+            "custom_seller": 1,
+        })
+        accounts = frappe.db.get_value(
+            "Company", name, ["default_receivable_account", "default_income_account"], as_dict=True
+        )
+        sellers.append({
+            "name": name,
+            "city": cities[(n - 1) % len(cities)],
+            "pincodes": [f"{380000 + n * 100 + p}" for p in range(pincodes_per_seller)],
+            "debit_to": accounts.default_receivable_account,
+            "income_account": accounts.default_income_account,
+        })
+    return sellers
+
+
+def _items(count: int) -> list:
+    _ensure("Item Group", ITEM_GROUP, {
+        "item_group_name": ITEM_GROUP, "parent_item_group": "All Item Groups", "is_group": 0,
+    })
+    items = []
+    for n in range(1, count + 1):
+        code = f"{PREFIX}-PAPER-{n:03d}"
+        _ensure("Item", code, {
+            "item_code": code,
+            "item_name": f"{PREFIX} Daily {n}",
+            "item_group": ITEM_GROUP,
+            "stock_uom": "Nos",
+            "is_stock_item": 0,
+            "is_sales_item": 1,
+        })
+        items.append({"code": code, "name": f"{PREFIX} Daily {n}"})
+    return items
+
+
+# ── Bulk sections ─────────────────────────────────────────────────
+
+ADDRESS_FIELDS = [
+    *STD_FIELDS,
+    "address_title", "address_type", "address_line1", "city", "pincode", "country", "is_primary_address",
+]
+DYNAMIC_LINK_FIELDS = [*CHILD_FIELDS, "link_doctype", "link_name", "link_title"]
+
+
+def _add_address(rows, title, link_doctype, link_name, city, pincode):
+    name = f"{title}-Billing"
+    rows.add("Address", ADDRESS_FIELDS, (*rows.std(name),
+        title, "Billing", f"{title}, Main Road", city, pincode, "India", 1,
+    ))
+    rows.add("Dynamic Link", DYNAMIC_LINK_FIELDS, (*rows.child(
+        f"{name}-link", name, "Address", "links", 1,
+    ), link_doctype, link_name, title))
+
+
+def _seller_addresses_and_societies(rows, sellers, societies_per_pincode):
+    """
+    Society Companies bulk insert hote hain (har ek ka chart of accounts nahi
+    chahiye) — Company NestedSet hai, isliye flush ke baad rebuild_tree("Company").
+    """
+    company_fields = [*STD_FIELDS, "company_name", "abbr", "default_currency", "country", "custom_society"]
+    for s in sellers:
+        if not frappe.db.exists("Dynamic Link", {"link_doctype": "Company", "link_name": s["name"]}):
+            _add_address(rows, s["name"], "Company", s["name"], s["city"], s["pincodes"][0])
+        for pincode in s["pincodes"]:
+            for k in range(societies_per_pincode):
+                name = f"{PREFIX} Society {pincode}-{k + 1}"
+                rows.add("Company", company_fields, (*rows.std(name),
+                    name, f"BSO{pincode}{k + 1}", "INR", "India", 1,
+                ))
+                _add_address(rows, name, "Company", name, s["city"], pincode)
+
+
+def _prices(rows, items, states, rng):
+    price_fields = [*STD_FIELDS, "territory", "item_code", "start_date"]
+    detail_fields = [*CHILD_FIELDS, "day", "price"]
+    start = add_months(nowdate(), -24)
+    for s in range(1, states + 1):
+        for item in items:
+            name = f"{PREFIX}-DIP-{s}-{item['code']}"
+            rows.add("Daily Item Price", price_fields, (*rows.std(name),
+                f"{PREFIX} State {s}", item["code"], start,
+            ))
+            base = rng.choice([4, 5, 6, 7, 8])
+            for idx, day in enumerate(DAYS, 1):
+                rows.add("Daily Price Detail", detail_fields, (*rows.child(
+                    f"{name}-{day[:3]}", name, "Daily Item Price", "prices", idx,
+                ), day, base + (2 if day == "Sunday" else 0)))
+
+
+CUSTOMER_FIELDS = [*STD_FIELDS, "customer_name", "customer_type", "customer_group", "territory", "email_id"]
+SUB_FIELDS = [
+    *STD_FIELDS,
+    "customer", "seller", "territory", "start_date", "end_date", "status",
+    "active_key", "auto_renew", "renewal_months",
+]
+SUB_ITEM_FIELDS = [*CHILD_FIELDS, "item_code", "item_name", "is_primary_item", *WEEKDAY_FIELDS]
+SO_FIELDS = [
+    *STD_FIELDS,
+    "naming_series", "customer", "customer_name", "company", "transaction_date", "delivery_date",
+    "territory", "currency", "conversion_rate", "price_list_currency", "plc_conversion_rate",
+    "total_qty", "total", "net_total", "base_total", "base_net_total",
+    "grand_total", "base_grand_total", "rounded_total", "base_rounded_total",
+    "per_delivered", "per_billed", "status", "delivery_status", "billing_status",
+]
+SO_ITEM_FIELDS = [
+    *CHILD_FIELDS,
+    "item_code", "item_name", "description", "uom", "stock_uom", "conversion_factor",
+    "qty", "stock_qty", "rate", "base_rate", "net_rate", "amount", "base_amount", "net_amount",
+    "delivery_date", "delivered_qty", "billed_amt",
+]
+DN_FIELDS = [
+    *STD_FIELDS,
+    "naming_series", "customer", "customer_name", "company", "posting_date", "territory",
+    "currency", "conversion_rate", "total_qty", "total", "net_total",
+    "grand_total", "base_grand_total", "per_billed", "status",
+]
+DN_ITEM_FIELDS = [
+    *CHILD_FIELDS,
+    "item_code", "item_name", "description", "uom", "stock_uom", "conversion_factor",
+    "qty", "stock_qty", "rate", "amount", "against_sales_order", "so_detail",
+]
+SI_FIELDS = [
+    *STD_FIELDS,
+    "naming_series", "customer", "customer_name", "company", "posting_date", "due_date", "territory",
+    "currency", "conversion_rate", "debit_to", "total_qty", "total", "net_total",
+    "grand_total", "base_grand_total", "rounded_total", "outstanding_amount", "status",
+]
+SI_ITEM_FIELDS = [
+    *CHILD_FIELDS,
+    "item_code", "item_name", "description", "uom", "stock_uom", "conversion_factor",
+    "qty", "stock_qty", "rate", "amount", "income_account",
+    "sales_order", "so_detail", "delivery_note", "dn_detail",
+]
+
+
+def _customer_chunk(rows, start, end, sellers, items, history_months, customer_group, rng, today):
+    from my_frappe_app.api import _active_subscription_key
+
+    for n in range(start, end):
+        seller = sellers[n % len(sellers)]
+        pincode = rng.choice(seller["pincodes"])
+        customer = f"{PREFIX} Customer {n + 1:07d}"
+
+        rows.add("Customer", CUSTOMER_FIELDS, (*rows.std(customer),
+            customer, "Individual", customer_group, seller["city"],
+            f"bench.customer{n + 1:07d}@example.com",
+        ))
+        _add_address(rows, customer, "Customer", customer, seller["city"], pincode)
+
+        # Current subscription (+ aadhe customers ki ek expired history)
+        primary = rng.choice(items)
+        status = rng.choices(["Active", "Accept Pending", "Cancelled"], [85, 10, 5])[0]
+        periods = [(status, add_months(today, -rng.randint(0, 2)), add_months(today, rng.randint(1, 3)))]
+        if rng.random() < 0.5:
+            periods.append(("Expired", add_months(today, -14), add_months(today, -3)))
+
+        for p_idx, (sub_status, start_date, end_date) in enumerate(periods):
+            sub = f"{PREFIX}-SUB-{n + 1:07d}-{p_idx}"
+            active_key = (
+                _active_subscription_key(customer, seller["name"], primary["code"])
+                if sub_status in ("Active", "Accept Pending") else None
+            )
+            rows.add("Newspaper Subscription", SUB_FIELDS, (*rows.std(sub),
+                customer, seller["name"], seller["city"], start_date, end_date, sub_status,
+                active_key, 1 if rng.random() < 0.3 else 0, 1,
+            ))
+            schedule = [(primary, 1)]
+            if rng.random() < 0.3:
+                schedule.append((rng.choice(items), 0))
+            for idx, (item, is_primary) in enumerate(schedule, 1):
+                rows.add("Newspaper Subscription Item", SUB_ITEM_FIELDS, (*rows.child(
+                    f"{sub}-{idx}", sub, "Newspaper Subscription", "schedule_items", idx,
+                ), item["code"], item["name"], is_primary, *rng.choice(SCHEDULE_SHAPES)))
+
+        # History: har mahine ek order → DN → invoice
+        for m in range(history_months, 0, -1):
+            date = add_days(get_first_day(add_months(today, -m)), rng.randint(0, 27))
+            item = rng.choice(items)
+            qty = rng.randint(10, 30)
+            rate = rng.choice([5, 6, 7])
+            amount = qty * rate
+            key = f"{n + 1:07d}-{m:03d}"
+            so, dn, si = f"{PREFIX}-SO-{key}", f"{PREFIX}-DN-{key}", f"{PREFIX}-SI-{key}"
+            unpaid = m <= 2 and rng.random() < 0.4
+            item_cols = (item["code"], item["name"], item["name"], "Nos", "Nos", 1, qty, qty, rate)
+
+            rows.add("Sales Order", SO_FIELDS, (*rows.std(so, 1),
+                f"{PREFIX}-SO-", customer, customer, seller["name"], date, date, seller["city"],
+                "INR", 1, "INR", 1, qty, amount, amount, amount, amount,
+                amount, amount, amount, amount, 100, 100, "Completed", "Fully Delivered", "Fully Billed",
+            ))
+            rows.add("Sales Order Item", SO_ITEM_FIELDS, rows.child(
+                f"{so}-1", so, "Sales Order", "items", 1, 1,
+            ) + item_cols + (rate, rate, amount, amount, amount, date, qty, amount))
+
+            rows.add("Delivery Note", DN_FIELDS, (*rows.std(dn, 1),
+                f"{PREFIX}-DN-", customer, customer, seller["name"], date, seller["city"],
+                "INR", 1, qty, amount, amount, amount, amount, 100, "Completed",
+            ))
+            rows.add("Delivery Note Item", DN_ITEM_FIELDS, rows.child(
+                f"{dn}-1", dn, "Delivery Note", "items", 1, 1,
+            ) + item_cols + (amount, so, f"{so}-1"))
+
+            due = add_days(date, 15)
+            si_status = ("Overdue" if getdate(due) < getdate(today) else "Unpaid") if unpaid else "Paid"
+            rows.add("Sales Invoice", SI_FIELDS, (*rows.std(si, 1),
+                f"{PREFIX}-SI-", customer, customer, seller["name"], date, due, seller["city"],
+                "INR", 1, seller["debit_to"], qty, amount, amount, amount, amount, amount,
+                amount if unpaid else 0, si_status,
+            ))
+            rows.add("Sales Invoice Item", SI_ITEM_FIELDS, rows.child(
+                f"{si}-1", si, "Sales Invoice", "items", 1, 1,
+            ) + item_cols + (amount, seller["income_account"], so, f"{so}-1", dn, f"{dn}-1"))
+
+
+def reset_synthetic_data():
+    """Sirf BENCH prefix wale bulk rows delete (masters — Company, Item, Territory — rehte hain)."""
+    for doctype, column in RESET_TABLES:
+        frappe.db.sql(f"DELETE FROM `tab{doctype}` WHERE `{column}` LIKE %s", (f"{PREFIX}%",))
+    frappe.db.sql(
+        "DELETE FROM `tabCompany` WHERE name LIKE %s AND custom_society = 1", (f"{PREFIX} Society%",)
+    )
+    rebuild_tree("Company")
+    frappe.db.commit()
+
+
+def generate(customers=1000, sellers=None, items=20, states=3, cities_per_state=3,
+             pincodes_per_seller=5, societies_per_pincode=2, history_months=12, seed=42,
+             reset=False, verbose=False):
+    """
+    customers = scale (har customer ki ek current subscription).
+    Returns generated counts.
+    """
+    from my_frappe_app.api import clear_subscription_status_cache
+    from my_frappe_app.forecast import clear_print_run_forecast
+    from my_frappe_app.item_meta import clear_item_meta_cache
+    from my_frappe_app.receivables import rebuild_receivable_aging
+    from my_frappe_app.subscription_schedule import rebuild_subscription_schedule
+
+    customers = int(customers)
+    sellers = int(sellers or max(2, customers // 5000))
+    rng = random.Random(int(seed))
+    today = nowdate()
+    frappe.set_user("Administrator")
+
+    if reset:
+        reset_synthetic_data()
+    if frappe.db.exists("Customer", f"{PREFIX} Customer {1:07d}"):
+        frappe.throw("Synthetic data already exists — pass reset to regenerate")
+
+    log = (lambda msg: print(msg, flush=True)) if verbose else (lambda msg: None)
+
+    cities = _territories(int(states), int(cities_per_state))
+    seller_rows = _sellers(sellers, cities, int(pincodes_per_seller))
+    item_rows = _items(int(items))
+    customer_group = frappe.db.get_value("Customer Group", {"is_group": 0}, "name")
+    frappe.db.commit()
+    log(f"masters: {len(cities)} cities, {sellers} sellers, {len(item_rows)} items")
+
+    rows = _Rows()
+    _seller_addresses_and_societies(rows, seller_rows, int(societies_per_pincode))
+    _prices(rows, item_rows, int(states), rng)
+    rows.flush()
+    # Bulk society rows ke lft / rgt
+    rebuild_tree("Company")
+    frappe.db.commit()
+
+    for start in range(0, customers, CUSTOMER_CHUNK):
+        end = min(start + CUSTOMER_CHUNK, customers)
+        _customer_chunk(rows, start, end, seller_rows, item_rows, int(history_months),
+                        customer_group, rng, today)
+        rows.flush()
+        frappe.db.commit()
+        log(f"customers {end}/{customers}")
+
+    rebuild_subscription_schedule()
+    frappe.db.commit()
+    rebuild_receivable_aging()
+    clear_print_run_forecast()
+    clear_item_meta_cache()
+    clear_subscription_status_cache()
+    log("derived tables rebuilt")
+
+    return {
+        "sellers":        sellers,
+        "customers":      customers,
+        "items":          len(item_rows),
+        "territories":    len(cities),
+        "history_months": int(history_months),
+    }
+
+
+def seed_benchmark_data(customers=200, seed=42, **kwargs):
+    """benchmark.py ke liye chhota default dataset."""
+    if frappe.db.exists("Customer", f"{PREFIX} Customer {1:07d}"):
+        return {"status": "exists"}
+    return generate(customers=customers, seed=seed, **kwargs)
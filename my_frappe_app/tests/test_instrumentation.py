@@ -0,0 +1,35 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from my_frappe_app.instrumentation import get_endpoint_latency, instrument
+
+
+@instrument
+def _instrumented_endpoint():
+    return {"status": "success"}
+
+
+ENDPOINT = f"{__name__}._instrumented_endpoint"
+
+
+class TestInstrumentation(FrappeTestCase):
+    def setUp(self):
+        self._sample_rate = frappe.conf.get("api_instrumentation_sample_rate")
+        frappe.conf.api_instrumentation_sample_rate = 1
+
+    def tearDown(self):
+        frappe.conf.api_instrumentation_sample_rate = self._sample_rate
+
+    def test_recorded_endpoint_is_listed(self):
+        _instrumented_endpoint()
+
+        result = get_endpoint_latency()
+        rows = {r["endpoint"]: r for r in result["endpoints"]}
+        self.assertIn(ENDPOINT, rows)
+        self.assertGreaterEqual(rows[ENDPOINT]["samples"], 1)
+
+    def test_single_endpoint(self):
+        _instrumented_endpoint()
+
+        result = get_endpoint_latency(endpoint=ENDPOINT, minutes=5)
+        self.assertEqual([r["endpoint"] for r in result["endpoints"]], [ENDPOINT])
@@ -0,0 +1,72 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, nowdate
+
+from my_frappe_app.trusted_orders import compare_with_standard_path
+
+SELLER = "_Test Trusted Seller"
+TERRITORY = "_Test Trusted Territory"
+ITEM_GROUP = "_Test Trusted Papers"
+ITEM = "_Test Trusted Paper"
+CUSTOMER = "_Test Trusted Customer"
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def _ensure(doctype, name, doc):
+    if not frappe.db.exists(doctype, name):
+        frappe.get_doc({"doctype": doctype, **doc}).insert(ignore_permissions=True)
+    return name
+
+
+class TestTrustedOrders(FrappeTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        today = nowdate()
+
+        _ensure("Company", SELLER, {
+            "company_name": SELLER, "abbr": "_TTS", "default_currency": "INR",
+            "country": "India", "custom_seller": 1,
+        })
+        _ensure("Territory", TERRITORY, {
+            "territory_name": TERRITORY, "parent_territory": "All Territories", "is_group": 0,
+        })
+        _ensure("Item Group", ITEM_GROUP, {
+            "item_group_name": ITEM_GROUP, "parent_item_group": "All Item Groups", "is_group": 0,
+        })
+        _ensure("Item", ITEM, {
+            "item_code": ITEM, "item_name": ITEM, "item_group": ITEM_GROUP,
+            "stock_uom": "Nos", "is_stock_item": 0, "is_sales_item": 1,
+        })
+        _ensure("Customer", CUSTOMER, {
+            "customer_name": CUSTOMER, "customer_type": "Individual", "territory": TERRITORY,
+            "customer_group": frappe.db.get_value("Customer Group", {"is_group": 0}, "name"),
+        })
+        frappe.get_doc({
+            "doctype": "Daily Item Price",
+            "territory": TERRITORY,
+            "item_code": ITEM,
+            "start_date": add_days(today, -7),
+            "prices": [{"day": day, "price": 7 if day == "Sunday" else 5} for day in DAYS],
+        }).insert(ignore_permissions=True)
+
+        cls.subscription = frappe.get_doc({
+            "doctype": "Newspaper Subscription",
+            "customer": CUSTOMER,
+            "seller": SELLER,
+            "territory": TERRITORY,
+            "start_date": add_days(today, -1),
+            "end_date": add_days(today, 30),
+            "status": "Active",
+            "schedule_items": [{
+                "item_code": ITEM, "item_name": ITEM, "is_primary_item": 1,
+                **{f"{day.lower()}_qty": 2 for day in DAYS},
+            }],
+        }).insert(ignore_permissions=True)
+
+    def test_trusted_path_matches_standard_path(self):
+        result = compare_with_standard_path(subscriptions=[self.subscription.name])
+
+        self.assertEqual(result["compared"], 1)
+        self.assertEqual(result["failures"], {})
+        self.assertEqual(result["mismatches"], {})
@@ -0,0 +1,249 @@
+# ══════════════════════════════════════════════════════════════════
+# TRUSTED BULK CREATION — generator-created subscription SO / DN
+#
+# _run_daily_orders ke orders mein customer, seller, items aur rates
+# pehle se resolved hote hain. Standard path (insert → reload → submit,
+# phir DB se get_mapped_doc → DN insert → submit) har order pe wahi
+# lookups dobara karta hai. Trusted mode:
+#
+#   - seller cost center aur item warehouses (Item Default → ... →
+#     company warehouse) ek baar per run
+#   - (seller, item set) ka prepared SO template — har subscription
+#     pe copy, sirf customer / dates / qty / rate bharo
+#   - ignore_pricing_rule + ignore_links (rate aur links generator ke)
+#   - insert ke baad reload() nahi
+#   - DN in-memory submitted SO se map (DB se dobara load nahi),
+#     stock ledger flag sirf DN submit ke dauraan
+#
+# Currency, price list aur conversion rates set nahi karte — ERPNext ka
+# set_missing_values hi resolve karta hai. Totals, taxes aur status bhi
+# normal validate / submit se — sirf redundant lookups skip hote hain.
+#
+# Sirf generator ke documents ke liye (daily orders + retry queue).
+# Default band hai. Site pe comparison clean aaye tab on karo:
+#   site_config.json: "subscription_orders_trusted_mode": 1
+#
+# Standard path se comparison (savepoint, rollback — data nahi badalta):
+#   bench --site <site> execute my_frappe_app.trusted_orders.compare_with_standard_path
+# ══════════════════════════════════════════════════════════════════
+import copy
+
+import frappe
+from frappe.model.mapper import map_child_doc, map_doc
+from frappe.utils import flt, nowdate
+
+from my_frappe_app.item_meta import get_item_meta_many
+
+COMPARE_SAVEPOINT = "trusted_order_compare"
+
+SO_COMPARE_FIELDS = [
+    "customer", "company", "currency", "conversion_rate", "selling_price_list",
+    "price_list_currency", "territory", "customer_group", "transaction_date", "delivery_date",
+    "total_qty", "total", "net_total", "total_taxes_and_charges", "grand_total",
+    "rounded_total", "status", "per_delivered",
+]
+SO_ITEM_COMPARE_FIELDS = [
+    "item_code", "item_name", "uom", "stock_uom", "conversion_factor",
+    "qty", "stock_qty", "rate", "amount", "net_amount", "warehouse", "delivery_date",
+]
+DN_COMPARE_FIELDS = [
+    "customer", "company", "currency", "selling_price_list", "posting_date",
+    "total_qty", "total", "net_total", "grand_total", "status",
+]
+DN_ITEM_COMPARE_FIELDS = ["item_code", "qty", "rate", "amount", "uom", "warehouse"]
+
+
+def trusted_mode_enabled() -> bool:
+    return bool(frappe.conf.get("subscription_orders_trusted_mode", 0))
+
+
+def reset_trusted_order_cache():
+    """Har generation run ke shuru mein — seller defaults / templates fresh."""
+    frappe.flags.trusted_seller_defaults = {}
+    frappe.flags.trusted_order_templates = {}
+
+
+def _seller_defaults(seller) -> dict:
+    cache = frappe.flags.setdefault("trusted_seller_defaults", {})
+    if seller not in cache:
+        cache[seller] = {
+            "cost_center": frappe.get_cached_value("Company", seller, "cost_center"),
+        }
+    return cache[seller]
+
+
+def _order_template(seller, item_codes) -> dict:
+    """(seller, item set) ka SO dict — header defaults + item meta rows."""
+    from my_frappe_app.api import get_item_warehouses
+
+    key = (seller, tuple(item_codes))
+    cache = frappe.flags.setdefault("trusted_order_templates", {})
+    if key not in cache:
+        defaults = _seller_defaults(seller)
+        meta = get_item_meta_many(item_codes)
+        warehouses = get_item_warehouses(
+            [code for code in item_codes if (meta.get(code) or {}).get("is_stock_item")], seller
+        )
+        items = []
+        for code in item_codes:
+            m = meta.get(code) or {}
+            items.append({
+                "item_code":           code,
+                "item_name":           m.get("item_name") or code,
+                "description":         m.get("item_name") or code,
+                "item_group":          m.get("item_group"),
+                "uom":                 m.get("stock_uom"),
+                "stock_uom":           m.get("stock_uom"),
+                "conversion_factor":   1,
+                "warehouse":           warehouses.get(code),
+                "ignore_pricing_rule": 1,
+            })
+        cache[key] = {
+            "doctype":             "Sales Order",
+            "company":             seller,
+            "cost_center":         defaults["cost_center"],
+            "ignore_pricing_rule": 1,
+            "items":               items,
+        }
+    return cache[key]
+
+
+def build_sales_order(sub, item_prices, order_date):
+    """
+    item_prices: [{"item_code", "qty", "price"}] — _create_subscription_order
+    ne resolve kiye. Template copy + per-subscription values.
+    """
+    template = _order_template(sub.seller, [ip["item_code"] for ip in item_prices])
+    data = copy.deepcopy(template)
+    data.update({
+        "customer":                       sub.customer,
+        "territory":                      sub.territory,
+        "transaction_date":               order_date,
+        "delivery_date":                  order_date,
+        "custom_subscription_refereance": sub.name,
+    })
+    for row, ip in zip(data["items"], item_prices, strict=True):
+        row.update({"qty": ip["qty"], "rate": ip["price"], "delivery_date": order_date})
+
+    so = frappe.get_doc(data)
+    so.flags.ignore_permissions = True
+    so.flags.ignore_links       = True
+    return so
+
+
+def build_delivery_note(so):
+    """Submitted SO (in-memory) se DN — get_mapped_doc jaisa mapping, DB load ke bina."""
+    from my_frappe_app.api import SO_TO_DN_MAPPING
+
+    dn = frappe.new_doc("Delivery Note")
+    map_doc(so, dn, SO_TO_DN_MAPPING["Sales Order"])
+    for row in so.items:
+        map_child_doc(row, dn, SO_TO_DN_MAPPING["Sales Order Item"], so)
+
+    dn.flags.ignore_links = True
+    return dn
+
+
+# ── Standard path se comparison ───────────────────────────────────
+
+def _snapshot(doc, fields, item_fields):
+    return {
+        **{f: _normalize(doc.get(f)) for f in fields},
+        "items": [{f: _normalize(row.get(f)) for f in item_fields} for row in doc.items],
+    }
+
+
+def _normalize(value):
+    if isinstance(value, float):
+        return flt(value, 6)
+    return str(value) if value is not None and not isinstance(value, (int, str)) else value
+
+
+def _diff(standard, trusted, path=""):
+    if isinstance(standard, dict):
+        keys = set(standard) | set(trusted or {})
+        return [d for k in sorted(keys) for d in _diff(standard.get(k), (trusted or {}).get(k), f"{path}.{k}")]
+    if isinstance(standard, list):
+        if len(standard) != len(trusted or []):
+            return [f"{path}: {len(standard)} rows vs {len(trusted or [])}"]
+        return [d for i, (a, b) in enumerate(zip(standard, trusted, strict=True)) for d in _diff(a, b, f"{path}[{i}]")]
+    return [] if standard == trusted else [f"{path}: {standard!r} vs {trusted!r}"]
+
+
+def _create_and_capture(sub, items, order_date, day_name, trusted):
+    from my_frappe_app.api import _create_subscription_order
+    from my_frappe_app.job_ledger import JobRun
+
+    run = JobRun("compare")
+    failure = _create_subscription_order(run, sub, items, order_date, day_name, trusted=trusted)
+    if failure:
+        return {"failure": failure}
+
+    so_name = frappe.db.get_value("Sales Order", {
+        "custom_subscription_refereance": sub.name,
+        "transaction_date": order_date,
+        "docstatus": 1,
+    }, "name")
+    so = frappe.get_doc("Sales Order", so_name)
+    dn_name = frappe.db.get_value("Delivery Note Item", {"against_sales_order": so_name}, "parent")
+    return {
+        "so": _snapshot(so, SO_COMPARE_FIELDS, SO_ITEM_COMPARE_FIELDS),
+        "dn": _snapshot(frappe.get_doc("Delivery Note", dn_name), DN_COMPARE_FIELDS, DN_ITEM_COMPARE_FIELDS)
+        if dn_name else None,
+    }
+
+
+def compare_with_standard_path(limit=10, day=None, subscriptions=None):
+    """
+    Aaj ki schedule wali `limit` Active subscriptions pe dono paths chalao
+    (har ek savepoint ke andar, phir rollback) aur SO / DN fields compare.
+    subscriptions: sirf yeh names (list ya comma-separated).
+    Returns {"compared", "mismatches": {subscription: [diff, ...]},
+    "failures": {subscription: {"standard": ..., "trusted": ...}}} — failures mein
+    woh subscriptions jinka order kisi bhi path pe bana hi nahi.
+    """
+    from frappe.utils import get_datetime
+
+    from my_frappe_app.subscription_schedule import get_day_schedule
+
+    frappe.set_user("Administrator")
+    today = nowdate()
+    day_name = day or get_datetime(today).strftime("%A")
+
+    filters = {"status": "Active", "start_date": ["<=", today], "end_date": [">=", today]}
+    if isinstance(subscriptions, str):
+        subscriptions = [s.strip() for s in subscriptions.split(",") if s.strip()]
+    if subscriptions:
+        filters["name"] = ["in", subscriptions]
+
+    subs = frappe.get_all(
+        "Newspaper Subscription",
+        filters=filters,
+        fields=["name", "customer", "seller", "territory"],
+        order_by="name asc",
+        limit_page_length=int(limit) * 5,
+    )
+    schedule = get_day_schedule(day_name, [s.name for s in subs])
+    subs = [s for s in subs if schedule.get(s.name)][: int(limit)]
+
+    mismatches, failures = {}, {}
+    for sub in subs:
+        captured = {}
+        for trusted in (False, True):
+            reset_trusted_order_cache()
+            frappe.db.savepoint(COMPARE_SAVEPOINT)
+            try:
+                captured[trusted] = _create_and_capture(sub, schedule[sub.name], today, day_name, trusted)
+            finally:
+                frappe.db.rollback(save_point=COMPARE_SAVEPOINT)
+
+        if "failure" in captured[False] or "failure" in captured[True]:
+            failures[sub.name] = {
+                "standard": captured[False].get("failure"),
+                "trusted":  captured[True].get("failure"),
+            }
+        diffs = _diff(captured[False], captured[True])
+        if diffs:
+            mismatches[sub.name] = diffs
+
+    return {"compared": len(subs), "mismatches": mismatches, "failures": failures}